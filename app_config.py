@@ -11,6 +11,87 @@ USERS = {
       
 }
 
+# Product database storage - 'json' (products_master.json), 'journal' (snapshot + append-only log)
+# or 'sqlite' (indexed, WAL mode)
+DATABASE_BACKEND = os.environ.get('PRODUCT_DB_BACKEND', 'json')
+SQLITE_DATABASE_FILE = '/var/www/tools/data/products_master.db'
+
+# Supported stores - listing paths, selectors, per-host rate/concurrency and image rules
+# (site_profiles.json next to this file, or a .yaml file when PyYAML is installed)
+SITE_PROFILES_FILE = os.environ.get(
+    'SITE_PROFILES_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'site_profiles.json')
+)
+
+# Scraping concurrency - page fetch and image download worker threads, and the per-site
+# request budget (requests per second, with short bursts) shared by all of them
+SCRAPE_WORKERS = int(os.environ.get('SCRAPE_WORKERS', 4))
+SCRAPE_IMAGE_WORKERS = int(os.environ.get('SCRAPE_IMAGE_WORKERS', 4))
+SCRAPE_RATE_PER_HOST = float(os.environ.get('SCRAPE_RATE_PER_HOST', 2.0))
+SCRAPE_BURST_PER_HOST = int(os.environ.get('SCRAPE_BURST_PER_HOST', 2))
+
+# Shared HTTP session - keep-alive connections per host and retries (with backoff) on transient errors
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', 10))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 3))
+
+# Image downloads - one shared pool fetches images in parallel (at most IMAGE_DOWNLOAD_PER_HOST
+# at once per site), streaming to disk; images larger than IMAGE_MAX_MB are refused
+IMAGE_DOWNLOAD_WORKERS = int(os.environ.get('IMAGE_DOWNLOAD_WORKERS', 8))
+IMAGE_DOWNLOAD_PER_HOST = int(os.environ.get('IMAGE_DOWNLOAD_PER_HOST', 4))
+IMAGE_MAX_MB = int(os.environ.get('IMAGE_MAX_MB', 25))
+
+# Image store - every image is kept once by content hash (product folders link to it), and an
+# image whose perceptual hash is within IMAGE_NEAR_DUPLICATE_DISTANCE bits of another of the
+# product's images, with the same colours and aspect ratio, counts as the same picture
+# (the larger one is kept)
+IMAGE_STORE_DIR = os.environ.get('IMAGE_STORE_DIR', '/var/www/tools/data/image_store')
+IMAGE_NEAR_DUPLICATE_DISTANCE = int(os.environ.get('IMAGE_NEAR_DUPLICATE_DISTANCE', 5))
+
+# Scrape execution mode - 'threads' (worker pools) or 'async' (one event loop, httpx when installed).
+# Async mode caps in-flight requests per site and in total instead of using worker pools; pages still
+# go through the Store API and page cache like threads mode, only image downloads are streamed on the loop
+SCRAPE_MODES = ('threads', 'async')
+SCRAPE_MODE = os.environ.get('SCRAPE_MODE', 'threads')
+SCRAPE_ASYNC_PER_HOST = int(os.environ.get('SCRAPE_ASYNC_PER_HOST', 8))
+SCRAPE_ASYNC_MAX_CONNECTIONS = int(os.environ.get('SCRAPE_ASYNC_MAX_CONNECTIONS', 100))
+
+# Page cache - product/listing HTML kept on disk and revalidated with ETag/Last-Modified.
+# Pages younger than their TTL (seconds) are reused without a request; least recently used
+# pages are evicted past PAGE_CACHE_MAX_MB. Per-domain TTLs override the default, e.g. {'tribeseedbank.com': 3600}
+# (a site profile's page_cache_ttl takes precedence)
+PAGE_CACHE_ENABLED = os.environ.get('PAGE_CACHE_ENABLED', '1') == '1'
+PAGE_CACHE_DIR = os.environ.get('PAGE_CACHE_DIR', '/var/www/tools/data/page_cache')
+PAGE_CACHE_MAX_MB = int(os.environ.get('PAGE_CACHE_MAX_MB', 200))
+PAGE_CACHE_TTL = int(os.environ.get('PAGE_CACHE_TTL', 300))
+PAGE_CACHE_DOMAIN_TTLS = {}
+
+# Category crawling - persistent frontier of listing pages and product URLs, pages walked per run
+# and how often a failing listing page or product is retried across runs
+CRAWL_FRONTIER_FILE = os.environ.get('CRAWL_FRONTIER_FILE', '/var/www/tools/data/crawl_frontier.db')
+CRAWL_MAX_PAGES = int(os.environ.get('CRAWL_MAX_PAGES', 50))
+CRAWL_MAX_ATTEMPTS = int(os.environ.get('CRAWL_MAX_ATTEMPTS', 3))
+
+# WooCommerce Store API fast path - category listings and products read as JSON (up to
+# STORE_API_PAGE_SIZE products per request) on sites that expose /wp-json/wc/store, falling back
+# to the HTML selectors (with title, price and SKU from the page's JSON-LD)
+STORE_API_ENABLED = os.environ.get('STORE_API_ENABLED', '1') == '1'
+STORE_API_PAGE_SIZE = int(os.environ.get('STORE_API_PAGE_SIZE', 100))
+
+# Social image rendering - worker processes that resize a product's images in parallel
+# (one image per task); 1 renders in the calling process
+RENDER_WORKERS = int(os.environ.get('RENDER_WORKERS', os.cpu_count() or 1))
+
+# Render cache - rendered images kept by source content hash and output spec (reused across
+# products and after temp_ads is cleared), least recently used evicted past RENDER_CACHE_MAX_MB
+RENDER_CACHE_ENABLED = os.environ.get('RENDER_CACHE_ENABLED', '1') == '1'
+RENDER_CACHE_DIR = os.environ.get('RENDER_CACHE_DIR', '/var/www/tools/data/render_cache')
+RENDER_CACHE_MAX_MB = int(os.environ.get('RENDER_CACHE_MAX_MB', 500))
+
+# Pre-rendering - newly scraped products get every platform's images rendered in the background
+# (one product at a time, PRERENDER_WORKERS processes at PRERENDER_NICE) so review pages open ready
+PRERENDER_ENABLED = os.environ.get('PRERENDER_ENABLED', '1') == '1'
+PRERENDER_WORKERS = int(os.environ.get('PRERENDER_WORKERS', max(1, (os.cpu_count() or 1) // 2)))
+PRERENDER_NICE = int(os.environ.get('PRERENDER_NICE', 10))
+
 def setup_app_paths():
     """Setup application paths for VPS environment"""
     base_dir = Path('/var/www/tools')
@@ -66,27 +147,9 @@ def initialize_components():
     return scraper_module, instagram_generator_module
 
 def get_supported_sites():
-    """Get configuration for all supported WooCommerce sites"""
-    return {
-        'ineedhemp': {
-            'name': 'I Need Hemp',
-            'domain': 'ineedhemp.com',
-            'base_url': 'https://ineedhemp.com',
-            'description': 'Premium vaporizer and concentrate products'
-        },
-        'nicedreamz': {
-            'name': 'Nice Dreamz Wholesale',
-            'domain': 'nicedreamzwholesale.com', 
-            'base_url': 'https://nicedreamzwholesale.com',
-            'description': 'Wholesale vaporizer products and accessories'
-        },
-        'tribeseed': {
-            'name': 'Tribe Seed Bank',
-            'domain': 'tribeseedbank.com',
-            'base_url': 'https://tribeseedbank.com', 
-            'description': 'Premium seeds and growing supplies'
-        }
-    }
+    """Get configuration for all supported WooCommerce sites (from SITE_PROFILES_FILE)"""
+    from site_profiles import get_registry
+    return get_registry().supported_sites()
 
 def validate_environment():
     """Validate that the environment is properly configured"""
@@ -105,7 +168,8 @@ def validate_environment():
         'product_scraper_core.py',
         'unified_scraper.py',
         'database_manager.py',
-        'path_utils.py'
+        'path_utils.py',
+        'site_profiles.json'
     ]
     
     for filename in required_files:
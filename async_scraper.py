@@ -0,0 +1,364 @@
+"""
+Async Scraper - Single event loop scraping mode for CleanProductScraper
+Images are streamed without a thread per request; listing and product pages go through the
+scraper core (Store API, page cache, JSON-LD) in worker threads, as in threads mode. Per-domain
+semaphores cap in-flight requests and the shared token buckets keep each site's request rate.
+Blocking work (parsing, database and image store lookups, file writes) runs in worker threads
+"""
+import asyncio
+import os
+import random
+import time
+from contextlib import asynccontextmanager
+from urllib.parse import urlparse
+
+from app_config import HTTP_RETRIES, SCRAPE_ASYNC_MAX_CONNECTIONS, SCRAPE_ASYNC_PER_HOST
+from http_client import RETRY_STATUSES
+from scrape_pipeline import host_of
+
+# httpx is optional - without it requests run through the blocking HttpClient in worker threads
+try:
+    import httpx
+    HTTPX_AVAILABLE = True
+except ImportError:
+    HTTPX_AVAILABLE = False
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif')
+
+def existing_images(folder):
+    if not os.path.exists(folder):
+        return set()
+    return set(f for f in os.listdir(folder) if f.lower().endswith(IMAGE_EXTENSIONS))
+
+def remove_file(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+class AsyncHttpClient:
+    """httpx.AsyncClient with the same retry policy and metrics as http_client.HttpClient
+
+    Use as an async context manager inside the event loop that makes the requests.
+    """
+
+    def __init__(self, sync_client, headers=None, max_connections=SCRAPE_ASYNC_MAX_CONNECTIONS,
+                 retries=3, backoff_factor=0.5, backoff_jitter=0.5, timeout=20):
+        self.sync_client = sync_client
+        self.metrics = sync_client.metrics
+        self.headers = headers or dict(sync_client.session.headers)
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.backoff_jitter = backoff_jitter
+        self.timeout = timeout
+        self.client = None
+
+    async def __aenter__(self):
+        if HTTPX_AVAILABLE:
+            self.client = httpx.AsyncClient(
+                headers=self.headers,
+                follow_redirects=True,
+                # No pool timeout - requests queued behind the per-host semaphores wait for a connection
+                timeout=httpx.Timeout(self.timeout, pool=None),
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections
+                )
+            )
+        return self
+
+    async def __aexit__(self, *exc_info):
+        if self.client is not None:
+            await self.client.aclose()
+            self.client = None
+
+    def backoff(self, attempt, response=None):
+        """Seconds before the next attempt - Retry-After when the server sent one"""
+        if response is not None:
+            retry_after = response.headers.get('Retry-After', '')
+            if retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff_factor * (2 ** attempt) + random.uniform(0, self.backoff_jitter)
+
+    async def download(self, url, path, refuse, max_bytes, chunk_size, timeout=None):
+        """Stream a response body to path in chunks (same retries and metrics as HttpClient)
+
+        refuse(response) names a status for a body that shouldn't be read ('tiny', 'not_image'...)
+        from its headers, or None. Returns (status, size) - 'downloaded', a refuse() status or
+        'too_large'. Needs httpx.
+        """
+        timeout = timeout or self.timeout
+        host = urlparse(url).netloc.lower()
+        started = time.perf_counter()
+        attempt = 0
+        while True:
+            retry_response = None
+            try:
+                async with self.client.stream('GET', url, timeout=timeout) as response:
+                    if response.status_code in RETRY_STATUSES and attempt < self.retries:
+                        retry_response = response
+                    else:
+                        status, size = 'failed', 0
+                        try:
+                            response.raise_for_status()
+                            status = refuse(response)
+                            if status is None:
+                                status, size = await self.write_body(response, path, max_bytes, chunk_size)
+                            else:
+                                size = int(response.headers.get('Content-Length') or 0)
+                        finally:
+                            self.metrics.record(host, time.perf_counter() - started, response.status_code, size,
+                                                attempt, error=response.status_code >= 400)
+                        return status, size
+            except httpx.TransportError:
+                if attempt >= self.retries:
+                    self.metrics.record(host, time.perf_counter() - started, retries=attempt, error=True)
+                    raise
+            await asyncio.sleep(self.backoff(attempt, retry_response))
+            attempt += 1
+
+    async def write_body(self, response, path, max_bytes, chunk_size):
+        size = 0
+        f = await asyncio.to_thread(open, path, 'wb')
+        try:
+            async for chunk in response.aiter_bytes(chunk_size):
+                size += len(chunk)
+                if size > max_bytes:
+                    return 'too_large', size
+                await asyncio.to_thread(f.write, chunk)
+        finally:
+            await asyncio.to_thread(f.close)
+        return 'downloaded', size
+
+class AsyncHostLimiter:
+    """Per-domain concurrency semaphores on top of scrape_pipeline.HostRateLimiter's token buckets"""
+
+    def __init__(self, rate_limiter=None, per_host=SCRAPE_ASYNC_PER_HOST, overrides=None):
+        self.rate_limiter = rate_limiter
+        self.per_host = max(1, per_host)
+        # domain -> requests in flight for sites with their own limit
+        self.overrides = overrides or {}
+        self._semaphores = {}
+
+    @asynccontextmanager
+    async def slot(self, url, reserve=True):
+        """Hold one of the host's request slots (waiting for its rate budget first, unless
+        reserve is False because the request takes the budget itself)"""
+        host = host_of(url)
+        semaphore = self._semaphores.get(host)
+        if semaphore is None:
+            semaphore = self._semaphores[host] = asyncio.Semaphore(max(1, self.overrides.get(host, self.per_host)))
+        async with semaphore:
+            if reserve and self.rate_limiter:
+                wait = self.rate_limiter.reserve(url)
+                if wait > 0:
+                    await asyncio.sleep(wait)
+            yield
+
+class AsyncScraper:
+    """Runs CleanProductScraper's stages on one event loop
+
+    Site detection, duplicate checks, page fetches (Store API, page cache), parsing and saving
+    are the scraper's own methods - only image downloads are async. Products come back in the
+    same order as the input URLs.
+    """
+
+    def __init__(self, scraper, per_host=SCRAPE_ASYNC_PER_HOST, max_connections=SCRAPE_ASYNC_MAX_CONNECTIONS,
+                 retries=HTTP_RETRIES):
+        self.scraper = scraper
+        self.limiter = AsyncHostLimiter(scraper.rate_limiter, per_host, scraper.site_profiles.connection_limits())
+        self.http = AsyncHttpClient(scraper.http, scraper.headers, max_connections, retries=retries)
+
+    async def fetch_listing(self, category, site, limit=None):
+        """New product URLs from one site's category listing"""
+        listing_url = self.scraper.get_listing_url(category, site)
+        if not listing_url:
+            return []
+        # Store API or the page cache, same as threads mode - the core takes the rate budget itself
+        async with self.limiter.slot(listing_url, reserve=False):
+            links = await asyncio.to_thread(self.scraper.scraper_core.get_product_urls_from_page, listing_url, limit)
+        return await asyncio.to_thread(self.scraper.filter_new_links, links, category, site)
+
+    async def fetch_product(self, url, scrape_source):
+        # Duplicate checks look the URL up in the database
+        if not await asyncio.to_thread(self.scraper.should_scrape, url, scrape_source):
+            return None
+        # Store API, then the page cache (unchanged pages come back already extracted) and the
+        # HTML with JSON-LD - same as threads mode. The core takes the rate budget itself
+        async with self.limiter.slot(url, reserve=False):
+            scraped = await asyncio.to_thread(self.scraper.scraper_core.scrape_product, url)
+        if not scraped:
+            print("  Failed to extract product data")
+            return None
+        return self.scraper.make_page(url, scraped['product_data'], scrape_source,
+                                      image_urls=scraped['image_urls'], unchanged=scraped['unchanged'])
+
+    async def fetch_image(self, url, filepath, min_bytes):
+        """Stream one image to filepath through a temp file - same result dict as ImageFetcher.fetch"""
+        fetcher = self.scraper.image_fetcher
+        if self.http.client is None:
+            # Without httpx the blocking fetcher streams it in a worker thread (with its own per-site pacing)
+            return await asyncio.to_thread(fetcher.fetch, url, filepath, min_bytes)
+
+        result = {'url': url, 'path': filepath, 'status': 'failed', 'size': 0, 'error': None}
+        temp_path = f"{filepath}.{os.getpid()}.part"
+        try:
+            async with self.limiter.slot(url):
+                status, size = await self.http.download(
+                    url, temp_path, lambda response: fetcher.check_headers(response, min_bytes),
+                    fetcher.max_bytes, fetcher.chunk_size, timeout=15
+                )
+            if status == 'downloaded' and size < min_bytes:
+                status = 'tiny'
+            result.update(status=status, size=size)
+            if status == 'downloaded':
+                await asyncio.to_thread(os.replace, temp_path, filepath)
+            elif status != 'tiny':
+                result['error'] = status.replace('_', ' ')
+        except Exception as e:
+            result['error'] = str(e)
+        finally:
+            await asyncio.to_thread(remove_file, temp_path)
+        return result
+
+    async def download_images(self, image_urls, images_folder):
+        """Download a product's images concurrently - same naming and skip rules as the blocking downloaders"""
+        enhanced = self.scraper.image_processor is not None
+        min_size = 2000 if enhanced else 1000
+        store = self.scraper.image_store
+
+        existing = await asyncio.to_thread(existing_images, images_folder)
+
+        targets = []
+        for i, url in enumerate(image_urls):
+            ext = 'jpg'
+            if url.lower().endswith(IMAGE_EXTENSIONS):
+                ext = url.split('.')[-1].lower().split('?')[0]
+            filename = f"image_{i+1}.{ext}"
+            targets.append((i, url, filename, os.path.join(images_folder, filename)))
+
+        async def download(url, filename, filepath):
+            if filename in existing:
+                return None
+            # Already in the image store - linked in below without a request
+            entry = await asyncio.to_thread(store.lookup_url, url)
+            if entry:
+                return entry
+            return await self.fetch_image(url, filepath, min_size)
+
+        results = await asyncio.gather(
+            *(download(url, filename, filepath) for i, url, filename, filepath in targets), return_exceptions=True
+        )
+        return await asyncio.to_thread(self.keep_images, targets, results, enhanced)
+
+    def keep_images(self, targets, results, enhanced):
+        """Store, dedupe and validate downloaded images in source order, so duplicate skipping
+        matches the blocking downloader - runs in a worker thread
+        """
+        store = self.scraper.image_store
+        downloaded = []
+        kept = {}
+        for (i, url, filename, filepath), result in zip(targets, results):
+            if isinstance(result, Exception):
+                print(f"    Failed image {i+1}: {result}")
+                continue
+            if result is None:
+                print(f"    Skipped existing: {filename}")
+                downloaded.append(filepath)
+                continue
+            if 'status' in result:
+                if result['status'] == 'tiny':
+                    print(f"    Skipped tiny image: {filename} ({result['size']} bytes)")
+                    continue
+                if result['status'] != 'downloaded':
+                    print(f"    Failed image {i+1}: {result['error'] or result['status']}")
+                    continue
+
+            try:
+                if 'status' in result:
+                    entry = store.add(filepath, url)
+                else:
+                    entry = result
+                    store.place(entry, filepath)
+
+                if enhanced:
+                    status, path = store.dedupe(entry, filepath, kept)
+                    if status != 'new':
+                        print(f"    Skipped {status.replace('_', '-')}: {filename} (kept {os.path.basename(path)})")
+                        continue
+            except Exception as e:
+                print(f"    Failed image {i+1}: {e}")
+                continue
+
+            downloaded.append(filepath)
+            print(f"    Downloaded: {filename} ({entry['size']} bytes)")
+
+        if enhanced:
+            return self.scraper.image_processor.validate_downloaded_images(downloaded)
+        return downloaded
+
+    async def process(self, url, scrape_source):
+        page = await self.fetch_product(url, scrape_source)
+        if page is None:
+            return None
+        # Folder checks, image hashing and saving the product files are blocking
+        await asyncio.to_thread(self.scraper.prepare_product, page)
+        if page['image_urls']:
+            page['local_images'] = await self.download_images(page['image_urls'], page['images_folder'])
+        return await asyncio.to_thread(self.scraper.complete_product, page)
+
+    async def scrape(self, urls, scrape_source="unknown"):
+        total = len(urls)
+        counts = {'done': 0, 'successful': 0}
+
+        async def guarded(url):
+            try:
+                product = await self.process(url, scrape_source)
+            except Exception as e:
+                print(f"  Failed {url}: {e}")
+                product = None
+            counts['done'] += 1
+            if product:
+                counts['successful'] += 1
+            if counts['done'] % 5 == 0 or counts['done'] == total:
+                print(f"  Progress: {counts['successful']} successful, "
+                      f"{counts['done'] - counts['successful']} failed ({counts['done']}/{total})")
+            return product
+
+        async with self.http:
+            results = await asyncio.gather(*(guarded(url) for url in urls))
+        return [product for product in results if product]
+
+    async def gather_listings(self, jobs):
+        """jobs: [(category, site, limit)] - every listing is fetched at once"""
+        async with self.http:
+            results = await asyncio.gather(
+                *(self.fetch_listing(category, site, limit) for category, site, limit in jobs)
+            )
+        urls = []
+        seen = set()
+        for links in results:
+            for link in links:
+                if link not in seen:
+                    seen.add(link)
+                    urls.append(link)
+        return urls
+
+    def run(self, urls, scrape_source="unknown"):
+        """Blocking entry point - runs the whole scrape on a fresh event loop"""
+        return asyncio.run(self.scrape(urls, scrape_source))
+
+    def get_catalog_urls(self, jobs):
+        return asyncio.run(self.gather_listings(jobs))
+
+if __name__ == '__main__':
+    import sys
+    from unified_scraper import CleanProductScraper
+
+    print(f"httpx available: {HTTPX_AVAILABLE}")
+    scraper = CleanProductScraper(mode='async')
+    urls = sys.argv[1:]
+    if not urls:
+        urls = scraper.get_catalog_urls('best_sellers', list(scraper.sites), 5)
+    scraper.scrape_products(urls, "Custom URL")
@@ -0,0 +1,250 @@
+"""
+Backup Manager - Content-addressed incremental backups for the product database
+Stores each product record once by content hash; snapshot manifests reference those hashes
+"""
+import hashlib
+import json
+import shutil
+import threading
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from storage_backends import atomic_write_json
+
+class BackupManager:
+    """Deduplicated snapshots with a time/ops policy and hourly/daily/weekly retention"""
+
+    def __init__(self, backup_dir='/var/www/tools/data/backups', min_interval=300, min_ops=25,
+                 keep_recent=10, hourly_hours=24, daily_days=30, weekly_weeks=12):
+        self.backup_dir = Path(backup_dir)
+        self.objects_dir = self.backup_dir / 'objects'
+        self.snapshots_dir = self.backup_dir / 'snapshots'
+
+        # Policy: snapshot once this many seconds have passed or this many writes happened
+        self.min_interval = min_interval
+        self.min_ops = min_ops
+
+        # Retention tiers
+        self.keep_recent = keep_recent
+        self.hourly_window = timedelta(hours=hourly_hours)
+        self.daily_window = timedelta(days=daily_days)
+        self.weekly_window = timedelta(weeks=weekly_weeks)
+
+        self.ops_since_backup = 0
+        self.last_backup_time = None
+        self._lock = threading.RLock()
+
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.snapshots_dir.mkdir(parents=True, exist_ok=True)
+
+        latest = self.latest_snapshot()
+        if latest:
+            self.last_backup_time = latest['created_ts']
+
+    def hash_product(self, product):
+        """Content hash of a product record (canonical JSON)"""
+        canonical = json.dumps(product, sort_keys=True, ensure_ascii=False, separators=(',', ':'))
+        return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+    def object_path(self, content_hash):
+        return self.objects_dir / content_hash[:2] / f"{content_hash}.json"
+
+    def snapshot_path(self, snapshot_id):
+        return self.snapshots_dir / f"{snapshot_id}.json"
+
+    # Policy
+
+    def record_operation(self, count=1):
+        """Count a database write towards the backup policy"""
+        with self._lock:
+            self.ops_since_backup += count
+
+    def should_backup(self):
+        """Check the time/ops policy"""
+        with self._lock:
+            if self.last_backup_time is None:
+                return True
+            if self.ops_since_backup >= self.min_ops:
+                return True
+            elapsed = time.time() - self.last_backup_time
+            return self.ops_since_backup > 0 and elapsed >= self.min_interval
+
+    # Snapshots
+
+    def create_snapshot(self, document):
+        """Store new product records and write a manifest referencing them"""
+        with self._lock:
+            product_hashes = []
+            new_objects = 0
+
+            for product in document.get('products', []):
+                content_hash = self.hash_product(product)
+                product_hashes.append(content_hash)
+
+                object_path = self.object_path(content_hash)
+                if not object_path.exists():
+                    object_path.parent.mkdir(exist_ok=True)
+                    atomic_write_json(str(object_path), product)
+                    new_objects += 1
+
+            now = time.time()
+            snapshot_id = datetime.fromtimestamp(now).strftime('%Y%m%d_%H%M%S_%f')
+            manifest = {
+                'id': snapshot_id,
+                'created': datetime.fromtimestamp(now).isoformat(),
+                'created_ts': now,
+                'metadata': document.get('metadata', {}),
+                'products': product_hashes,
+                'new_objects': new_objects
+            }
+            atomic_write_json(str(self.snapshot_path(snapshot_id)), manifest)
+
+            self.ops_since_backup = 0
+            self.last_backup_time = now
+
+            print(f"✅ Database backup created: {snapshot_id} ({len(product_hashes)} products, {new_objects} new records)")
+            return manifest
+
+    def list_snapshots(self):
+        """List snapshot manifests, newest first (without product hashes)"""
+        snapshots = []
+        for path in self.snapshots_dir.glob('*.json'):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                continue
+            snapshots.append({
+                'id': manifest['id'],
+                'created': manifest['created'],
+                'created_ts': manifest['created_ts'],
+                'total_products': len(manifest['products']),
+                'new_objects': manifest.get('new_objects', 0)
+            })
+        snapshots.sort(key=lambda s: s['created_ts'], reverse=True)
+        return snapshots
+
+    def latest_snapshot(self):
+        snapshots = self.list_snapshots()
+        return snapshots[0] if snapshots else None
+
+    def load_manifest(self, snapshot_id):
+        with open(self.snapshot_path(snapshot_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def load_object(self, content_hash):
+        with open(self.object_path(content_hash), 'r', encoding='utf-8') as f:
+            return json.load(f)
+
+    def restore(self, snapshot_id):
+        """Rebuild the full database document stored in a snapshot"""
+        manifest = self.load_manifest(snapshot_id)
+        products = [self.load_object(content_hash) for content_hash in manifest['products']]
+        return {'metadata': dict(manifest.get('metadata', {})), 'products': products}
+
+    def diff(self, snapshot_a, snapshot_b):
+        """Compare two snapshots by product URL: added, removed and changed records"""
+        hashes_a = self.load_manifest(snapshot_a)['products']
+        hashes_b = self.load_manifest(snapshot_b)['products']
+
+        # Records present in both snapshots are unchanged - only load the rest
+        common = set(hashes_a) & set(hashes_b)
+
+        def records_by_url(hashes):
+            records = {}
+            for content_hash in hashes:
+                if content_hash in common:
+                    continue
+                product = self.load_object(content_hash)
+                records[product.get('url') or content_hash] = product
+            return records
+
+        records_a = records_by_url(hashes_a)
+        records_b = records_by_url(hashes_b)
+
+        added = [records_b[key].get('title', key) for key in records_b if key not in records_a]
+        removed = [records_a[key].get('title', key) for key in records_a if key not in records_b]
+        changed = []
+        for key in records_a.keys() & records_b.keys():
+            product_a = records_a[key]
+            product_b = records_b[key]
+            fields = sorted(
+                field for field in set(product_a) | set(product_b)
+                if product_a.get(field) != product_b.get(field)
+            )
+            changed.append({'url': key, 'title': product_b.get('title', key), 'fields': fields})
+
+        return {
+            'from': snapshot_a,
+            'to': snapshot_b,
+            'unchanged': len(common),
+            'added': added,
+            'removed': removed,
+            'changed': changed
+        }
+
+    # Retention
+
+    def apply_retention(self):
+        """Keep recent snapshots plus one per hour/day/week tier, then drop unreferenced records"""
+        with self._lock:
+            snapshots = self.list_snapshots()
+            now = datetime.now()
+            seen_buckets = set()
+            removed = 0
+
+            for position, snapshot in enumerate(snapshots):
+                if position < self.keep_recent:
+                    continue
+
+                created = datetime.fromtimestamp(snapshot['created_ts'])
+                age = now - created
+                if age <= self.hourly_window:
+                    bucket = ('hourly', created.strftime('%Y%m%d%H'))
+                elif age <= self.daily_window:
+                    bucket = ('daily', created.strftime('%Y%m%d'))
+                elif age <= self.weekly_window:
+                    bucket = ('weekly', created.strftime('%G%V'))
+                else:
+                    bucket = None
+
+                if bucket is not None and bucket not in seen_buckets:
+                    seen_buckets.add(bucket)
+                    continue
+
+                self.snapshot_path(snapshot['id']).unlink()
+                removed += 1
+
+            if removed:
+                print(f"🗑️ Removed {removed} old backups")
+                self.collect_garbage()
+            return removed
+
+    def collect_garbage(self):
+        """Delete product records no snapshot references any more"""
+        referenced = set()
+        for path in self.snapshots_dir.glob('*.json'):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    referenced.update(json.load(f)['products'])
+            except (OSError, ValueError, KeyError):
+                # Unreadable manifest - keep every object to be safe
+                return 0
+
+        deleted = 0
+        for object_path in self.objects_dir.glob('*/*.json'):
+            if object_path.stem not in referenced:
+                object_path.unlink()
+                deleted += 1
+        return deleted
+
+    def preserve_raw_file(self, source_file):
+        """Keep a byte-for-byte copy of a file that can't be parsed (e.g. corrupt database)"""
+        corrupt_dir = self.backup_dir / 'corrupt'
+        corrupt_dir.mkdir(exist_ok=True)
+        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        target = corrupt_dir / f"{Path(source_file).stem}_corrupt_{timestamp}{Path(source_file).suffix}"
+        shutil.copy2(source_file, target)
+        print(f"⚠️ Preserved unreadable database: {target}")
+        return target
@@ -0,0 +1,221 @@
+"""
+Crawl Frontier - Persistent, resumable crawling of paginated WooCommerce category listings
+Listing pages and discovered product URLs are queued in SQLite, so a crawl picks up where it
+stopped after a restart and never walks a listing page or queues a product URL twice
+"""
+import sqlite3
+import threading
+from datetime import datetime
+
+from app_config import CRAWL_FRONTIER_FILE, CRAWL_MAX_ATTEMPTS, CRAWL_MAX_PAGES
+
+class CrawlFrontier:
+    """On-disk queue of listing pages (the crawl cursor) and product URLs, per crawl
+
+    A crawl is named by its start URL. Listing pages are walked in page order; product
+    URLs are deduplicated across every crawl.
+    """
+
+    SCHEMA = [
+        '''CREATE TABLE IF NOT EXISTS listings (
+            url TEXT PRIMARY KEY,
+            crawl TEXT NOT NULL,
+            page INTEGER NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            product_count INTEGER NOT NULL DEFAULT 0,
+            next_url TEXT,
+            discovered_at TEXT NOT NULL,
+            visited_at TEXT
+        )''',
+        '''CREATE TABLE IF NOT EXISTS products (
+            url TEXT PRIMARY KEY,
+            crawl TEXT NOT NULL,
+            listing_url TEXT,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            discovered_at TEXT NOT NULL,
+            done_at TEXT
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_listings_crawl ON listings(crawl, status, page)',
+        'CREATE INDEX IF NOT EXISTS idx_products_crawl ON products(crawl, status)'
+    ]
+
+    def __init__(self, database_file=CRAWL_FRONTIER_FILE, max_attempts=CRAWL_MAX_ATTEMPTS):
+        self.database_file = database_file
+        self.max_attempts = max_attempts
+        # sqlite3 connections must not be shared across threads
+        self._local = threading.local()
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database_file, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    # Listing pages
+
+    def add_listing(self, crawl, url, page):
+        """Queue a listing page, returns False if it was already known"""
+        conn = self.connect()
+        with conn:
+            cursor = conn.execute(
+                'INSERT OR IGNORE INTO listings (url, crawl, page, discovered_at) VALUES (?, ?, ?, ?)',
+                (url, crawl, page, datetime.now().isoformat())
+            )
+        return cursor.rowcount > 0
+
+    def next_listing(self, crawl):
+        """The crawl's cursor - lowest pending page, or None when the crawl is complete"""
+        row = self.connect().execute(
+            '''SELECT url, page FROM listings
+               WHERE crawl = ? AND (status = 'pending' OR (status = 'failed' AND attempts < ?))
+               ORDER BY page LIMIT 1''',
+            (crawl, self.max_attempts)
+        ).fetchone()
+        return row
+
+    def finish_listing(self, url, product_count, next_url):
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                '''UPDATE listings SET status = 'done', attempts = attempts + 1, product_count = ?,
+                   next_url = ?, visited_at = ? WHERE url = ?''',
+                (product_count, next_url, datetime.now().isoformat(), url)
+            )
+
+    def fail_listing(self, url):
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                "UPDATE listings SET status = 'failed', attempts = attempts + 1, visited_at = ? WHERE url = ?",
+                (datetime.now().isoformat(), url)
+            )
+
+    def rewind(self, crawl):
+        """Walk the crawl's listing pages again (to pick up products added since) - queued products are kept"""
+        conn = self.connect()
+        with conn:
+            conn.execute("UPDATE listings SET status = 'pending', attempts = 0 WHERE crawl = ?", (crawl,))
+
+    # Product URLs
+
+    def add_products(self, crawl, urls, listing_url=None, known_urls=()):
+        """Queue product URLs not seen before, returns how many were new
+
+        URLs already in the product database go in as 'known' so they're never queued for scraping.
+        """
+        now = datetime.now().isoformat()
+        conn = self.connect()
+        added = 0
+        with conn:
+            for url in urls:
+                status = 'known' if url in known_urls else 'pending'
+                cursor = conn.execute(
+                    '''INSERT OR IGNORE INTO products (url, crawl, listing_url, status, discovered_at)
+                       VALUES (?, ?, ?, ?, ?)''',
+                    (url, crawl, listing_url, status, now)
+                )
+                if cursor.rowcount > 0 and status == 'pending':
+                    added += 1
+        return added
+
+    def pending_products(self, crawl=None, limit=None):
+        """Product URLs still to scrape, in discovery order"""
+        query = "SELECT url FROM products WHERE (status = 'pending' OR (status = 'failed' AND attempts < ?))"
+        params = [self.max_attempts]
+        if crawl:
+            query += ' AND crawl = ?'
+            params.append(crawl)
+        query += ' ORDER BY rowid'
+        if limit:
+            query += ' LIMIT ?'
+            params.append(limit)
+        return [row[0] for row in self.connect().execute(query, params)]
+
+    def mark_products(self, urls, status):
+        """Record scrape results - 'scraped', 'failed' or 'known'"""
+        conn = self.connect()
+        with conn:
+            conn.executemany(
+                'UPDATE products SET status = ?, attempts = attempts + 1, done_at = ? WHERE url = ?',
+                [(status, datetime.now().isoformat(), url) for url in urls]
+            )
+
+    def stats(self, crawl=None):
+        conn = self.connect()
+        where, params = ('WHERE crawl = ?', (crawl,)) if crawl else ('', ())
+        listings = dict(conn.execute(f'SELECT status, COUNT(*) FROM listings {where} GROUP BY status', params).fetchall())
+        products = dict(conn.execute(f'SELECT status, COUNT(*) FROM products {where} GROUP BY status', params).fetchall())
+        return {'listings': listings, 'products': products}
+
+class CategoryCrawler:
+    """Walks a category's listing pages through the frontier, following WooCommerce pagination"""
+
+    def __init__(self, scraper, frontier=None, max_pages=CRAWL_MAX_PAGES):
+        self.scraper = scraper
+        self.frontier = frontier or CrawlFrontier()
+        self.max_pages = max_pages
+
+    def crawl(self, start_url, max_pages=None, rewalk=False):
+        """Discover product URLs from start_url and the pages after it
+
+        Resumes at the first unvisited page; pages already walked are skipped unless rewalk.
+        Returns how many new product URLs were queued.
+        """
+        max_pages = max_pages or self.max_pages
+        crawl = start_url
+        if rewalk:
+            self.frontier.rewind(crawl)
+        self.frontier.add_listing(crawl, start_url, 1)
+        known_urls = self.scraper.database.get_existing_products()
+
+        queued = 0
+        walked = 0
+        while walked < max_pages:
+            listing = self.frontier.next_listing(crawl)
+            if listing is None:
+                break
+            url, page = listing
+            walked += 1
+
+            try:
+                links, next_url = self.scraper.scraper_core.get_listing_page(url)
+            except Exception as e:
+                print(f"  ❌ Listing page {page} failed: {e}")
+                self.frontier.fail_listing(url)
+                continue
+
+            new_count = self.frontier.add_products(crawl, links, url, known_urls)
+            queued += new_count
+            if next_url and next_url != url:
+                self.frontier.add_listing(crawl, next_url, page + 1)
+            self.frontier.finish_listing(url, len(links), next_url)
+            print(f"  Page {page}: {len(links)} products ({new_count} new){'' if next_url else ' - last page'}")
+
+        stats = self.frontier.stats(crawl)
+        print(f"✅ Crawled {walked} listing pages, {queued} new product URLs queued "
+              f"({stats['products'].get('pending', 0)} waiting to scrape)")
+        return queued
+
+    def pending_urls(self, start_url=None, limit=None):
+        return self.frontier.pending_products(start_url, limit)
+
+    def record_results(self, urls, products):
+        """Mark which queued URLs were scraped - the rest are retried on later runs"""
+        scraped = {product.get('url') for product in products}
+        # Skipped because another run scraped them meanwhile - done as well
+        scraped.update(self.scraper.database.get_existing_products())
+        self.frontier.mark_products([url for url in urls if url in scraped], 'scraped')
+        self.frontier.mark_products([url for url in urls if url not in scraped], 'failed')
+
+if __name__ == '__main__':
+    frontier = CrawlFrontier()
+    print("Crawl frontier:", frontier.database_file)
+    print(frontier.stats())
@@ -2,76 +2,148 @@
 Database Manager - Universal WooCommerce Product Database
 Handles product data storage, retrieval, and management across multiple sites
 """
-import json
 import os
 from datetime import datetime
 from pathlib import Path
+from app_config import DATABASE_BACKEND, SQLITE_DATABASE_FILE
+from backup_manager import BackupManager
+from search_index import SearchIndex
+from site_profiles import get_registry
+from storage_backends import (DATABASE_VERSION, assign_product_ids, build_metadata, create_storage_backend,
+                              migrate_json_to_sqlite)
 
 class ProductDatabase:
     """Enhanced product database with multi-site support and better organization"""
     
-    def __init__(self, database_file='/var/www/tools/data/products_master.json'):
+    def __init__(self, database_file='/var/www/tools/data/products_master.json', backend=None, sqlite_file=None):
         self.database_file = database_file
         self.backup_dir = Path('/var/www/tools/data/backups')
+        self.backend_name = backend or DATABASE_BACKEND
         
         # Ensure database directory exists
         os.makedirs(os.path.dirname(database_file), exist_ok=True)
         os.makedirs(self.backup_dir, exist_ok=True)
         
+        # Content-addressed snapshots taken on a time/ops policy
+        self.backups = BackupManager(self.backup_dir)
+        
+        # Full-text index, built lazily on first search and kept current on writes
+        self.search_index = SearchIndex()
+        self._search_token = None
+        self._search_synced = False
+        
+        if self.backend_name == 'sqlite':
+            self.storage_file = sqlite_file or SQLITE_DATABASE_FILE
+        else:
+            self.storage_file = self.database_file
+        
+        self.backend = create_storage_backend(
+            self.backend_name,
+            self.storage_file,
+            before_write=self.backup_before_write,
+            on_corrupt=self.preserve_corrupt_database
+        )
+        
         # Initialize database if it doesn't exist
-        if not os.path.exists(self.database_file):
-            self.initialize_database()
+        if not self.backend.exists():
+            if self.backend_name == 'sqlite' and os.path.exists(self.database_file):
+                # One-shot migration from the existing JSON database
+                migrate_json_to_sqlite(self.database_file, self.storage_file)
+            else:
+                self.initialize_database()
+        
+        # Products stored before stable ids existed get one now
+        self.ensure_product_ids()
         
-        print(f"✅ Database manager initialized: {self.database_file}")
+        print(f"✅ Database manager initialized: {self.storage_file} ({self.backend_name})")
     
     def initialize_database(self):
         """Initialize empty database with metadata"""
         initial_data = {
-            'metadata': {
-                'version': '3.0-universal',
-                'created': datetime.now().isoformat(),
-                'last_updated': datetime.now().isoformat(),
-                'total_products': 0,
-                'supported_sites': [
-                    'ineedhemp.com',
-                    'nicedreamzwholesale.com', 
-                    'tribeseedbank.com'
-                ]
-            },
+            'metadata': build_metadata(0, get_registry().domains()),
             'products': []
         }
         
-        with open(self.database_file, 'w', encoding='utf-8') as f:
-            json.dump(initial_data, f, indent=2, ensure_ascii=False)
+        self.backend.initialize(initial_data)
         
-        print(f"✅ Initialized new database: {self.database_file}")
+        print(f"✅ Initialized new database: {self.storage_file}")
+    
+    def ensure_product_ids(self):
+        """Backfill stable ids for products that don't have one yet"""
+        try:
+            with self.backend.write_lock:
+                database = self.backend.load_document()
+                assigned = assign_product_ids(database['products'])
+                if assigned:
+                    self.backend.write_document(database)
+                    print(f"✅ Assigned ids to {assigned} existing products")
+                return assigned
+        except Exception as e:
+            print(f"❌ Product id backfill failed: {e}")
+            return 0
     
     def create_backup(self):
-        """Create a timestamped backup of the current database"""
+        """Create a deduplicated snapshot of the current database"""
         try:
-            if not os.path.exists(self.database_file):
+            if not self.backend.exists():
                 return None
             
-            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-            backup_filename = f"products_backup_{timestamp}.json"
-            backup_path = self.backup_dir / backup_filename
-            
-            # Copy current database to backup
-            import shutil
-            shutil.copy2(self.database_file, backup_path)
+            manifest = self.backups.create_snapshot(self.load_database())
             
-            # Keep only the last 10 backups
-            self.cleanup_old_backups()
+            # Thin out old snapshots into hourly/daily/weekly tiers
+            self.backups.apply_retention()
             
-            print(f"✅ Database backup created: {backup_filename}")
-            return backup_path
+            return self.backups.snapshot_path(manifest['id'])
             
         except Exception as e:
             print(f"❌ Backup creation failed: {e}")
             return None
     
+    def backup_if_due(self):
+        """Create a backup only when the time/ops policy says one is due"""
+        if self.backups.should_backup():
+            return self.create_backup()
+        return None
+    
+    def backup_before_write(self):
+        """Back up before a full save (but only if database exists and has content)"""
+        if self.backend.exists() and self.backend.size_bytes() > 0:
+            self.backup_if_due()
+    
+    def record_write(self, count=1):
+        """Count a write towards the backup policy and back up if due"""
+        self.backups.record_operation(count)
+        self.backup_if_due()
+    
+    def preserve_corrupt_database(self):
+        """Keep a raw copy of an unreadable database before it is reinitialized"""
+        try:
+            self.backups.preserve_raw_file(self.storage_file)
+        except Exception as e:
+            print(f"❌ Backup creation failed: {e}")
+    
+    def list_backups(self):
+        """List available backup snapshots, newest first"""
+        return self.backups.list_snapshots()
+    
+    def restore_backup(self, snapshot_id):
+        """Replace the database with the contents of a backup snapshot"""
+        try:
+            data = self.backups.restore(snapshot_id)
+            success = self.save_database(data)
+            if success:
+                print(f"✅ Restored {len(data['products'])} products from backup {snapshot_id}")
+            return success
+        except Exception as e:
+            print(f"❌ Backup restore failed: {e}")
+            return False
+    
+    def diff_backups(self, snapshot_a, snapshot_b):
+        """Compare two backup snapshots"""
+        return self.backups.diff(snapshot_a, snapshot_b)
+    
     def cleanup_old_backups(self, keep_count=10):
-        """Remove old backups, keeping only the most recent ones"""
+        """Remove old flat-file backups (products_backup_*.json), keeping only the most recent ones"""
         try:
             backup_files = list(self.backup_dir.glob("products_backup_*.json"))
             backup_files.sort(key=lambda x: x.stat().st_mtime, reverse=True)
@@ -87,46 +159,11 @@ class ProductDatabase:
     def load_database(self):
         """Load complete database with error handling - supports both old and new formats"""
         try:
-            if not os.path.exists(self.database_file):
+            if not self.backend.exists():
                 self.initialize_database()
             
-            with open(self.database_file, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-            
-            # Handle old format (simple array) vs new format (metadata wrapper)
-            if isinstance(data, list):
-                # Old format - convert to new format
-                print(f"✅ Converting old database format with {len(data)} products")
-                converted_data = {
-                    'metadata': {
-                        'version': '3.0-universal',
-                        'created': datetime.now().isoformat(),
-                        'last_updated': datetime.now().isoformat(),
-                        'total_products': len(data)
-                    },
-                    'products': data
-                }
-                # Save in new format
-                self.save_database(converted_data)
-                return converted_data
-            else:
-                # New format - validate structure
-                if 'products' not in data:
-                    data['products'] = []
-                if 'metadata' not in data:
-                    data['metadata'] = {
-                        'version': '3.0-universal',
-                        'created': datetime.now().isoformat(),
-                        'last_updated': datetime.now().isoformat(),
-                        'total_products': len(data['products'])
-                    }
-                return data
+            return self.backend.load_document()
             
-        except json.JSONDecodeError as e:
-            print(f"❌ Database JSON error: {e}")
-            self.create_backup()
-            self.initialize_database()
-            return self.load_database()
         except Exception as e:
             print(f"❌ Database load error: {e}")
             return {'metadata': {}, 'products': []}
@@ -134,96 +171,142 @@ class ProductDatabase:
     def save_database(self, data):
         """Save complete database with backup"""
         try:
-            # Create backup before saving (but only if file exists and has content)
-            if os.path.exists(self.database_file) and os.path.getsize(self.database_file) > 0:
-                self.create_backup()
-            
-            # Update metadata
-            if 'metadata' not in data:
-                data['metadata'] = {}
-            data['metadata']['last_updated'] = datetime.now().isoformat()
-            data['metadata']['total_products'] = len(data.get('products', []))
-            
-            # Save to file
-            with open(self.database_file, 'w', encoding='utf-8') as f:
-                json.dump(data, f, indent=2, ensure_ascii=False)
-            
-            return True
+            success = self.backend.write_document(data)
+            if success:
+                self.record_write()
+            return success
             
         except Exception as e:
             print(f"❌ Database save error: {e}")
             return False
     
+    def get_cache_stats(self):
+        """Get read cache hit/miss counters from the storage backend"""
+        return self.backend.cache_stats()
+    
     def load_products(self):
         """Load only the products array"""
-        database = self.load_database()
-        products = database.get('products', [])
+        try:
+            products = self.backend.list_products()
+        except Exception as e:
+            print(f"❌ Database load error: {e}")
+            products = []
         print(f"✅ Loaded {len(products)} products from database")
         return products
     
     def save_products(self, products):
         """Save products array to database"""
-        database = self.load_database()
-        database['products'] = products
-        return self.save_database(database)
+        with self.backend.write_lock:
+            database = self.load_database()
+            database['products'] = products
+            return self.save_database(database)
     
     def add_products(self, new_products):
         """Add new products to database"""
         if not new_products:
             return False
         
-        database = self.load_database()
-        existing_urls = {product.get('url', '') for product in database['products']}
-        
-        added_count = 0
-        for product in new_products:
-            product_url = product.get('url', '')
-            if product_url and product_url not in existing_urls:
-                # Add metadata for new product
-                product['added_to_database'] = datetime.now().isoformat()
-                product['database_version'] = '3.0-universal'
-                
-                database['products'].append(product)
-                existing_urls.add(product_url)
-                added_count += 1
-        
-        if added_count > 0:
-            success = self.save_database(database)
-            if success:
-                print(f"✅ Added {added_count} new products to database")
-            return success
-        else:
-            print("ℹ️ No new products to add (all duplicates)")
-            return True
+        # Hold the write lock so the duplicate check and the insert see the same data
+        with self.backend.write_lock:
+            try:
+                existing_urls = self.backend.get_urls()
+            except Exception as e:
+                print(f"❌ Database load error: {e}")
+                return False
+            
+            products_to_add = []
+            for product in new_products:
+                product_url = product.get('url', '')
+                if product_url and product_url not in existing_urls:
+                    # Add metadata for new product
+                    product['added_to_database'] = datetime.now().isoformat()
+                    product['database_version'] = DATABASE_VERSION
+                    
+                    products_to_add.append(product)
+                    existing_urls.add(product_url)
+            
+            if products_to_add:
+                try:
+                    # Stable ids (URL hash) so callers never have to address products by list position
+                    assign_product_ids(products_to_add, self.backend.id_index().keys())
+                    success = self.backend.insert_products(products_to_add)
+                except Exception as e:
+                    print(f"❌ Database save error: {e}")
+                    success = False
+                if success:
+                    self.record_write(len(products_to_add))
+                    self.index_products(products_to_add)
+                    print(f"✅ Added {len(products_to_add)} new products to database")
+                return success
+            else:
+                print("ℹ️ No new products to add (all duplicates)")
+                return True
     
     def get_existing_products(self, scrape_source=None):
         """Get existing product URLs, optionally filtered by source"""
-        products = self.load_products()
-        
-        if scrape_source:
-            # Filter by specific scrape source
-            filtered_products = [p for p in products if p.get('scrape_source') == scrape_source]
-            urls = {product.get('url', '') for product in filtered_products if product.get('url')}
-        else:
-            # All products
-            urls = {product.get('url', '') for product in products if product.get('url')}
-        
-        return urls
+        try:
+            return self.backend.get_urls(scrape_source)
+        except Exception as e:
+            print(f"❌ Database load error: {e}")
+            return set()
+    
+    def product_exists(self, url, scrape_source=None):
+        """Check whether a product URL is already stored, optionally filtered by source"""
+        try:
+            return self.backend.has_url(url, scrape_source)
+        except Exception as e:
+            print(f"❌ Database load error: {e}")
+            return False
     
     def delete_product(self, product_index):
         """Delete a product by index"""
         try:
-            database = self.load_database()
-            products = database['products']
+            deleted_product = self.backend.delete_at(product_index)
             
-            if 0 <= product_index < len(products):
-                deleted_product = products.pop(product_index)
-                success = self.save_database(database)
+            if deleted_product is not None:
+                self.record_write()
+                self.unindex_product(deleted_product)
+                return True, deleted_product
+            else:
+                return False, None
                 
-                if success:
-                    return True, deleted_product
-                else:
-                    return False, None
+        except Exception as e:
+            print(f"❌ Delete product error: {e}")
+            return False, None
+    
+    def update_product(self, product_index, updates):
+        """Update fields of a product by index"""
+        try:
+            updated_product = self.backend.update_at(product_index, updates)
+            
+            if updated_product is not None:
+                self.record_write()
+                self.index_products([updated_product])
+                return True, updated_product
+            else:
+                return False, None
+                
+        except Exception as e:
+            print(f"❌ Update product error: {e}")
+            return False, None
+    
+    def get_product(self, product_id):
+        """Get a product by its stable id"""
+        try:
+            return self.backend.get_by_id(product_id)
+        except Exception as e:
+            print(f"❌ Database load error: {e}")
+            return None
+    
+    def delete_product_by_id(self, product_id):
+        """Delete a product by its stable id"""
+        try:
+            deleted_product = self.backend.delete_by_id(product_id)
+            
+            if deleted_product is not None:
+                self.record_write()
+                self.unindex_product(deleted_product)
+                return True, deleted_product
             else:
                 return False, None
                 
@@ -231,20 +314,49 @@ class ProductDatabase:
             print(f"❌ Delete product error: {e}")
             return False, None
     
+    def update_product_by_id(self, product_id, updates):
+        """Update fields of a product by its stable id"""
+        try:
+            updated_product = self.backend.update_by_id(product_id, updates)
+            
+            if updated_product is not None:
+                self.record_write()
+                self.index_products([updated_product])
+                return True, updated_product
+            else:
+                return False, None
+                
+        except Exception as e:
+            print(f"❌ Update product error: {e}")
+            return False, None
+    
+    def update_products_by_id(self, updates_by_id):
+        """Update several products in one write - {product_id: updates}, returns the updated products"""
+        if not updates_by_id:
+            return []
+        try:
+            updated_products = self.backend.update_many_by_id(updates_by_id)
+            
+            if updated_products:
+                self.record_write(len(updated_products))
+                self.index_products(updated_products)
+            return updated_products
+            
+        except Exception as e:
+            print(f"❌ Update products error: {e}")
+            return []
+    
     def get_products_by_site(self, domain):
         """Get products from a specific site domain"""
-        products = self.load_products()
-        site_products = []
-        
-        for product in products:
-            product_domain = product.get('domain', '')
-            if product_domain == domain:
-                site_products.append(product)
-            elif not product_domain and domain in product.get('url', ''):
-                # Fallback for older products without domain field
-                site_products.append(product)
-        
-        return site_products
+        return self.backend.get_by_domain(domain)
+    
+    def find_products_by_image_hash(self, sha256):
+        """Products using the stored image with this content hash (their image_hashes)"""
+        try:
+            return [p for p in self.backend.list_products() if sha256 in (p.get('image_hashes') or {}).values()]
+        except Exception as e:
+            print(f"❌ Database load error: {e}")
+            return []
     
     def show_database_stats(self):
         """Display comprehensive database statistics"""
@@ -304,17 +416,46 @@ class ProductDatabase:
         print("=" * 50)
     
     def search_products(self, query, field='title'):
-        """Search products by a specific field"""
-        products = self.load_products()
-        query_lower = query.lower()
+        """Search products by a specific field (substring match)"""
+        return self.backend.search(query, field)
+    
+    def index_products(self, products):
+        """Add or refresh products in the search index (no-op until the index is first used)"""
+        if self._search_synced:
+            self.search_index.add_many(products)
+    
+    def unindex_product(self, product):
+        if self._search_synced and product.get('id'):
+            self.search_index.remove(product['id'])
+    
+    def sync_search_index(self):
+        """Pick up changes made outside this process (or by full saves) since the last search"""
+        token = self.backend.change_token()
+        if self._search_synced and token is not None and token == self._search_token:
+            return 0
+        changed = self.search_index.sync(self.backend.list_products())
+        self._search_token = token
+        self._search_synced = True
+        return changed
+    
+    def search(self, query, domain=None, scrape_source=None, limit=20, offset=0):
+        """Ranked full-text search over title, description, category and SKU
         
-        results = []
-        for i, product in enumerate(products):
-            field_value = product.get(field, '')
-            if isinstance(field_value, str) and query_lower in field_value.lower():
-                results.append((i, product))
+        Returns (total_matches, [(product, score), ...]) for the requested page
+        """
+        try:
+            self.sync_search_index()
+            total, page = self.search_index.search(query, domain, scrape_source, limit, offset)
+        except Exception as e:
+            print(f"❌ Search error: {e}")
+            return 0, []
         
-        return results
+        results = []
+        for product_id, score in page:
+            product = self.backend.get_by_id(product_id)
+            if product is not None:
+                results.append((product, score))
+        return total, results
     
     def get_database_health(self):
         """Check database health and integrity"""
@@ -365,7 +506,8 @@ class ProductDatabase:
                 'total_products': len(products),
                 'duplicate_urls': duplicate_urls,
                 'missing_folders': missing_folders,
-                'database_size_mb': os.path.getsize(self.database_file) / (1024*1024)
+                'database_size_mb': self.backend.size_bytes() / (1024*1024),
+                'cache': self.get_cache_stats()
             }
             
         except Exception as e:
@@ -3,17 +3,30 @@ Enhanced Image Processor - FIXED to Only Get Main Product Images
 Prevents all types of duplicates and excludes related product images
 """
 
-import requests
 import os
-import time
 import re
 from urllib.parse import urlparse
+from extraction_engine import ExtractionEngine
+from http_client import HttpClient
+from image_fetcher import ImageFetcher
+from image_store import ImageStore
+from site_profiles import get_registry
 
 class EnhancedImageProcessor:
-    def __init__(self, headers=None):
+    def __init__(self, headers=None, rate_limiter=None, http_client=None, image_fetcher=None, image_store=None):
         self.headers = headers or {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
+        # Optional scrape_pipeline.HostRateLimiter - paces downloads per site instead of sleeping
+        self.rate_limiter = rate_limiter
+        self.http = http_client or HttpClient(self.headers)
+        # Parallel streaming downloads (shared with the scraper when passed in)
+        self.fetcher = image_fetcher or ImageFetcher(self.http, rate_limiter)
+        # Content-addressed image storage - each image is kept once, product folders link to it
+        self.store = image_store or ImageStore()
+        # Gallery selectors live in the engine's rule table ('gallery_images')
+        self.engine = ExtractionEngine()
+        self.site_profiles = get_registry()
         print("✓ Enhanced image processor loaded - no duplicates")
     
     def extract_image_urls(self, soup, base_url):
@@ -23,19 +36,7 @@ class EnhancedImageProcessor:
         seen_base_names = set()
         
         print("  Extracting images with enhanced duplicate prevention...")
-        
-        # FIXED: Product-specific selectors only (no broad selectors)
-        main_product_selectors = [
-            '.woocommerce-product-gallery img',           # Main product gallery
-            '.product-images img',                        # Theme-specific main gallery
-            'img[data-large_image]',                      # WooCommerce large images
-            '.wp-post-image',                             # WordPress featured image
-            '.attachment-woocommerce_single img',         # WooCommerce single product
-            'img[data-zoom-image]',                       # Zoom plugin images
-            '.flex-viewport img',                         # Flexible slider main images
-            '.product-image-main img',                    # Main product image container
-            '#product-images img'                         # Product images by ID
-        ]
+        profile = self.site_profiles.for_url(base_url)
         
         # Containers to EXCLUDE (related products, recommendations)
         excluded_containers = [
@@ -55,40 +56,41 @@ class EnhancedImageProcessor:
             '.footer'
         ]
         
-        for selector in main_product_selectors:
-            for img in soup.select(selector):
-                # FIXED: Check if image is in excluded container
-                if self.is_in_excluded_container(img, excluded_containers):
+        # FIXED: Product-specific selectors only (no broad selectors) - all matched in one pass
+        gallery_images = self.engine.extract(soup, fields=['gallery_images'])['gallery_images']
+        for img in gallery_images:
+            # FIXED: Check if image is in excluded container
+            if self.is_in_excluded_container(img, excluded_containers):
+                continue
+            
+            # Try multiple attributes for image URL
+            found_url = None
+            for attr in ['data-large_image', 'data-zoom-image', 'src', 'data-src', 'data-original']:
+                src = img.get(attr)
+                if src:
+                    src = self.clean_image_url(src, profile)
+                    
+                    if src and self.is_valid_image_url(src, profile):
+                        found_url = src
+                        break
+            
+            if found_url:
+                # Enhanced duplicate prevention
+                if found_url in seen_urls:
                     continue
                 
-                # Try multiple attributes for image URL
-                found_url = None
-                for attr in ['data-large_image', 'data-zoom-image', 'src', 'data-src', 'data-original']:
-                    src = img.get(attr)
-                    if src:
-                        src = self.clean_image_url(src)
-                        
-                        if src and self.is_valid_image_url(src):
-                            found_url = src
-                            break
+                # Check for size variations
+                base_name = self.get_image_base_name(found_url)
+                if base_name in seen_base_names:
+                    # Replace with larger image if current is bigger
+                    self.replace_with_larger_image(found_url, images, seen_urls)
+                    continue
                 
-                if found_url:
-                    # Enhanced duplicate prevention
-                    if found_url in seen_urls:
-                        continue
-                    
-                    # Check for size variations
-                    base_name = self.get_image_base_name(found_url)
-                    if base_name in seen_base_names:
-                        # Replace with larger image if current is bigger
-                        self.replace_with_larger_image(found_url, images, seen_urls)
-                        continue
-                    
-                    # Add to collections
-                    images.append(found_url)
-                    seen_urls.add(found_url)
-                    seen_base_names.add(base_name)
-        
+                # Add to collections
+                images.append(found_url)
+                seen_urls.add(found_url)
+                seen_base_names.add(base_name)
+    
         print(f"  Found {len(images)} unique images after duplicate filtering")
         return images
     
@@ -166,17 +168,16 @@ class EnhancedImageProcessor:
                     print(f"    Replaced with larger version: {new_base}")
                 break
     
-    def clean_image_url(self, url):
-        """Clean and normalize image URL"""
+    def clean_image_url(self, url, profile=None):
+        """Clean and normalize image URL - relative URLs resolve against the site's base URL"""
         if not url:
             return None
         
-        # Handle protocol-relative URLs
-        if url.startswith('//'):
+        # Handle protocol-relative and relative URLs
+        if profile:
+            url = profile.absolute_url(url)
+        elif url.startswith('//'):
             url = 'https:' + url
-        # Handle relative URLs
-        elif url.startswith('/'):
-            url = 'https://ineedhemp.com' + url
         
         # Remove query parameters
         if '?' in url:
@@ -184,8 +185,8 @@ class EnhancedImageProcessor:
         
         return url
     
-    def is_valid_image_url(self, url):
-        """Validate image URL with stricter filtering"""
+    def is_valid_image_url(self, url, profile=None):
+        """Validate image URL with stricter filtering - exclusions and image hosts come from the site profile"""
         if not url:
             return False
         
@@ -194,34 +195,22 @@ class EnhancedImageProcessor:
         if not any(ext in url.lower() for ext in valid_extensions):
             return False
         
-        # Exclude unwanted images (more comprehensive)
-        exclude_terms = [
-            'logo', 'favicon', 'placeholder', 'loading', 'spinner', 
-            'icon', 'badge', 'social', 'payment', 'shipping',
-            'security', 'guarantee', 'arrow', 'button'
-        ]
-        
-        url_lower = url.lower()
-        if any(term in url_lower for term in exclude_terms):
-            return False
-        
-        # Must be from the main domain
-        if 'ineedhemp.com' not in url:
-            return False
-        
-        # Exclude very small images
-        if any(size in url for size in ['-50x50', '-100x100', '-75x75', '-25x25', '-150x150']):
-            return False
-        
-        return True
+        # Unwanted images (logos, icons, thumbnails) and images from other hosts
+        profile = profile or self.site_profiles.for_url(url)
+        return bool(profile) and profile.is_valid_image_url(url)
     
-    def download_images(self, image_urls, images_folder):
-        """Download images with comprehensive duplicate checking"""
+    def download_images(self, image_urls, images_folder, first_index=1):
+        """Download images with comprehensive duplicate checking
+        
+        Files are named image_<first_index + position> - refreshes pass the next free number.
+        Images go through the image store: URLs it already holds aren't downloaded again, and
+        images identical to (or looking the same as) one the product already has are skipped.
+        """
         downloaded = []
         
         # Check existing images
         existing_files = {}
-        existing_sizes = {}
+        kept = {}
         
         if os.path.exists(images_folder):
             for filename in os.listdir(images_folder):
@@ -230,60 +219,84 @@ class EnhancedImageProcessor:
                     existing_files[filename] = filepath
                     
                     try:
-                        file_size = os.path.getsize(filepath)
-                        existing_sizes[file_size] = filepath
-                    except:
+                        entry = self.store.entry_for_path(filepath)
+                        if entry:
+                            kept[filepath] = entry
+                    except Exception:
                         pass
         
         print(f"  Downloading {len(image_urls)} unique images...")
         
+        plan = []
         for i, url in enumerate(image_urls):
-            try:
-                # Generate filename
-                ext = 'jpg'
-                if url.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.gif')):
-                    ext = url.split('.')[-1].lower().split('?')[0]
-                
-                filename = f"image_{i+1}.{ext}"
-                filepath = os.path.join(images_folder, filename)
-                
-                # Skip if exists
-                if filename in existing_files:
-                    print(f"    Skipped existing: {filename}")
-                    downloaded.append(existing_files[filename])
-                    continue
-                
-                # Download
-                response = requests.get(url, timeout=15, headers=self.headers)
-                response.raise_for_status()
-                
-                content_size = len(response.content)
-                
-                # Skip tiny images
-                if content_size < 2000:
+            # Generate filename
+            ext = 'jpg'
+            if url.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.gif')):
+                ext = url.split('.')[-1].lower().split('?')[0]
+            
+            filename = f"image_{first_index + i}.{ext}"
+            plan.append((i, url, filename, os.path.join(images_folder, filename)))
+        
+        # Images the store already has from these URLs are linked in instead of downloaded
+        stored = {}
+        for i, url, filename, filepath in plan:
+            if filename not in existing_files:
+                try:
+                    entry = self.store.lookup_url(url)
+                    if entry:
+                        self.store.place(entry, filepath)
+                        stored[filename] = entry
+                except Exception as e:
+                    # Downloaded again below
+                    print(f"    Stored image unavailable for image {i+1}: {e}")
+        
+        # Download the rest in parallel - tiny images are refused from their headers
+        downloads = [(url, filepath) for i, url, filename, filepath in plan
+                     if filename not in existing_files and filename not in stored]
+        results = iter(self.fetcher.fetch_all(downloads, min_bytes=2000))
+        
+        # Then apply the duplicate checks in source order
+        for i, url, filename, filepath in plan:
+            # Skip if exists
+            if filename in existing_files:
+                print(f"    Skipped existing: {filename}")
+                downloaded.append(existing_files[filename])
+                continue
+            
+            entry = stored.get(filename)
+            if entry is None:
+                result = next(results)
+                content_size = result['size']
+                if result['status'] == 'tiny':
                     print(f"    Skipped tiny image: {filename} ({content_size} bytes)")
                     continue
-                
-                # Check for duplicate content by size
-                if content_size in existing_sizes:
-                    print(f"    Skipped duplicate content: {filename}")
-                    downloaded.append(existing_sizes[content_size])
+                if result['status'] != 'downloaded':
+                    print(f"    Failed image {i+1}: {result['error'] or result['status']}")
                     continue
+            
+            try:
+                if entry is None:
+                    entry = self.store.add(filepath, url)
                 
-                # Save image
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                
-                downloaded.append(filepath)
-                existing_files[filename] = filepath
-                existing_sizes[content_size] = filepath
-                
-                print(f"    Downloaded: {filename} ({content_size} bytes)")
-                time.sleep(0.3)
-                
+                # Check for duplicate content by hash, and for the same picture at another size
+                status, path = self.store.dedupe(entry, filepath, kept)
             except Exception as e:
                 print(f"    Failed image {i+1}: {e}")
                 continue
+            if status == 'duplicate':
+                print(f"    Skipped duplicate content: {filename}")
+                continue
+            if status == 'near_duplicate':
+                print(f"    Skipped near-duplicate: {filename} (kept {os.path.basename(path)})")
+                continue
+            
+            downloaded.append(filepath)
+            existing_files[filename] = filepath
+            
+            if filename in stored:
+                print(f"    Linked stored image: {filename} ({entry['size']} bytes)")
+            else:
+                print(f"    Downloaded: {filename} ({content_size} bytes)")
         
         print(f"✓ Enhanced image processing prevented duplicates")
         print(f"  Downloaded {len(downloaded)} total images")
@@ -0,0 +1,454 @@
+"""
+Extraction Engine - Single-pass product field extraction from WooCommerce pages
+Parses each page once (lxml when installed), precompiles every selector in a declarative
+per-site rule table and resolves all fields from one traversal of the document
+"""
+import re
+import sys
+import time
+
+import soupsieve
+from bs4 import BeautifulSoup
+
+try:
+    import lxml  # noqa: F401
+    LXML_AVAILABLE = True
+except ImportError:
+    LXML_AVAILABLE = False
+
+HTML_PARSER = 'lxml' if LXML_AVAILABLE else 'html.parser'
+
+# Field rules, tried selector by selector in priority order. 'match' is 'first' (only the first
+# element a selector matches is considered, like select_one) or 'all'. 'text' is how an element's
+# text is read: 'plain' (get_text().strip()), 'joined' (get_text(strip=True)) or 'spaced'
+# (get_text(' ', strip=True)). A value is accepted when it passes min_length, reject (substrings),
+# reject_exact and require_any. Rules with 'attrs' collect the first attribute present on every
+# match; rules with 'elements' return the matched elements themselves.
+DEFAULT_RULES = {
+    'title': {
+        'selectors': ['h1.product_title', 'h1.entry-title', 'h1.product-title', '.product_title', 'h1', '.page-title h1'],
+        'match': 'first', 'text': 'plain', 'min_length': 3,
+        'reject': ['error', '404', 'not found', 'page not found'],
+        'default': None
+    },
+    'description': {
+        'selectors': [
+            '#tab-description',
+            '.woocommerce-Tabs-panel--description',
+            '.panel.entry-content',
+            '.wc-tab#tab-description',
+            'div[id*="description"] .panel',
+            '.product-description .entry-content',
+            '.woocommerce-product-details__description',
+            '.product-details-description',
+            '.product-content .entry-content',
+            '.single-product-summary .entry-content',
+            '.product-tabs .description .panel',
+            '.tab-content .description',
+            '[role="tabpanel"][id*="description"]',
+            '.product-description-content',
+            '.woocommerce-product-details .entry-content'
+        ],
+        'match': 'first', 'text': 'spaced', 'min_length': 51,
+        'reject': ['lorem ipsum', 'placeholder', 'test content'],
+        'default': None
+    },
+    'short_description': {
+        'selectors': [
+            'div.woocommerce-product-details__short-description',
+            '.product-description',
+            '.entry-summary .woocommerce-product-details__short-description',
+            '.product-short-description',
+            '.summary .woocommerce-product-details__short-description p'
+        ],
+        'match': 'first', 'text': 'joined', 'min_length': 21,
+        'default': "Premium quality product"
+    },
+    'price': {
+        'selectors': ['.price .woocommerce-Price-amount', '.price .amount', '.price', '.product-price',
+                      '.woocommerce-Price-amount bdi', 'span.woocommerce-Price-amount'],
+        'match': 'first', 'text': 'joined', 'require_any': ['$', '€', '£'],
+        'default': "Contact for pricing"
+    },
+    'category': {
+        'selectors': ['.woocommerce-breadcrumb a', '.breadcrumb a', '.product_meta .posted_in a'],
+        'match': 'all', 'text': 'joined', 'reject_exact': ['home', 'shop', 'products'],
+        'default': "Uncategorized"
+    },
+    'sku': {
+        'selectors': ['.sku', '.product_meta .sku', '[data-sku]'],
+        'match': 'first', 'text': 'joined', 'reject_exact': ['n/a'],
+        'default': None
+    },
+    'image_sources': {
+        'selectors': [
+            'img[data-large_image]',
+            'img.wp-post-image',
+            '.woocommerce-product-gallery img',
+            '.product-images img',
+            'img[data-src]',
+            'img[src*="product"]',
+            '.product-image img',
+            '.single-product-main-image img',
+            'figure.woocommerce-product-gallery__wrapper img'
+        ],
+        'attrs': ['data-large_image', 'data-src', 'src']
+    },
+    'gallery_images': {
+        'selectors': [
+            '.woocommerce-product-gallery img',
+            '.product-images img',
+            'img[data-large_image]',
+            '.wp-post-image',
+            '.attachment-woocommerce_single img',
+            'img[data-zoom-image]',
+            '.flex-viewport img',
+            '.product-image-main img',
+            '#product-images img'
+        ],
+        'elements': True
+    }
+}
+
+# Per-site overrides, merged over DEFAULT_RULES field by field,
+# e.g. {'tribeseedbank.com': {'price': {'selectors': ['.seed-price', '.price']}}}
+SITE_RULES = {}
+
+SIMPLE_SELECTOR = re.compile(r'^[\w\-#.\[\]="*^$ ]+$')
+COMPOUND_PART = re.compile(r'([#.])([\w-]+)|\[([\w-]+)(?:([*^$]?=)"([^"]*)")?\]|^([a-zA-Z][\w-]*)')
+
+def parse_compound(text):
+    """'img.wp-post-image[data-src]' -> (tag, id, classes, attribute tests), None if not a simple compound"""
+    tag, element_id, classes, attrs = None, None, [], []
+    position = 0
+    for match in COMPOUND_PART.finditer(text):
+        if match.start() != position:
+            return None
+        position = match.end()
+        marker, name, attr, operator, value, tag_name = match.groups()
+        if tag_name:
+            tag = tag_name.lower()
+        elif marker == '#':
+            element_id = name
+        elif marker == '.':
+            classes.append(name)
+        else:
+            attrs.append((attr, operator, value))
+    if position != len(text) or not text:
+        return None
+    return tag, element_id, frozenset(classes), tuple(attrs)
+
+def compound_matches(element, compound):
+    tag, element_id, classes, attrs = compound
+    if tag and element.name != tag:
+        return False
+    element_attrs = element.attrs
+    if element_id and element_attrs.get('id') != element_id:
+        return False
+    if classes:
+        element_classes = element_attrs.get('class') or ()
+        if isinstance(element_classes, str):
+            element_classes = element_classes.split()
+        if not classes.issubset(element_classes):
+            return False
+    for name, operator, value in attrs:
+        actual = element_attrs.get(name)
+        if actual is None:
+            return False
+        if operator is None:
+            continue
+        if isinstance(actual, list):
+            actual = ' '.join(actual)
+        if operator == '=' and actual != value:
+            return False
+        if operator == '*=' and (not value or value not in actual):
+            return False
+        if operator == '^=' and (not value or not actual.startswith(value)):
+            return False
+        if operator == '$=' and (not value or not actual.endswith(value)):
+            return False
+    return True
+
+def index_key(compound):
+    """The index bucket a compound's matches come from - its id, a class, an attribute or its tag"""
+    tag, element_id, classes, attrs = compound
+    if element_id:
+        return ('id', element_id)
+    if classes:
+        return ('class', sorted(classes)[0])
+    if attrs:
+        return ('attr', attrs[0][0])
+    if tag:
+        return ('tag', tag)
+    return ('all', None)
+
+class CompiledSelector:
+    """A selector compiled once - descendant chains of simple compounds are matched directly
+    against the page index, anything else goes through soupsieve"""
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.compiled = soupsieve.compile(selector)
+        self.compounds = None
+        if SIMPLE_SELECTOR.match(selector):
+            compounds = [parse_compound(part) for part in selector.split()]
+            if compounds and None not in compounds:
+                self.compounds = compounds
+        self.key = index_key(self.compounds[-1]) if self.compounds else ('all', None)
+
+    def match(self, element):
+        if self.compounds is None:
+            return self.compiled.match(element)
+        if not compound_matches(element, self.compounds[-1]):
+            return False
+        # Descendant combinators - match the remaining compounds right to left up the ancestors
+        remaining = len(self.compounds) - 2
+        parent = element.parent
+        while remaining >= 0 and parent is not None:
+            if parent.name != '[document]' and compound_matches(parent, self.compounds[remaining]):
+                remaining -= 1
+            parent = parent.parent
+        return remaining < 0
+
+    def all(self, index):
+        return [element for element in index.candidates(self.key) if self.match(element)]
+
+    def first(self, index):
+        for element in index.candidates(self.key):
+            if self.match(element):
+                return element
+        return None
+
+class PageIndex:
+    """Elements by tag, class, id and attribute name, in document order - built in one traversal"""
+
+    def __init__(self, soup, attrs=()):
+        self.elements = []
+        self.by_tag = {}
+        self.by_class = {}
+        self.by_id = {}
+        self.by_attr = {name: [] for name in attrs}
+
+        for element in soup.find_all(True):
+            self.elements.append(element)
+            self.by_tag.setdefault(element.name, []).append(element)
+            element_attrs = element.attrs
+            if not element_attrs:
+                continue
+            classes = element_attrs.get('class')
+            if classes:
+                if isinstance(classes, str):
+                    classes = classes.split()
+                for name in classes:
+                    self.by_class.setdefault(name, []).append(element)
+            element_id = element_attrs.get('id')
+            if element_id:
+                self.by_id.setdefault(element_id, []).append(element)
+            for name in element_attrs:
+                bucket = self.by_attr.get(name)
+                if bucket is not None:
+                    bucket.append(element)
+
+    def candidates(self, key):
+        kind, value = key
+        if kind == 'tag':
+            return self.by_tag.get(value, ())
+        if kind == 'class':
+            return self.by_class.get(value, ())
+        if kind == 'id':
+            return self.by_id.get(value, ())
+        if kind == 'attr' and value in self.by_attr:
+            return self.by_attr[value]
+        return self.elements
+
+class ScanIndex:
+    """Stand-in index that scans the whole document per selector (how fields used to be found)"""
+
+    def __init__(self, soup):
+        self.soup = soup
+
+def text_of(element, mode):
+    if mode == 'plain':
+        return element.get_text().strip()
+    if mode == 'spaced':
+        return element.get_text(separator=' ', strip=True)
+    return element.get_text(strip=True)
+
+def accepts(value, rule):
+    if not value or len(value) < rule.get('min_length', 1):
+        return False
+    lowered = value.lower()
+    if any(word in lowered for word in rule.get('reject', ())):
+        return False
+    if lowered in rule.get('reject_exact', ()):
+        return False
+    if 'require_any' in rule and not any(mark in value for mark in rule['require_any']):
+        return False
+    return True
+
+class ExtractionEngine:
+    """Resolves every field of a product page from one parse and one traversal
+
+    extract() returns {field: value} plus '<field>_selector' (the selector that produced it)
+    for the text fields.
+    """
+
+    def __init__(self, rules=None, site_rules=None):
+        self.rules = DEFAULT_RULES if rules is None else rules
+        self.site_rules = SITE_RULES if site_rules is None else site_rules
+        self._compiled = {}
+
+    def parse(self, content):
+        return BeautifulSoup(content, HTML_PARSER)
+
+    def rules_for(self, domain):
+        """Compiled rule table for a site (cached)"""
+        compiled = self._compiled.get(domain)
+        if compiled is None:
+            overrides = self.site_rules.get(domain, {})
+            compiled = {}
+            for field, rule in self.rules.items():
+                rule = dict(rule, **overrides.get(field, {}))
+                compiled[field] = (rule, [CompiledSelector(selector) for selector in rule['selectors']])
+            attrs = {selector.key[1] for rule, selectors in compiled.values()
+                     for selector in selectors if selector.key[0] == 'attr'}
+            self._compiled[domain] = compiled = (compiled, attrs)
+        return compiled
+
+    def extract(self, soup, domain=None, fields=None):
+        """Every field (or just fields) from a parsed page"""
+        compiled, attrs = self.rules_for(domain)
+        return self.resolve(compiled, PageIndex(soup, attrs), fields)
+
+    def extract_by_scanning(self, soup, domain=None, fields=None):
+        """Same rules, one full document scan per selector - reference for extract() and the benchmark"""
+        compiled, _ = self.rules_for(domain)
+        return self.resolve(compiled, ScanIndex(soup), fields)
+
+    def resolve(self, compiled, index, fields=None):
+        result = {}
+        for field in fields or compiled:
+            rule, selectors = compiled[field]
+            if 'attrs' in rule:
+                result[field] = self.attribute_values(rule, selectors, index)
+            elif rule.get('elements'):
+                result[field] = [element for selector in selectors for element in self.matches(selector, index, True)]
+            else:
+                result[field], result[field + '_selector'] = self.first_value(rule, selectors, index)
+        return result
+
+    def matches(self, selector, index, all_matches):
+        if isinstance(index, ScanIndex):
+            if all_matches:
+                return selector.compiled.select(index.soup)
+            element = selector.compiled.select_one(index.soup)
+            return [element] if element is not None else []
+        if all_matches:
+            return selector.all(index)
+        element = selector.first(index)
+        return [element] if element is not None else []
+
+    def first_value(self, rule, selectors, index):
+        all_matches = rule.get('match') == 'all'
+        for selector in selectors:
+            for element in self.matches(selector, index, all_matches):
+                value = text_of(element, rule.get('text'))
+                if accepts(value, rule):
+                    return value, selector.selector
+        return rule.get('default'), None
+
+    def attribute_values(self, rule, selectors, index):
+        """First present attribute of every matched element, in selector then document order"""
+        values = []
+        for selector in selectors:
+            for element in self.matches(selector, index, True):
+                for attr in rule['attrs']:
+                    value = element.get(attr)
+                    if value:
+                        values.append(value)
+                        break
+        return values
+
+def sample_product_page(related=24, gallery=6):
+    """A WooCommerce-sized single product page (theme chrome, gallery, tabs, related products)"""
+    nav = ''.join(f'<li class="menu-item menu-item-{i}"><a href="/product-category/c{i}/">Category {i}</a></li>'
+                  for i in range(60))
+    gallery_html = ''.join(
+        f'<div class="woocommerce-product-gallery__image"><a href="/wp-content/uploads/p-{i}.jpg">'
+        f'<img src="/wp-content/uploads/p-{i}-600x600.jpg" data-large_image="/wp-content/uploads/p-{i}.jpg" '
+        f'class="{"wp-post-image" if i == 0 else ""}" alt=""></a></div>' for i in range(gallery))
+    related_html = ''.join(
+        f'<li class="product type-product"><a href="/product/related-{i}/" class="woocommerce-loop-product__link">'
+        f'<img src="/wp-content/uploads/related-{i}-300x300.jpg" class="attachment-woocommerce_thumbnail">'
+        f'<h2 class="woocommerce-loop-product__title">Related {i}</h2><span class="price">'
+        f'<span class="woocommerce-Price-amount amount"><bdi>${i}.99</bdi></span></span></a></li>' for i in range(related))
+    paragraphs = ''.join(f'<p>Paragraph {i} of the full description with <strong>details</strong> about the product.</p>'
+                         for i in range(12))
+    return f'''<!DOCTYPE html><html><head><title>Sample Product</title>
+<script type="text/javascript">var wc_params = {{"ajax_url": "/wp-admin/admin-ajax.php"}};</script></head>
+<body class="product-template-default single single-product woocommerce">
+<header class="site-header"><nav class="main-navigation"><ul class="menu">{nav}</ul></nav></header>
+<div id="primary" class="content-area"><main id="main" class="site-main">
+<nav class="woocommerce-breadcrumb"><a href="/">Home</a> / <a href="/product-category/vapes/">Vapes</a> / Sample</nav>
+<div id="product-1" class="product type-product">
+<div class="woocommerce-product-gallery images"><figure class="woocommerce-product-gallery__wrapper">{gallery_html}</figure></div>
+<div class="summary entry-summary"><h1 class="product_title entry-title">Sample Vape Cartridge</h1>
+<p class="price"><span class="woocommerce-Price-amount amount"><bdi><span class="woocommerce-Price-currencySymbol">$</span>29.99</bdi></span></p>
+<div class="woocommerce-product-details__short-description"><p>A short description of the sample product.</p></div>
+<div class="product_meta"><span class="sku_wrapper">SKU: <span class="sku">SMP-001</span></span>
+<span class="posted_in">Category: <a href="/product-category/vapes/">Vapes</a></span></div></div>
+<div class="woocommerce-tabs wc-tabs-wrapper"><div class="woocommerce-Tabs-panel woocommerce-Tabs-panel--description panel entry-content wc-tab" id="tab-description" role="tabpanel">
+<h2>Description</h2>{paragraphs}</div></div>
+<section class="related products"><h2>Related products</h2><ul class="products columns-4">{related_html}</ul></section>
+</div></main></div>
+<footer class="site-footer footer"><div class="widget">Footer widgets</div></footer></body></html>'''
+
+def benchmark(pages, rounds=20):
+    """Old path (html.parser + one scan per selector) vs the engine, per page parse + extract"""
+    engine = ExtractionEngine()
+    for content in pages:
+        reference = engine.extract_by_scanning(BeautifulSoup(content, 'html.parser'))
+        indexed = engine.extract(BeautifulSoup(content, 'html.parser'))
+        assert reference == indexed, "Indexed extraction differs from the selector scan"
+
+    def timed(run):
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for content in pages:
+                run(content)
+        return (time.perf_counter() - started) / (rounds * len(pages)) * 1000
+
+    results = {
+        'scan (html.parser)': timed(lambda content: engine.extract_by_scanning(BeautifulSoup(content, 'html.parser'))),
+        f'engine ({HTML_PARSER})': timed(lambda content: engine.extract(engine.parse(content))),
+    }
+    soups = [BeautifulSoup(content, HTML_PARSER) for content in pages]
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for soup in soups:
+            engine.extract_by_scanning(soup)
+    scan_only = (time.perf_counter() - started) / (rounds * len(pages)) * 1000
+    started = time.perf_counter()
+    for _ in range(rounds):
+        for soup in soups:
+            engine.extract(soup)
+    extract_only = (time.perf_counter() - started) / (rounds * len(pages)) * 1000
+
+    print(f"Benchmark over {len(pages)} pages x {rounds} rounds (ms per page)")
+    for name, ms in results.items():
+        print(f"  parse + extract  {name:22} {ms:8.2f}")
+    print(f"  extract only     {'scan':22} {scan_only:8.2f}")
+    print(f"  extract only     {'engine':22} {extract_only:8.2f}  ({scan_only / extract_only:.1f}x)")
+    return results
+
+if __name__ == '__main__':
+    # Saved HTML fixtures (e.g. page cache bodies, gunzipped) as arguments, or a generated sample page
+    fixtures = []
+    for path in sys.argv[1:]:
+        with open(path, 'rb') as f:
+            fixtures.append(f.read())
+    if not fixtures:
+        fixtures = [sample_product_page(), sample_product_page(related=8, gallery=2)]
+    print(f"Parser: {HTML_PARSER}{'' if LXML_AVAILABLE else ' (install lxml for faster parsing)'}")
+    print(ExtractionEngine().extract(BeautifulSoup(fixtures[0], HTML_PARSER), fields=['title', 'price', 'sku', 'category']))
+    benchmark(fixtures)
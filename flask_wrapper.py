@@ -13,9 +13,13 @@ from functools import wraps
 import time
 
 # Import from utility modules
-from app_config import setup_app_paths, initialize_components, USERS
+from app_config import setup_app_paths, initialize_components, USERS, SCRAPE_MODES, PRERENDER_ENABLED
 from path_utils import normalize_image_path
 from database_manager import ProductDatabase
+from product_query import query_products
+from render_queue import RenderQueue
+from site_profiles import get_registry
+from response_utils import conditional_json, install_response_layer
 from auth_routes import setup_auth_routes
 
 # Initialize Flask app
@@ -23,39 +27,18 @@ app = Flask(__name__, template_folder='templates')
 CORS(app)
 app.secret_key = 'dreamz-social-media-marketing-hub-secret-key-2025'
 
+# gzip/brotli for large JSON, HTML and static text responses
+install_response_layer(app)
+
 # Setup authentication routes
 setup_auth_routes(app, USERS)
 
-# Setup paths and components
-setup_app_paths()
-scraper_module, instagram_generator_module = initialize_components()
-
-# Import Facebook generator
+# Components - loaded by create_app()
+scraper_module = None
+instagram_generator_module = None
 facebook_generator_module = None
-try:
-    import facebook_generator
-    print("✅ Facebook generator imported")
-    facebook_generator_module = facebook_generator
-except ImportError as e:
-    print(f"❌ Facebook generator import error: {e}")
-
-# Import Reddit generator
 reddit_generator_module = None
-try:
-    import reddit_generator
-    print("✅ Reddit generator imported")
-    reddit_generator_module = reddit_generator
-except ImportError as e:
-    print(f"❌ Reddit generator import error: {e}")
-
-# Import Twitter generator
 twitter_generator_module = None
-try:
-    import twitter_generator
-    print("✅ Twitter generator imported")
-    twitter_generator_module = twitter_generator
-except ImportError as e:
-    print(f"❌ Twitter generator import error: {e}")
 
 # Global scraping status
 scraping_status = {
@@ -67,13 +50,11 @@ scraping_status = {
 }
 
 def add_ultra_cache_busting_headers(response):
-    """Add ultra-aggressive cache busting headers"""
+    """Never cache review pages - every request regenerates the post"""
+    # no-store is enough on its own; a random ETag and 'Vary: *' only stopped proxies from compressing
     response.headers['Cache-Control'] = 'no-cache, no-store, must-revalidate, max-age=0'
     response.headers['Pragma'] = 'no-cache'
     response.headers['Expires'] = '0'
-    response.headers['Last-Modified'] = time.strftime('%a, %d %b %Y %H:%M:%S GMT')
-    response.headers['ETag'] = f'"{time.time()}"'
-    response.headers['Vary'] = '*'
     response.headers['X-Cache-Buster'] = str(time.time())
     return response
 
@@ -81,28 +62,22 @@ class WebAppWrapper:
     """Universal wrapper for web app functionality with multi-site support"""
     def __init__(self):
         self.current_products = []
+        # Stable product id -> record, so routes never act on a shifted list position
+        self.products_by_id = {}
         self.selected_product_index = None
+        self.selected_product_id = None
+        # Guards current_products/products_by_id against request threads and the scraper thread
+        self.lock = threading.RLock()
+        # Bumped whenever the served product list changes - feeds the /api/products ETag.
+        # The instance id keeps ETags from a previous server process from matching after a restart.
+        self.generation = 0
+        self.instance_id = os.urandom(8).hex()
         self.temp_folder = '/var/www/tools/temp_ads'
         self.database = ProductDatabase()
         
-        # Supported sites configuration
-        self.supported_sites = {
-            'ineedhemp': {
-                'name': 'iNeedHemp',
-                'domain': 'ineedhemp.com',
-                'base_url': 'https://ineedhemp.com'
-            },
-            'nicedreamz': {
-                'name': 'Nice Dreamz Wholesale', 
-                'domain': 'nicedreamzwholesale.com',
-                'base_url': 'https://nicedreamzwholesale.com'
-            },
-            'tribeseed': {
-                'name': 'Tribe Seed Bank',
-                'domain': 'tribeseedbank.com', 
-                'base_url': 'https://tribeseedbank.com'
-            }
-        }
+        # Supported sites configuration (site_profiles.json)
+        self.supported_sites = get_registry().supported_sites()
+        self.default_site = get_registry().default_key()
         
         os.makedirs(self.temp_folder, exist_ok=True)
         os.makedirs(os.path.join(self.temp_folder, 'instagram'), exist_ok=True)
@@ -112,6 +87,9 @@ class WebAppWrapper:
         
         self.load_products_data()
         
+        # Newly scraped products get their platform images rendered in the background
+        self.render_queue = RenderQueue(self.database, on_update=self.apply_updates) if PRERENDER_ENABLED else None
+        
         # Initialize Instagram generator
         try:
             if instagram_generator_module:
@@ -160,10 +138,11 @@ class WebAppWrapper:
 
     def load_products_data(self):
         """Load products with path normalization"""
-        self.current_products = self.database.load_products()
+        # Copies, so normalizing paths never touches the database's cached records
+        products = [dict(product) for product in self.database.load_products()]
         
         # Normalize all image paths
-        for product in self.current_products:
+        for product in products:
             if 'local_images' in product:
                 normalized_images = []
                 for image_path in product['local_images']:
@@ -176,13 +155,125 @@ class WebAppWrapper:
             for path_key in ['local_image', 'product_folder', 'images_folder']:
                 if path_key in product:
                     product[path_key] = normalize_image_path(product[path_key])
+        
+        with self.lock:
+            self.current_products = products
+            self.products_by_id = {p['id']: p for p in products if p.get('id')}
+            self.generation += 1
+            if self.selected_product_id not in self.products_by_id:
+                self.selected_product_id = None
+            self.selected_product_index = self.index_of(self.selected_product_id)
+
+    def apply_updates(self, updates_by_id):
+        """Merge fields written to the database ({product_id: updates}) into the served records"""
+        with self.lock:
+            for product_id, updates in updates_by_id.items():
+                product = self.products_by_id.get(product_id)
+                if product is not None:
+                    product.update(updates)
+            self.generation += 1
 
     def save_products_data(self):
         """Save products to database"""
-        return self.database.save_products(self.current_products)
+        with self.lock:
+            return self.database.save_products(list(self.current_products))
+
+    def etag_token(self):
+        """Changes whenever anything /api/products returns could have changed"""
+        return (self.instance_id, self.generation, self.selected_product_id)
+
+    def get_product(self, product_id):
+        """O(1) lookup by stable product id"""
+        return self.products_by_id.get(product_id)
+
+    def index_of(self, product_id):
+        """List position of a product id (for the legacy index-based API)"""
+        if product_id is None:
+            return None
+        with self.lock:
+            for i, product in enumerate(self.current_products):
+                if product.get('id') == product_id:
+                    return i
+        return None
+
+    def find_product(self, product_id=None, product_index=None):
+        """Resolve a product by id, falling back to a list index from older clients"""
+        if product_id:
+            return self.get_product(product_id)
+        with self.lock:
+            if product_index is not None and 0 <= product_index < len(self.current_products):
+                return self.current_products[product_index]
+        return None
+
+    def product_from_request(self, data):
+        """Resolve the product addressed by a JSON request body (product_id or product_index)"""
+        data = data or {}
+        product_index = data.get('product_index')
+        if product_index is not None:
+            try:
+                product_index = int(product_index)
+            except (TypeError, ValueError):
+                product_index = None
+        return self.find_product(data.get('product_id'), product_index)
+
+    def remove_product(self, product_id):
+        """Drop a product from the in-memory list and id index"""
+        with self.lock:
+            product = self.products_by_id.pop(product_id, None)
+            if product is not None:
+                self.current_products = [p for p in self.current_products if p is not product]
+                self.generation += 1
+            if self.selected_product_id == product_id:
+                self.selected_product_id = None
+            self.selected_product_index = self.index_of(self.selected_product_id)
+            return product
 
-# Global app instance
-web_app = WebAppWrapper()
+# Global app instance - built by create_app()
+web_app = None
+
+def create_app():
+    """Load the scraper and generator components and build the global WebAppWrapper, once"""
+    global scraper_module, instagram_generator_module, facebook_generator_module
+    global reddit_generator_module, twitter_generator_module, web_app
+    if web_app is not None:
+        return app
+    
+    # Setup paths and components
+    setup_app_paths()
+    scraper_module, instagram_generator_module = initialize_components()
+
+    # Import Facebook generator
+    try:
+        import facebook_generator
+        print("✅ Facebook generator imported")
+        facebook_generator_module = facebook_generator
+    except ImportError as e:
+        print(f"❌ Facebook generator import error: {e}")
+
+    # Import Reddit generator
+    try:
+        import reddit_generator
+        print("✅ Reddit generator imported")
+        reddit_generator_module = reddit_generator
+    except ImportError as e:
+        print(f"❌ Reddit generator import error: {e}")
+
+    # Import Twitter generator
+    try:
+        import twitter_generator
+        print("✅ Twitter generator imported")
+        twitter_generator_module = twitter_generator
+    except ImportError as e:
+        print(f"❌ Twitter generator import error: {e}")
+
+    # Global app instance
+    web_app = WebAppWrapper()
+    return app
+
+# Render worker processes (forkserver/spawn) re-import the main script as __mp_main__ - they
+# only need image_renderer, not a second copy of the app with its database and render queue
+if __name__ != '__mp_main__':
+    create_app()
 
 def login_required(f):
     @wraps(f)
@@ -195,25 +286,22 @@ def login_required(f):
 @app.route('/')
 @login_required
 def home():
-    return render_template('index.html')
+    return render_template('index.html', sites=web_app.supported_sites, default_site=web_app.default_site)
 
 @app.route('/instagram_review/<int:product_index>')
+@app.route('/instagram_review/id/<product_id>')
 @login_required
-def instagram_review(product_index):
-    if product_index >= len(web_app.current_products):
+def instagram_review(product_index=None, product_id=None):
+    product = web_app.find_product(product_id, product_index)
+    if product is None:
         return "Product not found", 404
     
-    product = web_app.current_products[product_index]
-    
     try:
         if not web_app.instagram_generator:
             return "Instagram generator not available", 500
             
         # FORCE FRESH GENERATION - no caching
-        post_data = web_app.instagram_generator.generate_instagram_post(
-            product_index,
-            web_app.current_products
-        )
+        post_data = web_app.instagram_generator.generate_instagram_post_for_product(product)
         
         if not post_data:
             return "Failed to generate Instagram post data", 500
@@ -226,6 +314,7 @@ def instagram_review(product_index):
                                                product=product,
                                                post_data=post_data,
                                                product_index=product_index,
+                                               product_id=product.get('id'),
                                                cache_buster=str(time.time())))
         
         # Ultra-aggressive cache busting
@@ -237,23 +326,20 @@ def instagram_review(product_index):
         return f"Error generating Instagram post: {e}", 500
 
 @app.route('/facebook_review/<int:product_index>')
+@app.route('/facebook_review/id/<product_id>')
 @login_required
-def facebook_review(product_index):
+def facebook_review(product_index=None, product_id=None):
     """Facebook review page"""
-    if product_index >= len(web_app.current_products):
+    product = web_app.find_product(product_id, product_index)
+    if product is None:
         return "Product not found", 404
     
-    product = web_app.current_products[product_index]
-    
     try:
         if not web_app.facebook_generator:
             return "Facebook generator not available", 500
             
         # FORCE FRESH GENERATION - no caching
-        post_data = web_app.facebook_generator.generate_facebook_post(
-            product_index,
-            web_app.current_products
-        )
+        post_data = web_app.facebook_generator.generate_facebook_post_for_product(product)
         
         if not post_data:
             return "Failed to generate Facebook post data", 500
@@ -266,6 +352,7 @@ def facebook_review(product_index):
                                                product=product,
                                                post_data=post_data,
                                                product_index=product_index,
+                                               product_id=product.get('id'),
                                                cache_buster=str(time.time())))
         
         # Ultra-aggressive cache busting
@@ -277,23 +364,20 @@ def facebook_review(product_index):
         return f"Error generating Facebook post: {e}", 500
 
 @app.route('/reddit_review/<int:product_index>')
+@app.route('/reddit_review/id/<product_id>')
 @login_required
-def reddit_review(product_index):
+def reddit_review(product_index=None, product_id=None):
     """Reddit review page"""
-    if product_index >= len(web_app.current_products):
+    product = web_app.find_product(product_id, product_index)
+    if product is None:
         return "Product not found", 404
     
-    product = web_app.current_products[product_index]
-    
     try:
         if not web_app.reddit_generator:
             return "Reddit generator not available", 500
             
         # FORCE FRESH GENERATION - no caching
-        post_data = web_app.reddit_generator.generate_reddit_post(
-            product_index,
-            web_app.current_products
-        )
+        post_data = web_app.reddit_generator.generate_reddit_post_for_product(product)
         
         if not post_data:
             return "Failed to generate Reddit post data", 500
@@ -306,6 +390,7 @@ def reddit_review(product_index):
                                                product=product,
                                                post_data=post_data,
                                                product_index=product_index,
+                                               product_id=product.get('id'),
                                                cache_buster=str(time.time())))
         
         # Ultra-aggressive cache busting
@@ -317,23 +402,20 @@ def reddit_review(product_index):
         return f"Error generating Reddit post: {e}", 500
 
 @app.route('/twitter_review/<int:product_index>')
+@app.route('/twitter_review/id/<product_id>')
 @login_required
-def twitter_review(product_index):
+def twitter_review(product_index=None, product_id=None):
     """Twitter review page"""
-    if product_index >= len(web_app.current_products):
+    product = web_app.find_product(product_id, product_index)
+    if product is None:
         return "Product not found", 404
     
-    product = web_app.current_products[product_index]
-    
     try:
         if not web_app.twitter_generator:
             return "Twitter generator not available", 500
             
         # FORCE FRESH GENERATION - no caching
-        post_data = web_app.twitter_generator.generate_twitter_post(
-            product_index,
-            web_app.current_products
-        )
+        post_data = web_app.twitter_generator.generate_twitter_post_for_product(product)
         
         if not post_data:
             return "Failed to generate Twitter post data", 500
@@ -346,6 +428,7 @@ def twitter_review(product_index):
                                                product=product,
                                                post_data=post_data,
                                                product_index=product_index,
+                                               product_id=product.get('id'),
                                                cache_buster=str(time.time())))
         
         # Ultra-aggressive cache busting
@@ -359,20 +442,83 @@ def twitter_review(product_index):
 @app.route('/api/products')
 @login_required
 def get_products():
-    return jsonify({
-        'products': web_app.current_products,
-        'selected_index': web_app.selected_product_index,
-        'total_count': len(web_app.current_products)
-    })
+    """List products - paginated/filtered/projected when query args are given, everything otherwise"""
+    with web_app.lock:
+        products = list(web_app.current_products)
+        etag_token = web_app.etag_token()
+        selected_index = web_app.selected_product_index
+        selected_id = web_app.selected_product_id
+    
+    if not request.args:
+        # Legacy full listing
+        return conditional_json(lambda: {
+            'products': products,
+            'selected_index': selected_index,
+            'selected_id': selected_id,
+            'total_count': len(products)
+        }, etag_token)
+    
+    def build_page():
+        result = query_products(products, request.args)
+        result['selected_index'] = selected_index
+        result['selected_id'] = selected_id
+        return result
+    
+    try:
+        return conditional_json(build_page, etag_token)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+
+@app.route('/api/products/<product_id>')
+@login_required
+def get_product(product_id):
+    """Full record for one product (the list view only ships a projection)"""
+    product = web_app.get_product(product_id)
+    if product is None:
+        return jsonify({'success': False, 'error': 'Product not found'}), 404
+    return conditional_json(lambda: {'success': True, 'product': product}, web_app.etag_token())
+
+@app.route('/api/search')
+@login_required
+def search_products():
+    """Ranked full-text search over title, description, category and SKU"""
+    query = request.args.get('q', '').strip()
+    if not query:
+        return jsonify({'success': False, 'error': 'No search query provided'}), 400
+
+    try:
+        limit = max(1, min(int(request.args.get('limit', 20)), 100))
+        offset = max(0, int(request.args.get('offset', 0)))
+    except ValueError:
+        return jsonify({'success': False, 'error': 'limit and offset must be numbers'}), 400
+
+    def build_results():
+        total, results = web_app.database.search(
+            query,
+            domain=request.args.get('domain') or None,
+            scrape_source=request.args.get('source') or None,
+            limit=limit,
+            offset=offset
+        )
+        return {
+            'success': True,
+            'query': query,
+            'total': total,
+            'offset': offset,
+            'limit': limit,
+            'results': [dict(product, search_score=round(score, 4)) for product, score in results]
+        }
+
+    return conditional_json(build_results, web_app.instance_id, web_app.database.backend.change_token())
 
 @app.route('/api/supported_sites')
 @login_required
 def get_supported_sites():
     """New API endpoint to get supported sites for UI"""
-    return jsonify({
+    return conditional_json(lambda: {
         'sites': web_app.supported_sites,
-        'default_site': 'ineedhemp'
-    })
+        'default_site': web_app.default_site
+    }, web_app.supported_sites)
 
 @app.route('/api/scraping_status')
 @login_required
@@ -387,8 +533,15 @@ def get_scraping_status():
             estimated_progress = min(95, (elapsed / expected) * 100)
             scraping_status['progress'] = max(scraping_status['progress'], estimated_progress)
     
+    if web_app.render_queue:
+        return jsonify(dict(scraping_status, prerender=web_app.render_queue.status()))
     return jsonify(scraping_status)
 
+def site_display_name(site):
+    if site == 'all':
+        return 'all sites'
+    return web_app.supported_sites.get(site, {}).get('name', site)
+
 def run_scraper_in_background(scraper_type, **kwargs):
     """Universal background scraper runner with site support"""
     global scraping_status
@@ -404,18 +557,20 @@ def run_scraper_in_background(scraper_type, **kwargs):
                 }
                 return
 
-            scraper = scraper_module.CleanProductScraper()
-            site = kwargs.get('site', 'ineedhemp')
+            scraper = scraper_module.CleanProductScraper(mode=kwargs.get('mode'))
+            site = kwargs.get('site', web_app.default_site)
+            # 'all' pulls the listing from every supported site (fetched concurrently in async mode)
+            sites = list(web_app.supported_sites) if site == 'all' else [site]
             
             if scraper_type == 'best_sellers':
-                urls = scraper.get_product_urls('best_sellers', 15, site)
-                site_name = web_app.supported_sites.get(site, {}).get('name', site)
+                urls = scraper.get_catalog_urls('best_sellers', sites, 15)
+                site_name = site_display_name(site)
                 scraping_status['message'] = f'Found {len(urls)} best sellers from {site_name}'
                 new_products = scraper.scrape_products(urls, f"Best Sellers from {site_name}")
                 
             elif scraper_type == 'featured':
-                urls = scraper.get_product_urls('featured', 20, site)
-                site_name = web_app.supported_sites.get(site, {}).get('name', site)
+                urls = scraper.get_catalog_urls('featured', sites, 20)
+                site_name = site_display_name(site)
                 scraping_status['message'] = f'Found {len(urls)} featured products from {site_name}'
                 new_products = scraper.scrape_products(urls, f"Featured Products from {site_name}")
                 
@@ -425,6 +580,30 @@ def run_scraper_in_background(scraper_type, **kwargs):
                 scraping_status['message'] = f'Processing custom URL: {url}'
                 new_products = scraper.scrape_products(urls, "Custom URL")
             
+            elif scraper_type == 'crawl':
+                target = kwargs.get('category', 'best_sellers')
+                scraping_status['message'] = f'Crawling all pages of {target}'
+                new_products = scraper.crawl_category(
+                    target, site, max_pages=kwargs.get('max_pages'), rewalk=kwargs.get('rewalk', False)
+                )
+            
+            elif scraper_type == 'refresh':
+                scraping_status['message'] = f'Checking products from {site_display_name(site)} for changes'
+                report = scraper.refresh_products(None if site == 'all' else sites)
+                web_app.load_products_data()
+                if web_app.render_queue:
+                    # Changed images or titles mean new renders - unchanged sources come from the render cache
+                    web_app.render_queue.submit([web_app.get_product(entry['id']) for entry in report['updated']])
+                scraping_status = {
+                    'active': False, 'progress': 100,
+                    'message': (f"Refresh complete! {len(report['updated'])} changed, "
+                                f"{report['unchanged']} unchanged, {len(report['failed'])} failed"),
+                    'start_time': None, 'expected_duration': 0,
+                    'refresh_report': report,
+                    'http_metrics': scraper.http.metrics.snapshot()
+                }
+                return
+            
             if new_products:
                 # Normalize paths in new products
                 for product in new_products:
@@ -440,13 +619,18 @@ def run_scraper_in_background(scraper_type, **kwargs):
                         if path_key in product:
                             product[path_key] = normalize_image_path(product[path_key])
                 
-                web_app.current_products.extend(new_products)
-                web_app.save_products_data()
+                # The scraper already added them to the database (with ids) - reload rather than
+                # rewriting the whole file from our in-memory copy
+                web_app.load_products_data()
+                
+                if web_app.render_queue:
+                    web_app.render_queue.submit([web_app.get_product(p['id']) for p in new_products if p.get('id')])
                 
                 scraping_status = {
                     'active': False, 'progress': 100,
                     'message': f'Complete! Scraped {len(new_products)} products',
-                    'start_time': None, 'expected_duration': 0
+                    'start_time': None, 'expected_duration': 0,
+                    'http_metrics': scraper.http.metrics.snapshot()
                 }
             else:
                 scraping_status = {
@@ -473,19 +657,22 @@ def scrape_best_sellers():
     import time
     
     data = request.get_json() or {}
-    site = data.get('site', 'ineedhemp')
+    site = data.get('site', web_app.default_site)
+    mode = data.get('mode')
     
-    # Validate site
-    if site not in web_app.supported_sites:
+    # Validate site ('all' = every supported site) and scrape mode
+    if site != 'all' and site not in web_app.supported_sites:
         return jsonify({'success': False, 'error': f'Unsupported site: {site}'}), 400
+    if mode and mode not in SCRAPE_MODES:
+        return jsonify({'success': False, 'error': f'Unsupported scrape mode: {mode}'}), 400
     
-    site_name = web_app.supported_sites[site]['name']
+    site_name = site_display_name(site)
     scraping_status = {
         'active': True, 'progress': 0,
         'message': f'Starting Best Sellers scraper for {site_name}...',
         'start_time': time.time(), 'expected_duration': 90
     }
-    run_scraper_in_background('best_sellers', site=site)
+    run_scraper_in_background('best_sellers', site=site, mode=mode)
     return jsonify({'success': True, 'message': f'Best sellers scraping started for {site_name}'})
 
 @app.route('/api/scrape_featured', methods=['POST'])
@@ -496,30 +683,88 @@ def scrape_featured():
     import time
     
     data = request.get_json() or {}
-    site = data.get('site', 'ineedhemp')
+    site = data.get('site', web_app.default_site)
+    mode = data.get('mode')
     
-    # Validate site
-    if site not in web_app.supported_sites:
+    # Validate site ('all' = every supported site) and scrape mode
+    if site != 'all' and site not in web_app.supported_sites:
         return jsonify({'success': False, 'error': f'Unsupported site: {site}'}), 400
+    if mode and mode not in SCRAPE_MODES:
+        return jsonify({'success': False, 'error': f'Unsupported scrape mode: {mode}'}), 400
     
-    site_name = web_app.supported_sites[site]['name']
+    site_name = site_display_name(site)
     scraping_status = {
         'active': True, 'progress': 0,
         'message': f'Starting Featured Products scraper for {site_name}...',
         'start_time': time.time(), 'expected_duration': 120
     }
-    run_scraper_in_background('featured', site=site)
+    run_scraper_in_background('featured', site=site, mode=mode)
     return jsonify({'success': True, 'message': f'Featured products scraping started for {site_name}'})
 
+@app.route('/api/crawl_category', methods=['POST'])
+@login_required
+def crawl_category():
+    """Crawl every page of a category listing (resumable) and scrape the new products"""
+    global scraping_status
+    
+    data = request.get_json() or {}
+    site = data.get('site', web_app.default_site)
+    category = data.get('category') or data.get('url') or 'best_sellers'
+    
+    if category.startswith('http'):
+        site_name = category
+    elif category in ('best_sellers', 'featured') and site in web_app.supported_sites:
+        site_name = web_app.supported_sites[site]['name']
+    else:
+        return jsonify({'success': False, 'error': f'Unsupported category or site: {category} / {site}'}), 400
+    
+    try:
+        max_pages = int(data['max_pages']) if data.get('max_pages') else None
+    except (TypeError, ValueError):
+        return jsonify({'success': False, 'error': 'max_pages must be a number'}), 400
+    
+    scraping_status = {
+        'active': True, 'progress': 0,
+        'message': f'Starting category crawl for {site_name}...',
+        'start_time': time.time(), 'expected_duration': 300
+    }
+    run_scraper_in_background('crawl', site=site, category=category, max_pages=max_pages,
+                              rewalk=bool(data.get('rewalk')))
+    return jsonify({'success': True, 'message': f'Category crawl started for {site_name}'})
+
+@app.route('/api/scrape_refresh', methods=['POST'])
+@login_required
+def scrape_refresh():
+    """Re-check already scraped products and update the ones that changed on the store"""
+    global scraping_status
+    
+    data = request.get_json() or {}
+    site = data.get('site', 'all')
+    
+    if site != 'all' and site not in web_app.supported_sites:
+        return jsonify({'success': False, 'error': f'Unsupported site: {site}'}), 400
+    
+    site_name = site_display_name(site)
+    scraping_status = {
+        'active': True, 'progress': 0,
+        'message': f'Starting refresh of products from {site_name}...',
+        'start_time': time.time(), 'expected_duration': 60
+    }
+    run_scraper_in_background('refresh', site=site)
+    return jsonify({'success': True, 'message': f'Refresh started for {site_name}'})
+
 @app.route('/api/scrape_custom', methods=['POST'])
 @login_required
 def scrape_custom():
     global scraping_status
     data = request.get_json()
     url = data.get('url', '')
+    mode = data.get('mode')
     
     if not url:
         return jsonify({'success': False, 'error': 'No URL provided'})
+    if mode and mode not in SCRAPE_MODES:
+        return jsonify({'success': False, 'error': f'Unsupported scrape mode: {mode}'}), 400
     
     import time
     scraping_status = {
@@ -527,7 +772,7 @@ def scrape_custom():
         'message': f'Starting custom URL scraper for: {url}',
         'start_time': time.time(), 'expected_duration': 30
     }
-    run_scraper_in_background('custom', url=url)
+    run_scraper_in_background('custom', url=url, mode=mode)
     return jsonify({'success': True, 'message': f'Custom URL scraping started: {url}'})
 
 @app.route('/api/generate_instagram', methods=['POST'])
@@ -537,15 +782,11 @@ def generate_instagram():
         if not web_app.instagram_generator:
             return jsonify({'error': 'Instagram generator not available'}), 500
             
-        data = request.get_json()
-        product_index = data.get('product_index', 0)
+        product = web_app.product_from_request(request.get_json())
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 400
         
-        if product_index >= len(web_app.current_products):
-            return jsonify({'error': 'Invalid product index'}), 400
-        
-        post_data = web_app.instagram_generator.generate_instagram_post(
-            product_index, web_app.current_products
-        )
+        post_data = web_app.instagram_generator.generate_instagram_post_for_product(product)
         
         if post_data:
             try:
@@ -573,15 +814,11 @@ def generate_facebook():
         if not web_app.facebook_generator:
             return jsonify({'error': 'Facebook generator not available'}), 500
             
-        data = request.get_json()
-        product_index = data.get('product_index', 0)
-        
-        if product_index >= len(web_app.current_products):
-            return jsonify({'error': 'Invalid product index'}), 400
+        product = web_app.product_from_request(request.get_json())
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 400
         
-        post_data = web_app.facebook_generator.generate_facebook_post(
-            product_index, web_app.current_products
-        )
+        post_data = web_app.facebook_generator.generate_facebook_post_for_product(product)
         
         if post_data:
             try:
@@ -609,15 +846,11 @@ def generate_reddit():
         if not web_app.reddit_generator:
             return jsonify({'error': 'Reddit generator not available'}), 500
             
-        data = request.get_json()
-        product_index = data.get('product_index', 0)
+        product = web_app.product_from_request(request.get_json())
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 400
         
-        if product_index >= len(web_app.current_products):
-            return jsonify({'error': 'Invalid product index'}), 400
-        
-        post_data = web_app.reddit_generator.generate_reddit_post(
-            product_index, web_app.current_products
-        )
+        post_data = web_app.reddit_generator.generate_reddit_post_for_product(product)
         
         if post_data:
             try:
@@ -645,15 +878,11 @@ def generate_twitter():
         if not web_app.twitter_generator:
             return jsonify({'error': 'Twitter generator not available'}), 500
             
-        data = request.get_json()
-        product_index = data.get('product_index', 0)
+        product = web_app.product_from_request(request.get_json())
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 400
         
-        if product_index >= len(web_app.current_products):
-            return jsonify({'error': 'Invalid product index'}), 400
-        
-        post_data = web_app.twitter_generator.generate_twitter_post(
-            product_index, web_app.current_products
-        )
+        post_data = web_app.twitter_generator.generate_twitter_post_for_product(product)
         
         if post_data:
             try:
@@ -677,41 +906,35 @@ def generate_twitter():
 @login_required
 def delete_product():
     try:
-        data = request.get_json()
-        product_index = data.get('product_index', 0)
+        product = web_app.product_from_request(request.get_json())
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 400
         
-        if 0 <= product_index < len(web_app.current_products):
-            deleted_product = web_app.current_products[product_index]
-            
-            import shutil
-            files_deleted = []
-            
-            # Delete product folder and contents
-            if 'product_folder' in deleted_product and deleted_product['product_folder']:
-                product_folder = deleted_product['product_folder']
-                if os.path.exists(product_folder):
-                    shutil.rmtree(product_folder)
-                    files_deleted.append(f"Folder: {product_folder}")
-            
-            # Remove from products list
-            web_app.current_products.pop(product_index)
-            
-            # Reset selection if needed
-            if web_app.selected_product_index == product_index:
-                web_app.selected_product_index = None
-            elif web_app.selected_product_index and web_app.selected_product_index > product_index:
-                web_app.selected_product_index -= 1
-            
-            web_app.save_products_data()
-            
-            return jsonify({
-                'success': True,
-                'deleted_product': deleted_product.get('title', 'Unknown'),
-                'remaining_products': len(web_app.current_products),
-                'files_deleted': files_deleted
-            })
-        else:
-            return jsonify({'error': 'Invalid product index'}), 400
+        product_id = product.get('id')
+        success, deleted_product = web_app.database.delete_product_by_id(product_id)
+        if not success:
+            return jsonify({'error': 'Product not found'}), 400
+        
+        import shutil
+        files_deleted = []
+        
+        # Delete product folder and contents
+        if 'product_folder' in product and product['product_folder']:
+            product_folder = product['product_folder']
+            if os.path.exists(product_folder):
+                shutil.rmtree(product_folder)
+                files_deleted.append(f"Folder: {product_folder}")
+        
+        # Remove from products list and id index (resets selection if needed)
+        web_app.remove_product(product_id)
+        
+        return jsonify({
+            'success': True,
+            'deleted_product': product.get('title', 'Unknown'),
+            'deleted_id': product_id,
+            'remaining_products': len(web_app.current_products),
+            'files_deleted': files_deleted
+        })
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -745,14 +968,18 @@ def clear_temp():
 @login_required
 def select_product():
     try:
-        data = request.get_json()
-        product_index = data.get('product_index', 0)
+        product = web_app.product_from_request(request.get_json())
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 400
         
-        if 0 <= product_index < len(web_app.current_products):
-            web_app.selected_product_index = product_index
-            return jsonify({'success': True, 'selected_index': product_index})
-        else:
-            return jsonify({'error': 'Invalid product index'}), 400
+        with web_app.lock:
+            web_app.selected_product_id = product.get('id')
+            web_app.selected_product_index = web_app.index_of(web_app.selected_product_id)
+        return jsonify({
+            'success': True,
+            'selected_index': web_app.selected_product_index,
+            'selected_id': web_app.selected_product_id
+        })
             
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -761,13 +988,10 @@ def select_product():
 @login_required
 def open_folder():
     try:
-        data = request.get_json()
-        product_index = data.get('product_index', 0)
-        
-        if product_index >= len(web_app.current_products):
-            return jsonify({'error': 'Invalid product index'}), 400
+        product = web_app.product_from_request(request.get_json())
+        if product is None:
+            return jsonify({'error': 'Product not found'}), 400
         
-        product = web_app.current_products[product_index]
         product_folder = product.get('product_folder', '')
         
         if not product_folder or not os.path.exists(product_folder):
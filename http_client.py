@@ -0,0 +1,139 @@
+"""
+HTTP Client - Shared pooled session for scraping
+Keep-alive connection pools per host, retries with exponential backoff + jitter (honoring Retry-After)
+and per-host request timing metrics
+"""
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+}
+
+# Transient failures worth retrying (rate limited / server errors)
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+def build_retry(retries, backoff_factor, backoff_jitter):
+    """urllib3 Retry policy - idempotent requests only, Retry-After respected"""
+    options = dict(
+        total=retries,
+        connect=retries,
+        read=retries,
+        status=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset(['GET', 'HEAD']),
+        respect_retry_after_header=True,
+        # Hand the last response back instead of raising, so callers keep using raise_for_status()
+        raise_on_status=False
+    )
+    try:
+        return Retry(backoff_jitter=backoff_jitter, **options)
+    except TypeError:
+        # urllib3 < 2.0 has no jitter option
+        return Retry(**options)
+
+class HttpMetrics:
+    """Per-host request counters and timings"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._hosts = {}
+
+    def record(self, host, elapsed, status=None, size=0, retries=0, error=False):
+        with self._lock:
+            stats = self._hosts.get(host)
+            if stats is None:
+                stats = self._hosts[host] = {
+                    'requests': 0, 'errors': 0, 'retries': 0, 'bytes': 0,
+                    'total_seconds': 0.0, 'max_seconds': 0.0, 'statuses': {}
+                }
+            stats['requests'] += 1
+            stats['retries'] += retries
+            stats['bytes'] += size
+            stats['total_seconds'] += elapsed
+            stats['max_seconds'] = max(stats['max_seconds'], elapsed)
+            if error:
+                stats['errors'] += 1
+            if status is not None:
+                stats['statuses'][status] = stats['statuses'].get(status, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            report = {}
+            for host, stats in self._hosts.items():
+                report[host] = dict(stats, statuses=dict(stats['statuses']))
+                report[host]['avg_seconds'] = round(stats['total_seconds'] / stats['requests'], 3)
+                report[host]['total_seconds'] = round(stats['total_seconds'], 3)
+                report[host]['max_seconds'] = round(stats['max_seconds'], 3)
+            return report
+
+    def reset(self):
+        with self._lock:
+            self._hosts.clear()
+
+class HttpClient:
+    """requests.Session with per-host keep-alive pools and retry/backoff - safe to share across threads"""
+
+    def __init__(self, headers=None, pool_size=10, retries=3, backoff_factor=0.5,
+                 backoff_jitter=0.5, timeout=20):
+        self.timeout = timeout
+        self.metrics = HttpMetrics()
+
+        self.session = requests.Session()
+        self.session.headers.update(headers or DEFAULT_HEADERS)
+
+        # pool_connections = hosts kept, pool_maxsize = open connections per host
+        adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=build_retry(retries, backoff_factor, backoff_jitter)
+        )
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+    def request(self, method, url, **kwargs):
+        kwargs.setdefault('timeout', self.timeout)
+        host = urlparse(url).netloc.lower()
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.metrics.record(host, time.perf_counter() - started, error=True)
+            raise
+
+        retry_state = getattr(response.raw, 'retries', None)
+        retries = len(retry_state.history) if retry_state is not None else 0
+        size = 0 if kwargs.get('stream') else len(response.content)
+        self.metrics.record(
+            host, time.perf_counter() - started, response.status_code, size, retries,
+            error=response.status_code >= 400
+        )
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def head(self, url, **kwargs):
+        return self.request('HEAD', url, **kwargs)
+
+    def close(self):
+        self.session.close()
+
+if __name__ == '__main__':
+    import sys
+
+    client = HttpClient()
+    for url in sys.argv[1:] or ['https://ineedhemp.com/']:
+        for _ in range(3):
+            try:
+                response = client.get(url)
+                print(f"{response.status_code} {url} ({len(response.content)} bytes, {response.elapsed.total_seconds():.3f}s)")
+            except requests.exceptions.RequestException as e:
+                print(f"❌ {url}: {e}")
+    print(client.metrics.snapshot())
@@ -0,0 +1,136 @@
+"""
+Image Fetcher - Concurrent streaming downloads for product images
+Images download in parallel (bounded per site), stream to disk in chunks through a temp file that
+is renamed into place when complete, and non-images / tiny files are refused from their headers
+"""
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app_config import IMAGE_DOWNLOAD_PER_HOST, IMAGE_DOWNLOAD_WORKERS, IMAGE_MAX_MB
+from scrape_pipeline import host_of
+
+CHUNK_SIZE = 64 * 1024
+
+class ImageFetcher:
+    """Shared download pool - every product's images go through the same workers and per-host slots
+
+    fetch()/fetch_all() return one result dict per image: url, path, size, error and status -
+    'downloaded', 'tiny', 'not_image', 'too_large' or 'failed'. Nothing is left at path unless
+    the download completed.
+    """
+
+    def __init__(self, http, rate_limiter=None, workers=IMAGE_DOWNLOAD_WORKERS, per_host=IMAGE_DOWNLOAD_PER_HOST,
+                 max_bytes=IMAGE_MAX_MB * 1024 * 1024, chunk_size=CHUNK_SIZE):
+        self.http = http
+        self.rate_limiter = rate_limiter
+        self.workers = max(1, workers)
+        self.per_host = max(1, per_host)
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        self._pool = None
+        self._lock = threading.Lock()
+        self._host_slots = {}
+
+    def host_slot(self, url):
+        host = host_of(url)
+        with self._lock:
+            slot = self._host_slots.get(host)
+            if slot is None:
+                slot = self._host_slots[host] = threading.BoundedSemaphore(self.per_host)
+            return slot
+
+    def pool(self):
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix='image')
+            return self._pool
+
+    def check_headers(self, response, min_bytes):
+        """Status for a response that can be refused before reading its body, else None"""
+        content_type = response.headers.get('Content-Type', '').lower()
+        if content_type and not content_type.startswith(('image/', 'application/octet-stream')):
+            return 'not_image'
+        length = response.headers.get('Content-Length', '')
+        # A compressed length says nothing about the image size
+        if length.isdigit() and not response.headers.get('Content-Encoding'):
+            if int(length) < min_bytes:
+                return 'tiny'
+            if int(length) > self.max_bytes:
+                return 'too_large'
+        return None
+
+    def fetch(self, url, filepath, min_bytes=0):
+        """Download one image to filepath"""
+        result = {'url': url, 'path': filepath, 'status': 'failed', 'size': 0, 'error': None}
+        temp_path = f"{filepath}.{os.getpid()}.{threading.get_ident()}.part"
+        try:
+            with self.host_slot(url):
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(url)
+                response = self.http.get(url, timeout=15, stream=True)
+                try:
+                    response.raise_for_status()
+                    refused = self.check_headers(response, min_bytes)
+                    if refused:
+                        result.update(status=refused, size=int(response.headers.get('Content-Length') or 0),
+                                      error=f"{refused.replace('_', ' ')} ({response.headers.get('Content-Type')})")
+                        return result
+
+                    size = 0
+                    with open(temp_path, 'wb') as f:
+                        for chunk in response.iter_content(self.chunk_size):
+                            size += len(chunk)
+                            if size > self.max_bytes:
+                                result.update(status='too_large', size=size, error=f"larger than {self.max_bytes} bytes")
+                                return result
+                            f.write(chunk)
+                finally:
+                    response.close()
+
+            result['size'] = size
+            if size < min_bytes:
+                result['status'] = 'tiny'
+                return result
+            os.replace(temp_path, filepath)
+            result['status'] = 'downloaded'
+        except Exception as e:
+            result['error'] = str(e)
+        finally:
+            if os.path.exists(temp_path):
+                try:
+                    os.remove(temp_path)
+                except OSError:
+                    pass
+        return result
+
+    def fetch_all(self, downloads, min_bytes=0):
+        """Download [(url, filepath)] concurrently, results in the same order"""
+        if len(downloads) <= 1:
+            return [self.fetch(url, filepath, min_bytes) for url, filepath in downloads]
+        futures = [self.pool().submit(self.fetch, url, filepath, min_bytes) for url, filepath in downloads]
+        return [future.result() for future in futures]
+
+    def close(self):
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=True)
+                self._pool = None
+
+if __name__ == '__main__':
+    import sys
+    import tempfile
+    import time
+    from http_client import HttpClient
+
+    urls = sys.argv[1:]
+    if not urls:
+        print("Usage: python image_fetcher.py <image url> [...]")
+        sys.exit(1)
+    fetcher = ImageFetcher(HttpClient())
+    folder = tempfile.mkdtemp(prefix='image_fetcher_')
+    started = time.time()
+    results = fetcher.fetch_all([(url, os.path.join(folder, f"image_{i + 1}.jpg")) for i, url in enumerate(urls)], 2000)
+    for result in results:
+        print(f"  {result['status']:10} {result['size']:>10} bytes  {result['url']}")
+    print(f"{len(urls)} images in {time.time() - started:.2f}s -> {folder}")
@@ -0,0 +1,300 @@
+"""
+Image Store - Content-addressed storage and deduplication for product images
+Every image is kept once under its SHA-256, product folders hold hard links to it, and a
+perceptual hash (dHash) plus a coarse colour signature and the aspect ratio catch the same
+picture saved at another size or quality
+"""
+import hashlib
+import os
+import shutil
+import sqlite3
+import threading
+from datetime import datetime
+
+from app_config import IMAGE_NEAR_DUPLICATE_DISTANCE, IMAGE_STORE_DIR
+
+try:
+    from PIL import Image
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+HASH_CHUNK = 1024 * 1024
+
+# dHash is computed on greyscale, so colour variants of one product shot hash the same -
+# a near duplicate must also match the colour signature (mean channel difference, 0-255)
+# and the aspect ratio (relative difference)
+COLOUR_TOLERANCE = 12
+ASPECT_TOLERANCE = 0.02
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def image_signature(path):
+    """64-bit difference hash as 16 hex chars, (width, height) and a colour signature
+    (mean RGB of each quarter as 24 hex chars) - (None, None, None) if it can't be decoded
+    """
+    if not PIL_AVAILABLE:
+        return None, None, None
+    try:
+        with Image.open(path) as image:
+            size = image.size
+            # JPEGs decode straight at a fraction of their size - a 9x8 thumbnail needs no detail
+            image.draft('RGB', (64, 64))
+            image = image.convert('RGB')
+            pixels = list(image.convert('L').resize((9, 8), Image.LANCZOS).getdata())
+            quarters = image.resize((2, 2), Image.BOX).getdata()
+    except Exception:
+        return None, None, None
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    colour = ''.join(f'{channel:02x}' for pixel in quarters for channel in pixel)
+    return f'{bits:016x}', size, colour
+
+def hamming(dhash_a, dhash_b):
+    return bin(int(dhash_a, 16) ^ int(dhash_b, 16)).count('1')
+
+def colour_difference(colour_a, colour_b):
+    """Mean absolute channel difference of two colour signatures (0-255)"""
+    a = bytes.fromhex(colour_a)
+    b = bytes.fromhex(colour_b)
+    return sum(abs(x - y) for x, y in zip(a, b)) / len(a)
+
+def same_aspect(entry, other):
+    if not (entry.get('width') and entry.get('height') and other.get('width') and other.get('height')):
+        return False
+    aspect = entry['width'] / entry['height']
+    other_aspect = other['width'] / other['height']
+    return abs(aspect - other_aspect) <= ASPECT_TOLERANCE * other_aspect
+
+def pixel_area(entry):
+    return (entry.get('width') or 0) * (entry.get('height') or 0)
+
+def link_or_copy(source, target):
+    """Hard-link source at target (replacing target), copying when links aren't possible"""
+    temp_path = f"{target}.{os.getpid()}.{threading.get_ident()}.link"
+    try:
+        os.link(source, temp_path)
+    except OSError:
+        shutil.copy2(source, temp_path)
+    os.replace(temp_path, target)
+
+class ImageStore:
+    """Image objects by SHA-256 under store_dir/objects, with an SQLite index of hashes,
+    source URLs and the product files that reference each object
+    """
+
+    SCHEMA = [
+        '''CREATE TABLE IF NOT EXISTS images (
+            sha256 TEXT PRIMARY KEY,
+            dhash TEXT,
+            size INTEGER NOT NULL,
+            width INTEGER,
+            height INTEGER,
+            colour TEXT,
+            path TEXT NOT NULL,
+            created_at TEXT NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS urls (
+            url TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            seen_at TEXT NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS refs (
+            path TEXT PRIMARY KEY,
+            sha256 TEXT NOT NULL,
+            added_at TEXT NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_images_dhash ON images(dhash)',
+        'CREATE INDEX IF NOT EXISTS idx_refs_sha256 ON refs(sha256)'
+    ]
+
+    def __init__(self, store_dir=IMAGE_STORE_DIR, near_distance=IMAGE_NEAR_DUPLICATE_DISTANCE):
+        self.store_dir = store_dir
+        self.objects_dir = os.path.join(store_dir, 'objects')
+        self.database_file = os.path.join(store_dir, 'images.db')
+        self.near_distance = near_distance
+        os.makedirs(self.objects_dir, exist_ok=True)
+        self._local = threading.local()
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+                # Stores created before colour signatures - their images never count as near duplicates
+                columns = {row[1] for row in conn.execute('PRAGMA table_info(images)')}
+                if 'colour' not in columns:
+                    conn.execute('ALTER TABLE images ADD COLUMN colour TEXT')
+            self._local.conn = conn
+        return conn
+
+    def object_path(self, sha256, ext):
+        return os.path.join(self.objects_dir, sha256[:2], f"{sha256}.{ext}")
+
+    def get(self, sha256):
+        row = self.connect().execute('SELECT * FROM images WHERE sha256 = ?', (sha256,)).fetchone()
+        if row and os.path.exists(row['path']):
+            return dict(row)
+        return None
+
+    def lookup_url(self, url):
+        """Stored image last downloaded from this URL, or None"""
+        row = self.connect().execute('SELECT sha256 FROM urls WHERE url = ?', (url,)).fetchone()
+        return self.get(row['sha256']) if row else None
+
+    def add(self, filepath, url=None):
+        """Take a downloaded file into the store - filepath becomes a link to the stored object
+
+        Returns the image's index entry plus 'new' (False when identical bytes were already stored).
+        """
+        sha256 = file_sha256(filepath)
+        entry = self.get(sha256)
+        now = datetime.now().isoformat()
+        conn = self.connect()
+
+        if entry:
+            link_or_copy(entry['path'], filepath)
+            entry['new'] = False
+        else:
+            dhash, dimensions, colour = image_signature(filepath)
+            ext = os.path.splitext(filepath)[1].lstrip('.').lower() or 'jpg'
+            object_path = self.object_path(sha256, ext)
+            os.makedirs(os.path.dirname(object_path), exist_ok=True)
+            link_or_copy(filepath, object_path)
+            width, height = dimensions or (None, None)
+            entry = {'sha256': sha256, 'dhash': dhash, 'size': os.path.getsize(object_path),
+                     'width': width, 'height': height, 'colour': colour, 'path': object_path, 'created_at': now}
+            with conn:
+                conn.execute(
+                    '''INSERT OR REPLACE INTO images (sha256, dhash, size, width, height, colour, path, created_at)
+                       VALUES (:sha256, :dhash, :size, :width, :height, :colour, :path, :created_at)''', entry
+                )
+            entry['new'] = True
+
+        with conn:
+            if url:
+                conn.execute('INSERT OR REPLACE INTO urls (url, sha256, seen_at) VALUES (?, ?, ?)', (url, sha256, now))
+            conn.execute('INSERT OR REPLACE INTO refs (path, sha256, added_at) VALUES (?, ?, ?)', (filepath, sha256, now))
+        return entry
+
+    def place(self, entry, filepath):
+        """Put an already stored image at filepath (no download)"""
+        link_or_copy(entry['path'], filepath)
+        conn = self.connect()
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO refs (path, sha256, added_at) VALUES (?, ?, ?)',
+                         (filepath, entry['sha256'], datetime.now().isoformat()))
+
+    def entry_for_path(self, filepath):
+        """Index entry of a product image file, adding files from before the store to it"""
+        row = self.connect().execute('SELECT sha256 FROM refs WHERE path = ?', (filepath,)).fetchone()
+        entry = self.get(row['sha256']) if row else None
+        if entry is None and os.path.exists(filepath):
+            entry = self.add(filepath)
+        return entry
+
+    def forget(self, filepath):
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM refs WHERE path = ?', (filepath,))
+
+    def is_near_duplicate(self, entry, other):
+        """Same picture at another size or quality - same structure, colours and aspect ratio"""
+        if not entry.get('dhash') or not other.get('dhash'):
+            return False
+        if not entry.get('colour') or not other.get('colour'):
+            return False
+        return (hamming(entry['dhash'], other['dhash']) <= self.near_distance
+                and colour_difference(entry['colour'], other['colour']) <= COLOUR_TOLERANCE
+                and same_aspect(entry, other))
+
+    def discard(self, filepath):
+        """Remove a product file that turned out to be a duplicate (the stored image stays)"""
+        self.forget(filepath)
+        try:
+            os.remove(filepath)
+        except OSError:
+            pass
+
+    def dedupe(self, entry, filepath, kept):
+        """Compare the image just placed at filepath with the product's other images
+
+        kept maps path -> entry and is updated. Returns (status, path): 'new' keeps filepath,
+        'duplicate' (same bytes) and 'near_duplicate' (same picture) remove it in favour of path -
+        when the near duplicate has more pixels it replaces the image at path first.
+        """
+        for path, other in kept.items():
+            if other['sha256'] == entry['sha256']:
+                status = 'duplicate'
+            elif self.is_near_duplicate(entry, other):
+                status = 'near_duplicate'
+                if pixel_area(entry) > pixel_area(other):
+                    self.place(entry, path)
+                    kept[path] = entry
+            else:
+                continue
+            self.discard(filepath)
+            return status, path
+        kept[filepath] = entry
+        return 'new', filepath
+
+    def similar(self, sha256):
+        """Other stored images that look the same (near duplicates), closest first"""
+        entry = self.get(sha256)
+        if not entry or not entry['dhash']:
+            return []
+        matches = []
+        for row in self.connect().execute('SELECT * FROM images WHERE dhash IS NOT NULL AND sha256 != ?', (sha256,)):
+            if self.is_near_duplicate(entry, dict(row)):
+                matches.append(dict(row, distance=hamming(entry['dhash'], row['dhash'])))
+        return sorted(matches, key=lambda match: match['distance'])
+
+    def prune(self):
+        """Drop stored images no product file links to any more, returns how many were removed"""
+        conn = self.connect()
+        removed = 0
+        for row in conn.execute('SELECT sha256, path FROM images').fetchall():
+            try:
+                links = os.stat(row['path']).st_nlink
+            except OSError:
+                links = 0
+            referenced = conn.execute('SELECT path FROM refs WHERE sha256 = ?', (row['sha256'],)).fetchall()
+            live = [ref['path'] for ref in referenced if os.path.exists(ref['path'])]
+            # Copies (no hard links) are tracked through refs only
+            if links > 1 or live:
+                continue
+            with conn:
+                conn.execute('DELETE FROM images WHERE sha256 = ?', (row['sha256'],))
+                conn.execute('DELETE FROM refs WHERE sha256 = ?', (row['sha256'],))
+                conn.execute('DELETE FROM urls WHERE sha256 = ?', (row['sha256'],))
+            try:
+                os.remove(row['path'])
+            except OSError:
+                pass
+            removed += 1
+        return removed
+
+    def stats(self):
+        conn = self.connect()
+        images, stored_bytes = conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM images').fetchone()
+        refs = conn.execute('SELECT COUNT(*) FROM refs').fetchone()[0]
+        return {'images': images, 'bytes': stored_bytes, 'references': refs,
+                'urls': conn.execute('SELECT COUNT(*) FROM urls').fetchone()[0]}
+
+if __name__ == '__main__':
+    store = ImageStore()
+    print(f"Image store: {store.store_dir}")
+    print(store.stats())
+    print(f"Pruned {store.prune()} unreferenced images")
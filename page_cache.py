@@ -0,0 +1,262 @@
+"""
+Page Cache - On-disk HTTP cache for scraped product and listing pages
+Stores each page body with its ETag/Last-Modified, revalidates with If-None-Match/If-Modified-Since
+and keeps what was extracted from the page so unchanged pages are never parsed twice
+"""
+import gzip
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+from app_config import PAGE_CACHE_DIR, PAGE_CACHE_DOMAIN_TTLS, PAGE_CACHE_MAX_MB, PAGE_CACHE_TTL
+
+def cache_key(url):
+    return hashlib.sha1(url.encode('utf-8')).hexdigest()
+
+def domain_of(url):
+    domain = urlparse(url).netloc.lower()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
+class CachedPage:
+    """A page body plus whether it changed since it was last cached
+
+    status is 'fresh' (served inside its TTL, no request), 'revalidated' (304 or identical body)
+    or 'fetched' (new or changed). derived holds values extracted from this exact body.
+    """
+
+    def __init__(self, cache, url, content, status, derived=None):
+        self.cache = cache
+        self.url = url
+        self.content = content
+        self.status = status
+        self.derived = derived or {}
+
+    @property
+    def unchanged(self):
+        return self.status != 'fetched'
+
+    def remember(self, name, value):
+        """Keep a value extracted from this body - returned with the page until the body changes"""
+        self.derived[name] = value
+        if self.cache:
+            self.cache.remember(self.url, name, value)
+
+class PageCache:
+    """URL -> body/validators/derived data, with per-domain TTLs and size-bounded LRU eviction
+
+    Metadata lives in SQLite (shared safely by the scraper threads and the web app),
+    bodies are gzipped files under cache_dir/bodies.
+    """
+
+    SCHEMA = [
+        '''CREATE TABLE IF NOT EXISTS pages (
+            key TEXT PRIMARY KEY,
+            url TEXT NOT NULL,
+            etag TEXT,
+            last_modified TEXT,
+            body_hash TEXT,
+            size INTEGER NOT NULL DEFAULT 0,
+            fetched_at REAL NOT NULL,
+            accessed_at REAL NOT NULL,
+            derived TEXT
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_pages_accessed ON pages(accessed_at)'
+    ]
+
+    def __init__(self, cache_dir=PAGE_CACHE_DIR, max_bytes=PAGE_CACHE_MAX_MB * 1024 * 1024,
+                 default_ttl=PAGE_CACHE_TTL, domain_ttls=None):
+        self.cache_dir = cache_dir
+        self.bodies_dir = os.path.join(cache_dir, 'bodies')
+        self.database_file = os.path.join(cache_dir, 'pages.db')
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.domain_ttls = PAGE_CACHE_DOMAIN_TTLS if domain_ttls is None else domain_ttls
+        os.makedirs(self.bodies_dir, exist_ok=True)
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.counts = {'fresh': 0, 'revalidated': 0, 'fetched': 0}
+
+    def connect(self):
+        """This thread's connection (sqlite3 connections must not be shared across threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    def ttl_for(self, url):
+        return self.domain_ttls.get(domain_of(url), self.default_ttl)
+
+    def body_path(self, key):
+        return os.path.join(self.bodies_dir, key[:2], key + '.gz')
+
+    def read_body(self, key):
+        try:
+            with gzip.open(self.body_path(key), 'rb') as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def write_body(self, key, content):
+        """Atomically write a gzipped body, returns the bytes used on disk"""
+        path = self.body_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, 'wb') as f:
+            f.write(gzip.compress(content, compresslevel=6))
+        os.replace(temp_path, path)
+        return os.path.getsize(path)
+
+    def lookup(self, url):
+        return self.connect().execute('SELECT * FROM pages WHERE key = ?', (cache_key(url),)).fetchone()
+
+    def count(self, status):
+        with self._stats_lock:
+            self.counts[status] += 1
+
+    def get(self, http, url, rate_limiter=None, timeout=20):
+        """Fetch a page through the cache - http is an http_client.HttpClient
+
+        Raises the same requests exceptions as a plain fetch (including HTTPError on 4xx/5xx).
+        """
+        key = cache_key(url)
+        now = time.time()
+        entry = self.lookup(url)
+        content = self.read_body(key) if entry else None
+        if content is None:
+            entry = None
+
+        if entry and now - entry['fetched_at'] < self.ttl_for(url):
+            self.touch(key, now)
+            self.count('fresh')
+            return CachedPage(self, url, content, 'fresh', json.loads(entry['derived'] or '{}'))
+
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+
+        if rate_limiter:
+            rate_limiter.acquire(url)
+        response = http.get(url, timeout=timeout, headers=headers)
+
+        if response.status_code == 304 and entry:
+            self.touch(key, now, fetched=True, etag=response.headers.get('ETag'))
+            self.count('revalidated')
+            return CachedPage(self, url, content, 'revalidated', json.loads(entry['derived'] or '{}'))
+
+        response.raise_for_status()
+        content = response.content
+        body_hash = hashlib.sha1(content).hexdigest()
+
+        # No validators from the server - an identical body still counts as unchanged
+        if entry and entry['body_hash'] == body_hash:
+            self.touch(key, now, fetched=True, etag=response.headers.get('ETag'),
+                       last_modified=response.headers.get('Last-Modified'))
+            self.count('revalidated')
+            return CachedPage(self, url, content, 'revalidated', json.loads(entry['derived'] or '{}'))
+
+        self.store(key, url, content, body_hash, response.headers, now)
+        self.count('fetched')
+        return CachedPage(self, url, content, 'fetched')
+
+    def store(self, key, url, content, body_hash, headers, now):
+        size = self.write_body(key, content)
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                '''INSERT OR REPLACE INTO pages
+                   (key, url, etag, last_modified, body_hash, size, fetched_at, accessed_at, derived)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?, NULL)''',
+                (key, url, headers.get('ETag'), headers.get('Last-Modified'), body_hash, size, now, now)
+            )
+        self.evict()
+
+    def touch(self, key, now, fetched=False, etag=None, last_modified=None):
+        conn = self.connect()
+        with conn:
+            if fetched:
+                conn.execute(
+                    '''UPDATE pages SET accessed_at = ?, fetched_at = ?,
+                       etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified)
+                       WHERE key = ?''',
+                    (now, now, etag, last_modified, key)
+                )
+            else:
+                conn.execute('UPDATE pages SET accessed_at = ? WHERE key = ?', (now, key))
+
+    def remember(self, url, name, value):
+        key = cache_key(url)
+        conn = self.connect()
+        with conn:
+            row = conn.execute('SELECT derived FROM pages WHERE key = ?', (key,)).fetchone()
+            if row is None:
+                return
+            derived = json.loads(row['derived'] or '{}')
+            derived[name] = value
+            conn.execute('UPDATE pages SET derived = ? WHERE key = ?', (json.dumps(derived), key))
+
+    def invalidate(self, url):
+        """Forget a page so the next fetch is unconditional"""
+        key = cache_key(url)
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM pages WHERE key = ?', (key,))
+        try:
+            os.remove(self.body_path(key))
+        except OSError:
+            pass
+
+    def evict(self):
+        """Drop least recently used pages until the cache fits in max_bytes"""
+        conn = self.connect()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM pages').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for row in conn.execute('SELECT key, size FROM pages ORDER BY accessed_at').fetchall():
+            if total <= self.max_bytes:
+                break
+            with conn:
+                conn.execute('DELETE FROM pages WHERE key = ?', (row['key'],))
+            try:
+                os.remove(self.body_path(row['key']))
+            except OSError:
+                pass
+            total -= row['size']
+            removed += 1
+        return removed
+
+    def stats(self):
+        row = self.connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages').fetchone()
+        with self._stats_lock:
+            counts = dict(self.counts)
+        return dict(counts, pages=row[0], bytes=row[1])
+
+if __name__ == '__main__':
+    import sys
+    from http_client import HttpClient
+
+    cache = PageCache()
+    client = HttpClient()
+    for url in sys.argv[1:] or ['https://ineedhemp.com/product-category/best-sellers/']:
+        for _ in range(2):
+            page = cache.get(client, url)
+            print(f"{page.status:12} {url} ({len(page.content)} bytes)")
+    print(cache.stats())
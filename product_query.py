@@ -0,0 +1,143 @@
+"""
+Product Query - Filtering, sorting, pagination and field projection for product listings
+Keeps /api/products responses proportional to the page size instead of the catalog size
+"""
+import re
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+# Characters of description shipped as the list view excerpt
+EXCERPT_LENGTH = 320
+
+# Fields computed from the full record rather than copied from it
+COMPUTED_FIELDS = {
+    'thumbnail': lambda p: (p.get('local_images') or [None])[0],
+    'image_count': lambda p: len(p.get('local_images') or []),
+    'excerpt': lambda p: (p.get('description') or '')[:EXCERPT_LENGTH]
+}
+
+# Projection used by the dashboard gallery
+LIST_FIELDS = ['id', 'title', 'price', 'thumbnail', 'image_count', 'excerpt', 'domain', 'url', 'render_status']
+
+SORT_KEYS = {
+    'added': lambda p: p.get('added_to_database') or '',
+    'title': lambda p: (p.get('title') or '').lower(),
+    'price': lambda p: parse_price(p.get('price')),
+    'domain': lambda p: p.get('domain') or ''
+}
+
+PRICE_PATTERN = re.compile(r'\d[\d,]*(?:\.\d+)?')
+
+def parse_price(price):
+    """First number in a price string ('$1,299.00' -> 1299.0), unpriced products sort last"""
+    match = PRICE_PATTERN.search(price or '')
+    if not match:
+        return float('inf')
+    return float(match.group().replace(',', ''))
+
+def filter_products(products, domain=None, scrape_source=None, has_images=None, added_since=None):
+    """Yield products matching all of the given filters (None = don't filter)"""
+    for product in products:
+        if domain and product.get('domain') != domain:
+            continue
+        if scrape_source and product.get('scrape_source') != scrape_source:
+            continue
+        if has_images is not None and bool(product.get('local_images')) != has_images:
+            continue
+        # ISO timestamps compare correctly as strings
+        if added_since and (product.get('added_to_database') or '') < added_since:
+            continue
+        yield product
+
+def sort_products(products, sort=None):
+    """Sort by a SORT_KEYS name, '-name' for descending - None keeps database order"""
+    if not sort:
+        return list(products)
+    descending = sort.startswith('-')
+    key = SORT_KEYS.get(sort.lstrip('-'))
+    if key is None:
+        raise ValueError(f"Unknown sort key: {sort}")
+    return sorted(products, key=key, reverse=descending)
+
+def project_product(product, fields=None):
+    """Copy only the requested fields (None = full record)"""
+    if not fields:
+        return product
+    projected = {}
+    for field in fields:
+        if field in COMPUTED_FIELDS:
+            projected[field] = COMPUTED_FIELDS[field](product)
+        elif field in product:
+            projected[field] = product[field]
+    return projected
+
+def parse_fields(value):
+    """'id,title,thumbnail' -> ['id', 'title', 'thumbnail'], 'list' -> LIST_FIELDS"""
+    if not value:
+        return None
+    if value == 'list':
+        return list(LIST_FIELDS)
+    return [field.strip() for field in value.split(',') if field.strip()]
+
+def parse_bool(value):
+    if value is None or value == '':
+        return None
+    return value.lower() in ('1', 'true', 'yes')
+
+def paginate(products, offset=0, limit=DEFAULT_PAGE_SIZE, cursor=None):
+    """Slice a page - a cursor (id of the last product already seen) wins over the offset
+
+    The cursor keeps paging stable when products are added or deleted between requests.
+    Returns (page, offset, next_offset) with next_offset None on the last page. Raises
+    ValueError for a cursor that isn't in the listing (deleted or filtered out) - falling back
+    to the offset would serve the first page again.
+    """
+    if cursor:
+        for position, product in enumerate(products):
+            if product.get('id') == cursor:
+                offset = position + 1
+                break
+        else:
+            raise ValueError(f"Unknown cursor: {cursor}")
+
+    page = products[offset:offset + limit]
+    next_offset = offset + limit if offset + limit < len(products) else None
+    return page, offset, next_offset
+
+def query_products(products, args):
+    """Run a listing query from request args (a dict-like of strings)
+
+    Returns the response body for /api/products
+    """
+    try:
+        limit = int(args.get('limit') or DEFAULT_PAGE_SIZE)
+        offset = int(args.get('offset') or 0)
+    except ValueError:
+        raise ValueError("limit and offset must be numbers")
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    offset = max(0, offset)
+
+    matching = sort_products(
+        filter_products(
+            products,
+            domain=args.get('domain') or None,
+            scrape_source=args.get('source') or None,
+            has_images=parse_bool(args.get('has_images')),
+            added_since=args.get('added_since') or None
+        ),
+        args.get('sort')
+    )
+
+    page, offset, next_offset = paginate(matching, offset, limit, args.get('cursor'))
+    fields = parse_fields(args.get('fields'))
+
+    return {
+        'products': [project_product(product, fields) for product in page],
+        'total_count': len(matching),
+        'total_images': sum(len(p.get('local_images') or []) for p in matching),
+        'offset': offset,
+        'limit': limit,
+        'next_offset': next_offset,
+        'next_cursor': page[-1].get('id') if page and next_offset is not None else None
+    }
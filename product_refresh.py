@@ -0,0 +1,192 @@
+"""
+Product Refresh - Change detection for products already in the database
+Re-fetches known product URLs, fingerprints the extracted fields and only updates products
+(and downloads images) that actually changed
+"""
+import hashlib
+import json
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+# Extracted fields that make up a product's fingerprint (plus its image URL list)
+FINGERPRINT_FIELDS = ('title', 'price', 'description', 'sku')
+
+# Fields copied from a fresh extraction onto a changed product
+REFRESH_FIELDS = ('title', 'price', 'description', 'short_description', 'category', 'sku')
+
+IMAGE_NUMBER_PATTERN = re.compile(r'image_(\d+)\.\w+$')
+
+def fingerprint_product(product, image_urls=None):
+    """Hash of the fingerprint fields and image URLs - equal fingerprints mean nothing worth updating changed"""
+    if image_urls is None:
+        image_urls = product.get('image_urls') or []
+    payload = {field: product.get(field) or '' for field in FINGERPRINT_FIELDS}
+    payload['image_urls'] = list(image_urls)
+    encoded = json.dumps(payload, sort_keys=True, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(encoded).hexdigest()[:20]
+
+def changed_fields(old, new):
+    return [field for field in FINGERPRINT_FIELDS if (old.get(field) or '') != (new.get(field) or '')]
+
+def image_number(path):
+    match = IMAGE_NUMBER_PATTERN.search(os.path.basename(path or ''))
+    return int(match.group(1)) if match else None
+
+def images_by_url(image_urls, local_images, image_files=None):
+    """Map image URL -> local file
+
+    Refreshed products record the mapping (image_files); for the rest it follows from the
+    downloaders naming image_urls[N-1] as image_N.
+    """
+    if image_files:
+        return {url: path for url, path in image_files.items() if path in local_images}
+    files = {}
+    for path in local_images:
+        number = image_number(path)
+        if number and number <= len(image_urls):
+            files.setdefault(image_urls[number - 1], path)
+    return files
+
+class ProductRefresher:
+    """Checks known products against their live pages and applies only the differences
+
+    Pages come through the scraper's page cache, so unchanged products usually cost one 304.
+    """
+
+    def __init__(self, scraper, workers=None):
+        self.scraper = scraper
+        self.workers = workers or scraper.workers
+
+    def refresh_one(self, product):
+        """Returns (status, summary, updates) - status is 'unchanged', 'updated' or 'failed'"""
+        url = product.get('url')
+        summary = {'id': product.get('id'), 'title': product.get('title', 'Unknown'), 'url': url}
+        if not url or not product.get('id'):
+            return 'failed', summary, None
+
+        scraped = self.scraper.scraper_core.scrape_product(url)
+        if not scraped:
+            return 'failed', summary, None
+        summary['page_unchanged'] = scraped['unchanged']
+
+        fresh = scraped['product_data']
+        new_image_urls = scraped['image_urls']
+        old_image_urls = product.get('image_urls') or []
+        local_images = product.get('local_images') or []
+
+        # Products whose images were found on disk were saved without their image URLs -
+        # adopt the live list instead of treating every image as new
+        image_urls_known = bool(old_image_urls) or not local_images
+        baseline_urls = old_image_urls if image_urls_known else new_image_urls
+
+        new_fingerprint = fingerprint_product(fresh, new_image_urls)
+        old_fingerprint = product.get('fingerprint') or fingerprint_product(product, baseline_urls)
+        if new_fingerprint == old_fingerprint:
+            return 'unchanged', summary, None
+
+        updates = {field: fresh.get(field, '') for field in REFRESH_FIELDS}
+        updates.update({
+            'fingerprint': new_fingerprint,
+            'scraped_at': fresh.get('scraped_at'),
+            'last_refreshed': datetime.now().isoformat(),
+            'image_urls': new_image_urls
+        })
+        summary['fields'] = changed_fields(product, fresh)
+
+        added = [u for u in new_image_urls if u not in baseline_urls]
+        removed = [u for u in baseline_urls if u not in new_image_urls]
+        if added or removed:
+            local_images, files = self.refresh_images(product, old_image_urls, added, removed)
+            updates.update({
+                'local_images': local_images,
+                'image_count': len(local_images),
+                'image_hashes': self.scraper.image_hashes(local_images),
+                'image_files': {url: files[url] for url in new_image_urls if url in files}
+            })
+        summary['images_added'] = len(added)
+        summary['images_removed'] = len(removed)
+
+        if not summary['fields'] and not added and not removed:
+            # Only bookkeeping changed (e.g. first refresh of a product saved without image URLs)
+            return 'unchanged', summary, {'fingerprint': new_fingerprint, 'image_urls': new_image_urls}
+
+        product_folder = product.get('product_folder')
+        if product_folder and os.path.isdir(product_folder):
+            self.scraper.save_product_data(dict(product, **updates), product_folder)
+
+        print(f"  Changed: {summary['title'][:50]} ({', '.join(summary['fields'] + (['images'] if added or removed else []))})")
+        return 'updated', summary, updates
+
+    def refresh_images(self, product, old_image_urls, added, removed):
+        """Download only the added images and drop the removed ones
+        
+        Returns the new local_images and the image URL -> file mapping
+        """
+        local_images = list(product.get('local_images') or [])
+        files = images_by_url(old_image_urls, local_images, product.get('image_files'))
+
+        removed_files = {files[url] for url in removed if url in files}
+        kept = [path for path in local_images if path not in removed_files]
+        for path in removed_files:
+            # The stored image stays while other products still link to it
+            self.scraper.image_store.discard(path)
+
+        downloaded = []
+        images_folder = product.get('images_folder')
+        if added and images_folder:
+            os.makedirs(images_folder, exist_ok=True)
+            # Number new files after everything already in the folder
+            numbers = [image_number(name) for name in os.listdir(images_folder)]
+            first_index = max([n for n in numbers if n] or [0]) + 1
+            downloaded = self.scraper.download_images(added, images_folder, first_index)
+            for path in downloaded:
+                number = image_number(path)
+                if number and 0 <= number - first_index < len(added):
+                    files[added[number - first_index]] = path
+
+        return kept + [path for path in downloaded if path not in kept], files
+
+    def run(self, products):
+        """Refresh products, write all changes in one database update and return the run's diff"""
+        started = time.time()
+        print(f"Refreshing {len(products)} products")
+        print("=" * 50)
+
+        with ThreadPoolExecutor(max(1, self.workers), thread_name_prefix='refresh') as pool:
+            results = list(pool.map(self.refresh_one, products))
+
+        report = {
+            'checked': len(products),
+            'unchanged': 0,
+            'pages_not_modified': 0,
+            'updated': [],
+            'failed': []
+        }
+        updates_by_id = {}
+        for status, summary, updates in results:
+            if summary.get('page_unchanged'):
+                report['pages_not_modified'] += 1
+            if status == 'failed':
+                report['failed'].append(summary)
+                continue
+            if updates:
+                updates_by_id[summary['id']] = updates
+            if status == 'updated':
+                report['updated'].append(summary)
+            else:
+                report['unchanged'] += 1
+
+        if updates_by_id:
+            self.scraper.database.update_products_by_id(updates_by_id)
+
+        report['elapsed_seconds'] = round(time.time() - started, 2)
+        print(f"Refresh complete in {report['elapsed_seconds']}s: {len(report['updated'])} changed, "
+              f"{report['unchanged']} unchanged ({report['pages_not_modified']} pages not modified), "
+              f"{len(report['failed'])} failed")
+        for entry in report['updated']:
+            print(f"  ~ {entry['title'][:50]}: {', '.join(entry['fields']) or 'images'} "
+                  f"(+{entry['images_added']}/-{entry['images_removed']} images)")
+        return report
@@ -4,25 +4,44 @@ Handles URL fetching, HTML parsing, and product data extraction for any WooComme
 """
 
 import requests
-from bs4 import BeautifulSoup
 import os
 import json
+import re
 import time
 from datetime import datetime
 from urllib.parse import urljoin, urlparse
+from http_client import HttpClient
+from extraction_engine import ExtractionEngine
+from page_cache import CachedPage
+from site_profiles import get_registry
+from woocommerce_api import json_ld_fields
 
 class ProductScraperCore:
-    def __init__(self, headers=None):
+    def __init__(self, headers=None, rate_limiter=None, http_client=None, page_cache=None, store_api=None):
         self.headers = headers or {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
         
+        # Optional scrape_pipeline.HostRateLimiter shared with image downloads
+        self.rate_limiter = rate_limiter
+        
+        # Pooled keep-alive session with retries (shared with the image downloader when passed in)
+        self.http = http_client or HttpClient(self.headers)
+        
+        # Optional page_cache.PageCache - conditional refetches, unchanged pages aren't parsed again
+        self.page_cache = page_cache
+        
+        # Optional woocommerce_api.StoreApiClient - products and category listings as JSON
+        self.store_api = store_api
+        
+        # Supported sites and their selector overrides (site_profiles.json)
+        site_profiles = get_registry()
+        
+        # Precompiled per-site rule table - every field from one parse and one traversal
+        self.engine = ExtractionEngine(site_rules=site_profiles.extraction_rules())
+        
         # Supported domains - your WooCommerce sites
-        self.supported_domains = [
-            'ineedhemp.com',
-            'nicedreamzwholesale.com', 
-            'tribeseedbank.com'
-        ]
+        self.supported_domains = site_profiles.domains()
     
     def get_domain_from_url(self, url):
         """Extract domain from URL"""
@@ -44,110 +63,126 @@ class ProductScraperCore:
     def scrape_product_page(self, url):
         """Scrape single product page with enhanced error handling"""
         try:
-            response = requests.get(url, headers=self.headers, timeout=20)
+            if self.page_cache:
+                page = self.page_cache.get(self.http, url, self.rate_limiter)
+                return self.parse_html(page.content)
+            if self.rate_limiter:
+                self.rate_limiter.acquire(url)
+            response = self.http.get(url, timeout=20)
             response.raise_for_status()
-            return BeautifulSoup(response.content, 'html.parser')
+            return self.parse_html(response.content)
+        except requests.exceptions.RequestException as e:
+            print(f"Error scraping {url}: {e}")
+            return None
+        except Exception as e:
+            print(f"Unexpected error scraping {url}: {e}")
+            return None
+    
+    def fetch_page(self, url):
+        """A page as a page_cache.CachedPage - through the page cache when there is one
+        
+        Raises requests exceptions on fetch errors.
+        """
+        if self.page_cache:
+            return self.page_cache.get(self.http, url, self.rate_limiter)
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+        response = self.http.get(url, timeout=20)
+        response.raise_for_status()
+        return CachedPage(None, url, response.content, 'fetched')
+    
+    def scrape_product(self, url):
+        """Product data and image URLs for a product page
+        
+        Tries the Store API, then parses the HTML - title, price and SKU from the page's
+        JSON-LD win over the selectors when it has them. With a page cache, a page that hasn't
+        changed since the last scrape (304 or identical body) returns the previous extraction
+        without parsing. Returns None on failure.
+        """
+        if self.store_api:
+            scraped = self.store_api.scrape_product(url)
+            if scraped:
+                return dict(scraped, unchanged=False)
+        
+        try:
+            page = self.fetch_page(url)
         except requests.exceptions.RequestException as e:
             print(f"Error scraping {url}: {e}")
             return None
         except Exception as e:
             print(f"Unexpected error scraping {url}: {e}")
             return None
+        
+        cached = page.derived.get('product')
+        if cached:
+            product_data = dict(cached['product_data'], scraped_at=datetime.now().isoformat())
+            return {'product_data': product_data, 'image_urls': list(cached['image_urls']), 'unchanged': True}
+        
+        soup = self.parse_html(page.content)
+        fields = self.extract_fields(soup, url)
+        json_ld = json_ld_fields(page.content)
+        if json_ld:
+            fields.update({field: value for field, value in json_ld.items() if value})
+        product_data = self.extract_product_data(soup, url, fields)
+        if not product_data:
+            return None
+        scraped = {'product_data': product_data, 'image_urls': self.extract_image_urls(soup, url, fields)}
+        
+        page.remember('product', scraped)
+        return {'product_data': dict(scraped['product_data']), 'image_urls': list(scraped['image_urls']),
+                'unchanged': page.unchanged}
     
-    def extract_product_data(self, soup, url):
+    def parse_html(self, content):
+        """Parse a page once, with lxml when it is installed"""
+        return self.engine.parse(content)
+    
+    def extract_fields(self, soup, url):
+        """Every field of the site's rule table from a parsed page (see extraction_engine)"""
+        return self.engine.extract(soup, self.get_domain_from_url(url))
+    
+    def extract_product_data(self, soup, url, fields=None):
         """Extract comprehensive product data"""
         if not soup:
             return None
         
-        title = self.extract_title(soup)
+        fields = fields or self.extract_fields(soup, url)
+        title = fields['title']
         if not title or len(title) < 3:
             return None
         
         return {
             'url': url,
             'title': title,
-            'description': self.extract_description(soup),
-            'short_description': self.extract_short_description(soup),
-            'price': self.extract_price(soup),
-            'category': self.extract_category(soup),
-            'sku': self.extract_sku(soup),
+            'description': self.description_from(fields),
+            'short_description': self.clean_description_text(fields['short_description']),
+            'price': fields['price'],
+            'category': fields['category'],
+            'sku': fields['sku'],
             'scraped_at': datetime.now().isoformat(),
             'scraper_version': '3.0-universal',
             'domain': self.get_domain_from_url(url)
         }
     
+    def description_from(self, fields):
+        """FULL product description, falling back to the short description"""
+        if fields['description']:
+            print(f"  Found FULL description: {len(fields['description'])} chars using {fields['description_selector']}")
+            return self.clean_description_text(fields['description'])
+        
+        print("  WARNING: Could not find full description, falling back to short description")
+        return self.clean_description_text(fields['short_description'])
+    
     def extract_title(self, soup):
         """Extract product title with multiple selectors"""
-        selectors = [
-            'h1.product_title',
-            'h1.entry-title', 
-            'h1.product-title',
-            '.product_title',
-            'h1',
-            '.page-title h1'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                title = element.get_text().strip()
-                if (title and len(title) > 2 and 
-                    not any(word in title.lower() for word in ['error', '404', 'not found', 'page not found'])):
-                    return title
-        return None
+        return self.engine.extract(soup, fields=['title'])['title']
     
     def extract_description(self, soup):
         """Extract FULL product description"""
-        
-        full_description_selectors = [
-            '#tab-description',
-            '.woocommerce-Tabs-panel--description',
-            '.panel.entry-content',
-            '.wc-tab#tab-description',
-            'div[id*="description"] .panel',
-            '.product-description .entry-content',
-            '.woocommerce-product-details__description',
-            '.product-details-description',
-            '.product-content .entry-content',
-            '.single-product-summary .entry-content',
-            '.product-tabs .description .panel',
-            '.tab-content .description',
-            '[role="tabpanel"][id*="description"]',
-            '.product-description-content',
-            '.woocommerce-product-details .entry-content'
-        ]
-        
-        for selector in full_description_selectors:
-            element = soup.select_one(selector)
-            if element:
-                desc_text = element.get_text(separator=' ', strip=True)
-                
-                if desc_text and len(desc_text) > 50:
-                    if not any(junk in desc_text.lower() for junk in ['lorem ipsum', 'placeholder', 'test content']):
-                        print(f"  Found FULL description: {len(desc_text)} chars using {selector}")
-                        return self.clean_description_text(desc_text)
-        
-        print("  WARNING: Could not find full description, falling back to short description")
-        return self.extract_short_description(soup)
+        return self.description_from(self.engine.extract(soup, fields=['description', 'short_description']))
     
     def extract_short_description(self, soup):
         """Extract short description as fallback"""
-        selectors = [
-            'div.woocommerce-product-details__short-description',
-            '.product-description',
-            '.entry-summary .woocommerce-product-details__short-description',
-            '.product-short-description',
-            '.summary .woocommerce-product-details__short-description p'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                desc = element.get_text(strip=True)
-                if len(desc) > 20:
-                    return self.clean_description_text(desc)
-        
-        return "Premium quality product"
+        return self.clean_description_text(self.engine.extract(soup, fields=['short_description'])['short_description'])
     
     def clean_description_text(self, description):
         """Clean and normalize description text"""
@@ -163,86 +198,30 @@ class ProductScraperCore:
     
     def extract_price(self, soup):
         """Extract price with enhanced selectors"""
-        selectors = [
-            '.price .woocommerce-Price-amount',
-            '.price .amount',
-            '.price',
-            '.product-price',
-            '.woocommerce-Price-amount bdi',
-            'span.woocommerce-Price-amount'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                price = element.get_text(strip=True)
-                if '$' in price or '€' in price or '£' in price:
-                    return price
-        
-        return "Contact for pricing"
+        return self.engine.extract(soup, fields=['price'])['price']
     
     def extract_category(self, soup):
         """Extract product category"""
-        selectors = [
-            '.woocommerce-breadcrumb a',
-            '.breadcrumb a',
-            '.product_meta .posted_in a'
-        ]
-        
-        for selector in selectors:
-            elements = soup.select(selector)
-            for element in elements:
-                text = element.get_text(strip=True)
-                if text and text.lower() not in ['home', 'shop', 'products']:
-                    return text
-        
-        return "Uncategorized"
+        return self.engine.extract(soup, fields=['category'])['category']
     
     def extract_sku(self, soup):
         """Extract product SKU"""
-        selectors = [
-            '.sku',
-            '.product_meta .sku',
-            '[data-sku]'
-        ]
-        
-        for selector in selectors:
-            element = soup.select_one(selector)
-            if element:
-                sku = element.get_text(strip=True)
-                if sku and sku.lower() != 'n/a':
-                    return sku
-        
-        return None
+        return self.engine.extract(soup, fields=['sku'])['sku']
     
-    def extract_image_urls(self, soup, base_url):
+    def extract_image_urls(self, soup, base_url, fields=None):
         """Extract image URLs with enhanced selectors"""
         images = []
         seen = set()
         domain = self.get_domain_from_url(base_url)
         
-        selectors = [
-            'img[data-large_image]',
-            'img.wp-post-image',
-            '.woocommerce-product-gallery img',
-            '.product-images img',
-            'img[data-src]',
-            'img[src*="product"]',
-            '.product-image img',
-            '.single-product-main-image img',
-            'figure.woocommerce-product-gallery__wrapper img'
-        ]
+        if fields is None:
+            fields = self.engine.extract(soup, domain, ['image_sources'])
         
-        for selector in selectors:
-            for img in soup.select(selector):
-                for attr in ['data-large_image', 'data-src', 'src']:
-                    src = img.get(attr)
-                    if src:
-                        src = self.clean_image_url(src, base_url, domain)
-                        if src and src not in seen and self.is_valid_image_url(src, domain):
-                            images.append(src)
-                            seen.add(src)
-                        break
+        for src in fields['image_sources']:
+            src = self.clean_image_url(src, base_url, domain)
+            if src and src not in seen and self.is_valid_image_url(src, domain):
+                images.append(src)
+                seen.add(src)
         
         print(f"  Found {len(images)} valid images")
         return images
@@ -285,11 +264,34 @@ class ProductScraperCore:
     
     def get_product_urls_from_page(self, page_url, limit=None):
         """Extract product URLs from a category or listing page"""
+        api_links = self.get_store_api_listing(page_url, limit)
+        if api_links is not None:
+            return api_links
+        
         try:
-            response = requests.get(page_url, headers=self.headers, timeout=20)
+            if self.page_cache:
+                # Unchanged listings reuse the links found last time
+                page = self.page_cache.get(self.http, page_url, self.rate_limiter)
+                if 'links' not in page.derived:
+                    soup = self.parse_html(page.content)
+                    page.remember('links', self.extract_product_urls(soup, page_url))
+                links = page.derived['links']
+                return links[:limit] if limit else links
+            
+            if self.rate_limiter:
+                self.rate_limiter.acquire(page_url)
+            response = self.http.get(page_url, timeout=20)
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = self.parse_html(response.content)
+            return self.extract_product_urls(soup, page_url, limit)
             
+        except Exception as e:
+            print(f"Error extracting URLs from {page_url}: {e}")
+            return []
+    
+    def extract_product_urls(self, soup, page_url, limit=None):
+        """Product URLs from an already parsed category or listing page"""
+        try:
             links = []
             domain = self.get_domain_from_url(page_url)
             
@@ -330,6 +332,67 @@ class ProductScraperCore:
             print(f"Error extracting URLs from {page_url}: {e}")
             return []
     
+    def get_listing_page(self, page_url):
+        """Product URLs and the next page URL (None on the last page) from one listing page
+        
+        Raises requests exceptions on fetch errors so crawlers can retry the page later.
+        A listing the Store API can read comes back whole, as one page.
+        """
+        api_links = self.get_store_api_listing(page_url)
+        if api_links is not None:
+            return api_links, None
+        
+        if self.page_cache:
+            page = self.page_cache.get(self.http, page_url, self.rate_limiter)
+            if 'listing' not in page.derived:
+                soup = self.parse_html(page.content)
+                page.remember('listing', {
+                    'links': self.extract_product_urls(soup, page_url),
+                    'next': self.find_next_page_url(soup, page_url)
+                })
+            listing = page.derived['listing']
+            return listing['links'], listing['next']
+        
+        if self.rate_limiter:
+            self.rate_limiter.acquire(page_url)
+        response = self.http.get(page_url, timeout=20)
+        response.raise_for_status()
+        soup = self.parse_html(response.content)
+        return self.extract_product_urls(soup, page_url), self.find_next_page_url(soup, page_url)
+    
+    def get_store_api_listing(self, page_url, limit=None):
+        """Product URLs of a listing read through the Store API, None when it has to be scraped as HTML"""
+        if not self.store_api:
+            return None
+        links = self.store_api.list_products(page_url, limit)
+        if links is None:
+            return None
+        return [link for link in links if self.is_valid_product_url(link)]
+    
+    def find_next_page_url(self, soup, page_url):
+        """Next page of a WooCommerce listing - rel=next / pagination links, then /page/N+1/"""
+        next_selectors = [
+            'link[rel="next"]',
+            'a[rel="next"]',
+            '.woocommerce-pagination a.next',
+            'a.next.page-numbers',
+            '.nav-links a.next'
+        ]
+        for selector in next_selectors:
+            tag = soup.select_one(selector)
+            if tag and tag.get('href'):
+                return urljoin(page_url, tag['href'])
+        
+        # Numbered links only - look for the page after this one
+        match = re.search(r'/page/(\d+)/?', urlparse(page_url).path)
+        current = int(match.group(1)) if match else 1
+        for link in soup.select('a[href*="/page/"]'):
+            href = urljoin(page_url, link.get('href', ''))
+            link_match = re.search(r'/page/(\d+)/?', urlparse(href).path)
+            if link_match and int(link_match.group(1)) == current + 1:
+                return href
+        return None
+    
     def clean_product_url(self, url, domain):
         """Clean and normalize product URL - now domain-agnostic"""
         if not url:
@@ -6,195 +6,12 @@ Focuses on product use, care, maintenance, and appreciation
 import json
 import os
 from datetime import datetime
-from PIL import Image
-from pathlib import Path
-from path_utils import slugify
+from image_renderer import PlatformImageProcessor
 
-class RedditImageProcessor:
-    """Handles image processing for Reddit - keeps original aspect ratios like Facebook"""
+class RedditImageProcessor(PlatformImageProcessor):
+    """Reddit images - original aspect ratio like Facebook (rendered by image_renderer)"""
     
-    def __init__(self):
-        # Reddit allows various sizes, use reasonable max
-        self.max_width = 1200
-        self.max_height = 1200
-        self.quality = 95
-        
-    def process_single_image(self, input_path, output_path):
-        """Process image for Reddit - maintain aspect ratio, resize if too large"""
-        if not os.path.exists(input_path):
-            print(f"    Image not found: {input_path}")
-            return None
-        
-        if os.path.exists(output_path):
-            print(f"    Skipping existing: {os.path.basename(output_path)}")
-            return output_path
-        
-        try:
-            image = Image.open(input_path)
-            if image.mode != 'RGB':
-                image = image.convert('RGB')
-            
-            # Get original dimensions
-            original_width, original_height = image.size
-            
-            # Only resize if image is too large
-            if original_width > self.max_width or original_height > self.max_height:
-                # Calculate scale to fit within max dimensions while maintaining aspect ratio
-                scale = min(self.max_width / original_width, self.max_height / original_height)
-                new_width = int(original_width * scale)
-                new_height = int(original_height * scale)
-                
-                image = image.resize((new_width, new_height), Image.Resampling.LANCZOS)
-                print(f"    Resized: {original_width}x{original_height} -> {new_width}x{new_height}")
-            else:
-                print(f"    No resize needed: {original_width}x{original_height}")
-            
-            image.save(output_path, 'JPEG', quality=self.quality)
-            print(f"    Processed: {os.path.basename(output_path)}")
-            return output_path
-            
-        except Exception as e:
-            print(f"    Error processing image {input_path}: {e}")
-            return None
-    
-    def fix_path_for_current_system(self, path_str):
-        """Convert Mac/Windows paths to VPS paths"""
-        if not path_str:
-            return None
-            
-        # Convert to string if Path object
-        path_str = str(path_str)
-        
-        # Handle Mac paths: /Users/matthewmacosko/Desktop/ad-generator/data/products/...
-        if '/Users/matthewmacosko/Desktop/ad-generator/' in path_str:
-            relative_part = path_str.split('/ad-generator/', 1)[1]
-            vps_path = os.path.join('/var/www/tools', relative_part)
-            print(f"    Converted Mac path: {path_str} -> {vps_path}")
-            return vps_path
-        
-        # Handle other Mac variations
-        if '/Users/matthewmacosko/' in path_str and 'data/' in path_str:
-            parts = path_str.split('data/', 1)
-            if len(parts) > 1:
-                vps_path = f'/var/www/tools/data/{parts[1]}'
-                print(f"    Converted Mac path variation: {path_str} -> {vps_path}")
-                return vps_path
-        
-        # Handle Windows paths: C:\Users\...\data\products\...
-        if ':\\' in path_str and 'data' in path_str:
-            parts = path_str.replace('\\', '/').split('/')
-            if 'data' in parts:
-                data_index = parts.index('data')
-                relative_parts = parts[data_index:]
-                vps_path = '/var/www/tools/' + '/'.join(relative_parts)
-                print(f"    Converted Windows path: {path_str} -> {vps_path}")
-                return vps_path
-        
-        # If already a VPS path, use as-is
-        if path_str.startswith('/var/www/tools/'):
-            return path_str
-        
-        # If it's a relative path, make it absolute to VPS
-        if not os.path.isabs(path_str):
-            vps_path = os.path.join('/var/www/tools', path_str)
-            return vps_path
-        
-        # If it's already a valid absolute path for VPS, use it
-        if os.path.exists(path_str):
-            return path_str
-        
-        # Last resort: try to extract filename and look in VPS data/products
-        filename = os.path.basename(path_str)
-        if filename:
-            # Try to find the file in VPS data/products structure
-            for root, dirs, files in os.walk('/var/www/tools/data/products'):
-                if filename in files:
-                    found_path = os.path.join(root, filename)
-                    print(f"    Found image by search: {found_path}")
-                    return found_path
-        
-        print(f"    Could not convert path: {path_str}")
-        return None
-    
-    def process_all_product_images(self, product):
-        """Process ALL images for a product with VPS path handling"""
-        
-        # Build stable slug and discover images
-        product_title = product.get('title', 'Unknown Product')
-        slug = slugify(product_title)
-        safe_title = slug if slug != 'unknown' else 'unknown_product'
-        
-        print(f"[REDDIT IMG] Processing images for: {product_title}")
-        print(f"[REDDIT IMG] Slug: {slug}")
-        
-        # Get original images from product data
-        original_images = product.get('local_images', [])
-        if not original_images:
-            single_image = product.get('local_image')
-            if single_image:
-                original_images = [single_image]
-        
-        print(f"[REDDIT IMG] Found {len(original_images)} original image paths")
-        
-        # Convert paths to work with VPS system
-        valid_images = []
-        for i, image_path in enumerate(original_images):
-            fixed_path = self.fix_path_for_current_system(image_path)
-            if fixed_path and os.path.exists(fixed_path):
-                valid_images.append(fixed_path)
-                print(f"[REDDIT IMG] Valid image {i+1}: {os.path.basename(fixed_path)}")
-            else:
-                print(f"[REDDIT IMG] Invalid image {i+1}: {image_path}")
-        
-        if not valid_images:
-            print("[REDDIT IMG] No valid images found after path conversion")
-            return None
-        
-        # Create Reddit folder in VPS temp structure
-        product_reddit_folder = Path('/var/www/tools/temp_ads') / 'reddit' / slug
-        product_reddit_folder.mkdir(parents=True, exist_ok=True)
-        
-        existing_processed = self.get_existing_processed_images(str(product_reddit_folder))
-        processed_images = []
-        
-        print(f"[REDDIT IMG] Processing {len(valid_images)} images for Reddit format...")
-        
-        for i, image_path in enumerate(valid_images):
-            if i == 0:
-                reddit_filename = f"{slug}_main_reddit.jpg"
-            else:
-                reddit_filename = f"{slug}_{i+1}_reddit.jpg"
-            
-            reddit_output_path = product_reddit_folder / reddit_filename
-            
-            if reddit_filename in existing_processed:
-                print(f"    Using existing: {reddit_filename}")
-                processed_images.append(str(reddit_output_path))
-                continue
-            
-            processed_path = self.process_single_image(image_path, str(reddit_output_path))
-            if processed_path:
-                processed_images.append(processed_path)
-        
-        result_data = {
-            'product_folder': str(product_reddit_folder),
-            'processed_images': processed_images,
-            'main_image': processed_images[0] if processed_images else None,
-            'total_processed': len(processed_images),
-            'safe_product_name': safe_title
-        }
-        
-        print(f"[REDDIT IMG] Completed processing: {len(processed_images)} Reddit images")
-        return result_data
-    
-    def get_existing_processed_images(self, folder):
-        """Check for existing processed images"""
-        existing = set()
-        if os.path.exists(folder):
-            for filename in os.listdir(folder):
-                if filename.lower().endswith('_reddit.jpg'):
-                    existing.add(filename)
-        return existing
+    platform = 'reddit'
 
 class RedditGenerator:
     """Reddit post generator with casual SoCal stoner voice and product-focused content"""
@@ -241,7 +58,10 @@ class RedditGenerator:
             print("Invalid product index")
             return None
         
-        product = products[product_index]
+        return self.generate_reddit_post_for_product(products[product_index])
+    
+    def generate_reddit_post_for_product(self, product):
+        """Generate Reddit post data for a product record (looked up by id)"""
         
         print(f"Preparing Reddit post for: {product.get('title', 'Unknown')[:50]}...")
         
@@ -261,6 +81,7 @@ class RedditGenerator:
         post_data = {
             'product_title': product.get('title', 'Unknown Product'),
             'product_url': product.get('url', ''),
+            'product_id': product.get('id'),
             'caption': product_text,  # RAW PRODUCT TEXT - ChatGPT will work with this
             'main_image_path': image_data.get('main_image') if image_data else None,
             'all_reddit_images': image_data.get('processed_images', []) if image_data else [],
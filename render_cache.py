@@ -0,0 +1,159 @@
+"""
+Render Cache - Rendered social images kept by source content and output spec
+A render is reused for any product/slug whose source image has the same bytes, survives temp_ads
+being cleared, and is never served for a source that has since changed
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+from app_config import RENDER_CACHE_DIR, RENDER_CACHE_MAX_MB
+from image_store import file_sha256, link_or_copy
+
+def render_cache_key(source_hash, spec_key):
+    """Key of one render - the source's SHA-256 plus everything in the spec that changes the output"""
+    payload = json.dumps([source_hash, list(spec_key)], separators=(',', ':'))
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()
+
+class RenderCache:
+    """(source hash, spec) -> rendered JPEG, with a size-bounded LRU
+
+    The manifest (SQLite) indexes renders and remembers each source file's hash by
+    path/mtime/size, so lookups never list directories or re-hash unchanged sources.
+    Outputs in temp_ads are hard links to the cached files.
+    """
+
+    SCHEMA = [
+        '''CREATE TABLE IF NOT EXISTS renders (
+            key TEXT PRIMARY KEY,
+            source_hash TEXT NOT NULL,
+            size INTEGER NOT NULL,
+            created_at REAL NOT NULL,
+            accessed_at REAL NOT NULL
+        )''',
+        '''CREATE TABLE IF NOT EXISTS sources (
+            path TEXT PRIMARY KEY,
+            mtime_ns INTEGER NOT NULL,
+            size INTEGER NOT NULL,
+            sha256 TEXT NOT NULL
+        )''',
+        'CREATE INDEX IF NOT EXISTS idx_renders_accessed ON renders(accessed_at)',
+        'CREATE INDEX IF NOT EXISTS idx_renders_source ON renders(source_hash)'
+    ]
+
+    def __init__(self, cache_dir=RENDER_CACHE_DIR, max_bytes=RENDER_CACHE_MAX_MB * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.renders_dir = os.path.join(cache_dir, 'renders')
+        self.database_file = os.path.join(cache_dir, 'renders.db')
+        self.max_bytes = max_bytes
+        os.makedirs(self.renders_dir, exist_ok=True)
+
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.counts = {'hits': 0, 'misses': 0}
+
+    def connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database_file, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+            self._local.conn = conn
+        return conn
+
+    def render_path(self, key):
+        return os.path.join(self.renders_dir, key[:2], key + '.jpg')
+
+    def count(self, name):
+        with self._stats_lock:
+            self.counts[name] += 1
+
+    def source_hash(self, path):
+        """SHA-256 of a source image, re-hashed only when its mtime or size changed"""
+        stat = os.stat(path)
+        conn = self.connect()
+        row = conn.execute('SELECT mtime_ns, size, sha256 FROM sources WHERE path = ?', (path,)).fetchone()
+        if row and row['mtime_ns'] == stat.st_mtime_ns and row['size'] == stat.st_size:
+            return row['sha256']
+        sha256 = file_sha256(path)
+        with conn:
+            conn.execute('INSERT OR REPLACE INTO sources (path, mtime_ns, size, sha256) VALUES (?, ?, ?, ?)',
+                         (path, stat.st_mtime_ns, stat.st_size, sha256))
+        return sha256
+
+    def place(self, key, output_path):
+        """Put the cached render for key at output_path - False when it isn't cached"""
+        output_path = str(output_path)
+        conn = self.connect()
+        row = conn.execute('SELECT key FROM renders WHERE key = ?', (key,)).fetchone()
+        cached_path = self.render_path(key)
+        if row is None or not os.path.exists(cached_path):
+            self.count('misses')
+            return False
+
+        try:
+            current = os.path.exists(output_path) and os.path.samefile(cached_path, output_path)
+        except OSError:
+            current = False
+        # A file from another source (or an older render) at output_path is replaced
+        if not current:
+            link_or_copy(cached_path, output_path)
+        with conn:
+            conn.execute('UPDATE renders SET accessed_at = ? WHERE key = ?', (time.time(), key))
+        self.count('hits')
+        return True
+
+    def add(self, key, source_hash, output_path):
+        """Keep a freshly rendered output_path as the render for key"""
+        cached_path = self.render_path(key)
+        os.makedirs(os.path.dirname(cached_path), exist_ok=True)
+        link_or_copy(str(output_path), cached_path)
+        now = time.time()
+        conn = self.connect()
+        with conn:
+            conn.execute(
+                '''INSERT OR REPLACE INTO renders (key, source_hash, size, created_at, accessed_at)
+                   VALUES (?, ?, ?, ?, ?)''',
+                (key, source_hash, os.path.getsize(cached_path), now, now)
+            )
+        self.evict()
+
+    def evict(self):
+        """Drop least recently used renders until the cache fits in max_bytes"""
+        conn = self.connect()
+        total = conn.execute('SELECT COALESCE(SUM(size), 0) FROM renders').fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+
+        removed = 0
+        for row in conn.execute('SELECT key, size FROM renders ORDER BY accessed_at').fetchall():
+            if total <= self.max_bytes:
+                break
+            with conn:
+                conn.execute('DELETE FROM renders WHERE key = ?', (row['key'],))
+            try:
+                os.remove(self.render_path(row['key']))
+            except OSError:
+                pass
+            total -= row['size']
+            removed += 1
+        return removed
+
+    def stats(self):
+        row = self.connect().execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM renders').fetchone()
+        with self._stats_lock:
+            counts = dict(self.counts)
+        return dict(counts, renders=row[0], bytes=row[1])
+
+if __name__ == '__main__':
+    cache = RenderCache()
+    print(f"Render cache: {cache.cache_dir}")
+    print(cache.stats())
+    print(f"Evicted {cache.evict()} renders")
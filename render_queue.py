@@ -0,0 +1,141 @@
+"""
+Render Queue - Background pre-rendering of freshly scraped products' platform images
+Products go through one low-priority worker thread (rendering in PRERENDER_WORKERS niced
+processes), so review pages find every platform's images already in temp_ads and the render cache
+"""
+import queue
+import threading
+from datetime import datetime
+
+from app_config import PRERENDER_NICE, PRERENDER_WORKERS, RENDER_CACHE_ENABLED
+from image_renderer import ImageRenderer, lower_priority
+from render_cache import RenderCache
+
+# render_status values kept on the product record
+#   queued    - waiting for the worker
+#   rendering - being rendered now
+#   ready     - every platform has all of the product's images
+#   partial   - some images failed to render (the review page renders the rest on open)
+#   no_images - nothing to render (no local images on this system)
+#   failed    - rendering raised an error
+RENDER_STATUSES = ('queued', 'rendering', 'ready', 'partial', 'no_images', 'failed')
+
+class RenderQueue:
+    """FIFO of product ids to pre-render, drained by one daemon thread started on first submit
+
+    database is the ProductDatabase the readiness fields are written to; on_update, when given,
+    is called with {product_id: updates} after each write so in-memory copies stay current.
+    """
+
+    def __init__(self, database, renderer=None, on_update=None):
+        self.database = database
+        self.renderer = renderer or ImageRenderer(
+            workers=PRERENDER_WORKERS,
+            cache=RenderCache() if RENDER_CACHE_ENABLED else None,
+            nice=PRERENDER_NICE
+        )
+        self.on_update = on_update
+        self._queue = queue.Queue()
+        # Ids queued or rendering - a product submitted again meanwhile isn't queued twice
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+        self.counts = {'ready': 0, 'partial': 0, 'no_images': 0, 'failed': 0}
+
+    def record(self, updates_by_id):
+        """Write readiness fields to the database and pass them on to on_update"""
+        if len(updates_by_id) == 1:
+            product_id, updates = next(iter(updates_by_id.items()))
+            self.database.update_product_by_id(product_id, updates)
+        else:
+            self.database.update_products_by_id(updates_by_id)
+        if self.on_update:
+            self.on_update(updates_by_id)
+
+    def submit(self, products):
+        """Queue products (records with an 'id') for pre-rendering, returns how many were queued"""
+        with self._lock:
+            fresh = [p for p in products if p and p.get('id') and p['id'] not in self._pending]
+            self._pending.update(p['id'] for p in fresh)
+        if not fresh:
+            return 0
+
+        self.record({p['id']: {'render_status': 'queued'} for p in fresh})
+        for product in fresh:
+            self._queue.put(product['id'])
+        self.start()
+        print(f"🖼️ Queued {len(fresh)} products for image pre-rendering")
+        return len(fresh)
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self.run, name='render-queue', daemon=True)
+                self._thread.start()
+
+    def run(self):
+        # Rendering in this process (workers == 1) and cache bookkeeping yield to request threads
+        lower_priority(PRERENDER_NICE)
+        while True:
+            product_id = self._queue.get()
+            try:
+                self.render(product_id)
+            except Exception as e:
+                print(f"❌ Pre-render error for {product_id}: {e}")
+            finally:
+                with self._lock:
+                    self._pending.discard(product_id)
+                self._queue.task_done()
+
+    def render(self, product_id):
+        """Render one product for every platform and record how it went"""
+        # Read it fresh - the product may have been refreshed or deleted since it was queued
+        product = self.database.get_product(product_id)
+        if product is None:
+            return
+
+        self.record({product_id: {'render_status': 'rendering'}})
+        try:
+            results = self.renderer.render_product(product)
+        except Exception as e:
+            print(f"❌ Pre-render failed for {product.get('title', product_id)}: {e}")
+            status, rendered = 'failed', {}
+        else:
+            if results is None:
+                status, rendered = 'no_images', {}
+            else:
+                rendered = {platform: data['total_processed'] for platform, data in results.items()}
+                expected = len(self.renderer.source_images(product, tag='PRERENDER'))
+                status = 'ready' if all(count >= expected for count in rendered.values()) else 'partial'
+
+        with self._lock:
+            self.counts[status] += 1
+        self.record({product_id: {
+            'render_status': status,
+            'rendered_images': rendered,
+            'rendered_at': datetime.now().isoformat()
+        }})
+        print(f"✅ Pre-rendered {product.get('title', product_id)[:50]}: {status}")
+
+    def wait(self):
+        """Block until everything queued so far has been rendered"""
+        self._queue.join()
+
+    def status(self):
+        with self._lock:
+            return dict(self.counts, pending=len(self._pending))
+
+    def close(self):
+        self.renderer.close()
+
+if __name__ == '__main__':
+    from database_manager import ProductDatabase
+
+    database = ProductDatabase()
+    render_queue = RenderQueue(database)
+    waiting = [p for p in database.load_products() if p.get('render_status') not in ('ready', 'no_images')]
+    print(f"Pre-rendering {len(waiting)} products")
+    render_queue.submit(waiting)
+    render_queue.wait()
+    print(render_queue.status())
+    render_queue.close()
@@ -0,0 +1,93 @@
+"""
+Response Utils - Conditional GET (ETag / 304) and gzip/brotli compression for Flask responses
+Unchanged JSON is revalidated instead of re-transferred (files served with send_from_directory
+already get mtime/size ETags from Flask); large text responses are compressed
+"""
+import gzip
+import hashlib
+
+from flask import jsonify, make_response, request
+
+try:
+    import brotli
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
+# Only text responses this large are worth compressing
+COMPRESS_MIN_SIZE = 1024
+COMPRESS_MIMETYPES = {
+    'application/json',
+    'text/html',
+    'text/css',
+    'text/plain',
+    'text/javascript',
+    'application/javascript'
+}
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+def make_etag(*parts):
+    """Stable ETag value from anything with a stable repr (generation counters, ids, args)"""
+    digest = hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()
+    return digest[:20]
+
+def not_modified(etag):
+    """True when the client's If-None-Match already covers this ETag"""
+    return request.if_none_match.contains_weak(etag)
+
+def conditional_json(build_payload, *etag_parts):
+    """jsonify(build_payload()) with an ETag - answers 304 without building the payload when unchanged"""
+    etag = make_etag(request.path, sorted(request.args.items(multi=True)), *etag_parts)
+    if not_modified(etag):
+        response = make_response('', 304)
+    else:
+        response = jsonify(build_payload())
+    response.set_etag(etag)
+    # Always revalidate - the ETag makes that cheap
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+def choose_encoding(accept_encoding):
+    if BROTLI_AVAILABLE and 'br' in accept_encoding:
+        return 'br'
+    if 'gzip' in accept_encoding:
+        return 'gzip'
+    return None
+
+def compress_response(response):
+    """after_request hook - gzip/brotli compress large text responses the client accepts"""
+    if response.status_code != 200 or 'Content-Encoding' in response.headers:
+        return response
+    if response.mimetype not in COMPRESS_MIMETYPES:
+        return response
+
+    response.vary.add('Accept-Encoding')
+    encoding = choose_encoding(request.headers.get('Accept-Encoding', ''))
+    if encoding is None:
+        return response
+
+    # Static files are streamed - read them in (they're small text assets)
+    response.direct_passthrough = False
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == 'br':
+        compressed = brotli.compress(data, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+    response.set_data(compressed)
+    response.headers['Content-Encoding'] = encoding
+
+    # The compressed bytes differ from the identity ones, so a strong ETag becomes weak
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
+
+def install_response_layer(app):
+    """Register compression on a Flask app"""
+    app.after_request(compress_response)
+    return app
@@ -0,0 +1,140 @@
+"""
+Scrape Pipeline - Concurrent product scraping with per-host politeness
+Page fetch/parse and image downloads run as overlapping stages on bounded thread pools,
+with a per-domain token bucket replacing fixed sleeps between requests
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+def host_of(url):
+    """Domain of a URL without www. (matches ProductScraperCore.get_domain_from_url)"""
+    host = urlparse(url).netloc.lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    return host
+
+class TokenBucket:
+    """Classic token bucket - rate tokens per second, up to burst saved up"""
+
+    def __init__(self, rate, burst=1):
+        self.rate = float(rate)
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        """Take a token and return how long the caller has to wait before using it
+
+        Tokens may go negative, so waiting callers queue up in arrival order
+        instead of all waking at once.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+class HostRateLimiter:
+    """One token bucket per domain - every request to a site goes through acquire()"""
+
+    def __init__(self, rate=2.0, burst=2, overrides=None):
+        self.rate = rate
+        self.burst = burst
+        # domain -> (rate, burst) for sites that need a different limit
+        self.overrides = overrides or {}
+        self._buckets = {}
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.total_wait = 0.0
+
+    def bucket_for(self, host):
+        with self._lock:
+            bucket = self._buckets.get(host)
+            if bucket is None:
+                rate, burst = self.overrides.get(host, (self.rate, self.burst))
+                bucket = self._buckets[host] = TokenBucket(rate, burst)
+            return bucket
+
+    def reserve(self, url):
+        """Claim a request slot for this URL's host and return the seconds to wait before using it"""
+        wait = self.bucket_for(host_of(url)).reserve()
+        with self._lock:
+            self.requests += 1
+            self.total_wait += wait
+        return wait
+
+    def acquire(self, url):
+        """Block until a request to this URL's host is allowed"""
+        wait = self.reserve(url)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    def stats(self):
+        with self._lock:
+            return {
+                'requests': self.requests,
+                'total_wait_seconds': round(self.total_wait, 2),
+                'hosts': sorted(self._buckets)
+            }
+
+class ScrapePipeline:
+    """Two overlapping stages: fetch+parse product pages, then download images and save
+
+    Products come back in the same order as the input URLs.
+    """
+
+    def __init__(self, scraper, workers=4, image_workers=4):
+        self.scraper = scraper
+        self.workers = max(1, workers)
+        self.image_workers = max(1, image_workers)
+
+    def run(self, urls, scrape_source="unknown"):
+        total = len(urls)
+        results = [None] * total
+        counts = {'done': 0, 'successful': 0, 'failed': 0}
+        counts_lock = threading.Lock()
+
+        def finished(product):
+            with counts_lock:
+                counts['done'] += 1
+                counts['successful' if product else 'failed'] += 1
+                done = counts['done']
+                if done % 5 == 0 or done == total:
+                    print(f"  Progress: {counts['successful']} successful, {counts['failed']} failed ({done}/{total})")
+
+        with ThreadPoolExecutor(self.image_workers, thread_name_prefix='scrape-images') as image_pool, \
+                ThreadPoolExecutor(self.workers, thread_name_prefix='scrape-pages') as page_pool:
+
+            def finish(position, page):
+                try:
+                    product = self.scraper.finish_product(page)
+                except Exception as e:
+                    print(f"  Failed to finish {page['url']}: {e}")
+                    product = None
+                results[position] = product
+                finished(product)
+
+            def fetch(position, url):
+                try:
+                    page = self.scraper.fetch_product(url, scrape_source)
+                except Exception as e:
+                    print(f"  Failed to fetch {url}: {e}")
+                    page = None
+                if page is None:
+                    finished(None)
+                    return
+                # Hand over to the image stage so the next page fetch overlaps these downloads
+                image_pool.submit(finish, position, page)
+
+            page_futures = [page_pool.submit(fetch, position, url) for position, url in enumerate(urls)]
+            for future in page_futures:
+                future.result()
+
+        return [product for product in results if product]
@@ -0,0 +1,249 @@
+"""
+Search Index - In-memory inverted index for product full-text search
+Accent-folded tokens over title, description, short_description, category and SKU with BM25 ranking
+"""
+import bisect
+import math
+import re
+import threading
+import unicodedata
+
+# Indexed product fields and their weight in the ranking
+SEARCH_FIELDS = {
+    'title': 3.0,
+    'sku': 2.0,
+    'category': 2.0,
+    'short_description': 1.0,
+    'description': 1.0
+}
+
+TOKEN_PATTERN = re.compile(r'[a-z0-9]+')
+
+def fold_text(text):
+    """Lowercase and strip accents (Café -> cafe)"""
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(c for c in decomposed if not unicodedata.combining(c)).lower()
+
+def tokenize(text):
+    if not isinstance(text, str) or not text:
+        return []
+    return TOKEN_PATTERN.findall(fold_text(text))
+
+class SearchIndex:
+    """Inverted index keyed by product id, maintained incrementally as products change"""
+
+    # BM25 parameters
+    K1 = 1.2
+    B = 0.75
+    # Prefix matches rank below exact term matches
+    PREFIX_WEIGHT = 0.7
+    MIN_PREFIX_LENGTH = 2
+
+    def __init__(self, fields=None):
+        self.fields = fields or SEARCH_FIELDS
+        self._lock = threading.RLock()
+        self._postings = {}      # term -> {product_id: weighted term frequency}
+        self._vocabulary = []    # sorted terms, for prefix lookup with bisect
+        self._doc_terms = {}     # product_id -> terms (so removal only touches its own postings)
+        self._doc_info = {}      # product_id -> {'length', 'domain', 'scrape_source', 'fingerprint'}
+        self._total_length = 0.0
+
+    def __len__(self):
+        return len(self._doc_info)
+
+    def __contains__(self, product_id):
+        return product_id in self._doc_info
+
+    def fingerprint(self, product):
+        """Cheap change detector over the indexed fields and filters (repr, so list values hash too)"""
+        return hash(tuple(repr(product.get(field)) for field in self.fields)
+                    + (product.get('domain'), product.get('scrape_source')))
+
+    # Maintenance
+
+    def add(self, product):
+        """Index (or re-index) one product"""
+        product_id = product.get('id')
+        if not product_id:
+            return False
+
+        term_weights = {}
+        for field, weight in self.fields.items():
+            for token in tokenize(product.get(field)):
+                term_weights[token] = term_weights.get(token, 0.0) + weight
+
+        with self._lock:
+            self._remove(product_id)
+
+            for term, weight in term_weights.items():
+                postings = self._postings.get(term)
+                if postings is None:
+                    postings = self._postings[term] = {}
+                    bisect.insort(self._vocabulary, term)
+                postings[product_id] = weight
+
+            length = sum(term_weights.values())
+            self._doc_terms[product_id] = tuple(term_weights)
+            self._doc_info[product_id] = {
+                'length': length,
+                'domain': product.get('domain'),
+                'scrape_source': product.get('scrape_source'),
+                'fingerprint': self.fingerprint(product)
+            }
+            self._total_length += length
+        return True
+
+    def add_many(self, products):
+        return sum(1 for product in products if self.add(product))
+
+    def remove(self, product_id):
+        with self._lock:
+            return self._remove(product_id)
+
+    def _remove(self, product_id):
+        info = self._doc_info.pop(product_id, None)
+        if info is None:
+            return False
+
+        for term in self._doc_terms.pop(product_id, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(product_id, None)
+            if not postings:
+                del self._postings[term]
+                position = bisect.bisect_left(self._vocabulary, term)
+                if position < len(self._vocabulary) and self._vocabulary[position] == term:
+                    del self._vocabulary[position]
+        self._total_length -= info['length']
+        return True
+
+    def sync(self, products):
+        """Bring the index in line with a product list - only new, changed or removed products are touched"""
+        with self._lock:
+            seen = set()
+            changed = 0
+            for product in products:
+                product_id = product.get('id')
+                if not product_id:
+                    continue
+                seen.add(product_id)
+                info = self._doc_info.get(product_id)
+                if info is None or info['fingerprint'] != self.fingerprint(product):
+                    self.add(product)
+                    changed += 1
+
+            for product_id in [pid for pid in self._doc_info if pid not in seen]:
+                self._remove(product_id)
+                changed += 1
+            return changed
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._vocabulary.clear()
+            self._doc_terms.clear()
+            self._doc_info.clear()
+            self._total_length = 0.0
+
+    # Queries
+
+    def _expand(self, token):
+        """Index terms a query token matches: itself (exact) plus every term it is a prefix of
+
+        Not capped - a cut-off list would drop matching products from the results instead of
+        ranking them lower.
+        """
+        matches = {}
+        if token in self._postings:
+            matches[token] = 1.0
+        if len(token) >= self.MIN_PREFIX_LENGTH:
+            position = bisect.bisect_left(self._vocabulary, token)
+            while position < len(self._vocabulary):
+                term = self._vocabulary[position]
+                if not term.startswith(token):
+                    break
+                if term != token:
+                    matches[term] = self.PREFIX_WEIGHT
+                position += 1
+        return matches
+
+    def search(self, query, domain=None, scrape_source=None, limit=20, offset=0):
+        """Ranked AND search - every query token must match a term (exactly or as a prefix)
+
+        Returns (total_matches, [(product_id, score), ...]) for the requested page
+        """
+        tokens = list(dict.fromkeys(tokenize(query)))
+        if not tokens:
+            return 0, []
+
+        with self._lock:
+            doc_count = len(self._doc_info)
+            if doc_count == 0:
+                return 0, []
+            average_length = self._total_length / doc_count or 1.0
+
+            scores = None
+            for token in tokens:
+                token_scores = {}
+                for term, match_weight in self._expand(token).items():
+                    postings = self._postings[term]
+                    idf = math.log(1 + (doc_count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for product_id, tf in postings.items():
+                        if scores is not None and product_id not in scores:
+                            continue
+                        length = self._doc_info[product_id]['length']
+                        norm = tf + self.K1 * (1 - self.B + self.B * length / average_length)
+                        term_score = match_weight * idf * tf * (self.K1 + 1) / norm
+                        # Best matching expansion counts once per query token
+                        if term_score > token_scores.get(product_id, 0.0):
+                            token_scores[product_id] = term_score
+
+                if scores is None:
+                    scores = token_scores
+                else:
+                    scores = {pid: scores[pid] + score for pid, score in token_scores.items()}
+                if not scores:
+                    return 0, []
+
+            if domain or scrape_source:
+                scores = {
+                    pid: score for pid, score in scores.items()
+                    if (not domain or self._doc_info[pid]['domain'] == domain)
+                    and (not scrape_source or self._doc_info[pid]['scrape_source'] == scrape_source)
+                }
+
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))
+        return len(ranked), ranked[offset:offset + limit]
+
+    def stats(self):
+        return {
+            'documents': len(self._doc_info),
+            'terms': len(self._postings)
+        }
+
+if __name__ == '__main__':
+    import random
+    import time
+
+    index = SearchIndex()
+    index.add_many([
+        {'id': '1', 'title': 'Crème Brûlée Vape Cartridge', 'category': 'Vaporizers', 'domain': 'ineedhemp.com'},
+        {'id': '2', 'title': 'Blue Dream Feminized Seeds', 'category': 'Seeds', 'domain': 'tribeseedbank.com',
+         'description': 'Sativa dominant hybrid with sweet berry aroma'},
+        {'id': '3', 'title': 'Dab Rig Cleaning Kit', 'sku': 'NDW-1042', 'domain': 'nicedreamzwholesale.com'}
+    ])
+    for query in ['creme', 'vap', 'seeds berry', 'ndw 1042', 'nothing']:
+        print(f"{query!r}: {index.search(query)}")
+
+    # Latency with a larger synthetic catalog
+    words = ['hemp', 'vape', 'seed', 'dream', 'glass', 'rig', 'kush', 'blue', 'gold', 'berry', 'haze', 'cbd']
+    for i in range(20000):
+        index.add({
+            'id': f"p{i}",
+            'title': ' '.join(random.choices(words, k=4)) + f" {i}",
+            'description': ' '.join(random.choices(words, k=40))
+        })
+    start = time.perf_counter()
+    total, page = index.search('blue kush', limit=20)
+    print(f"20k products: {total} matches in {(time.perf_counter() - start) * 1000:.1f}ms")
@@ -0,0 +1,187 @@
+"""
+Site Profiles - Registry of supported WooCommerce stores, loaded once from site_profiles.json
+Each profile carries the store's listing paths, selector overrides, request rate, concurrency
+and image rules, so adding a store or tuning a host is a config change instead of a deploy
+"""
+import json
+import re
+from urllib.parse import urljoin, urlparse
+
+from app_config import SCRAPE_ASYNC_PER_HOST, SCRAPE_BURST_PER_HOST, SCRAPE_RATE_PER_HOST, SITE_PROFILES_FILE
+
+try:
+    import yaml
+    YAML_AVAILABLE = True
+except ImportError:
+    YAML_AVAILABLE = False
+
+def normalize_domain(domain):
+    domain = (domain or '').lower().strip()
+    if domain.startswith('www.'):
+        domain = domain[4:]
+    return domain
+
+def compile_terms(terms):
+    """Case-insensitive matcher for any of the substrings, None when there are none"""
+    if not terms:
+        return None
+    return re.compile('|'.join(re.escape(term) for term in terms), re.IGNORECASE)
+
+class SiteProfile:
+    """One store - site settings merged over the file's defaults, with its matchers precompiled
+
+    Optional keys: listings (category -> path), selectors (extraction field -> selector list,
+    see extraction_engine), rate_per_host / burst (requests per second), max_connections (async
+    requests in flight), page_cache_ttl (seconds) and images (hosts, exclude_terms, exclude_sizes).
+    """
+
+    def __init__(self, key, config, defaults=None):
+        defaults = defaults or {}
+        self.key = key
+        self.domain = normalize_domain(config.get('domain'))
+        if not self.domain:
+            raise ValueError(f"Site profile '{key}' has no domain")
+        self.name = config.get('name') or key or self.domain
+        self.base_url = (config.get('base_url') or f'https://{self.domain}').rstrip('/')
+        self.description = config.get('description', '')
+
+        self.listings = dict(defaults.get('listings', {}), **config.get('listings', {}))
+        self.selectors = dict(defaults.get('selectors', {}), **config.get('selectors', {}))
+        self.rate_per_host = float(config.get('rate_per_host', defaults.get('rate_per_host', SCRAPE_RATE_PER_HOST)))
+        self.burst = int(config.get('burst', defaults.get('burst', SCRAPE_BURST_PER_HOST)))
+        self.max_connections = int(config.get('max_connections', defaults.get('max_connections', SCRAPE_ASYNC_PER_HOST)))
+        self.page_cache_ttl = config.get('page_cache_ttl', defaults.get('page_cache_ttl'))
+
+        images = dict(defaults.get('images', {}), **config.get('images', {}))
+        self.image_hosts = tuple([self.domain] + [normalize_domain(host) for host in images.get('hosts', [])])
+        self.image_exclude = compile_terms(images.get('exclude_terms'))
+        self.image_exclude_sizes = compile_terms(images.get('exclude_sizes'))
+
+    def listing_url(self, category):
+        """Listing page URL for a configured category, None if the site has no such listing"""
+        path = self.listings.get(category)
+        if not path:
+            return None
+        return urljoin(self.base_url + '/', path.lstrip('/'))
+
+    def owns_url(self, url):
+        host = normalize_domain(urlparse(url).netloc)
+        return host == self.domain or host.endswith('.' + self.domain)
+
+    def absolute_url(self, url):
+        if url.startswith('//'):
+            return 'https:' + url
+        if url.startswith('/'):
+            return self.base_url + url
+        return url
+
+    def is_valid_image_url(self, url):
+        """Product image from one of the site's image hosts, not a theme asset or thumbnail"""
+        if self.image_exclude and self.image_exclude.search(url):
+            return False
+        if self.image_exclude_sizes and self.image_exclude_sizes.search(url):
+            return False
+        return any(host in url for host in self.image_hosts)
+
+    def extraction_rules(self):
+        """Rule overrides for extraction_engine.ExtractionEngine"""
+        return {field: {'selectors': list(selectors)} for field, selectors in self.selectors.items()}
+
+    def site_config(self):
+        """The classic site dict (name, domain, base_url, description plus listing paths)"""
+        return dict(self.listings, name=self.name, domain=self.domain, base_url=self.base_url,
+                    description=self.description)
+
+class SiteRegistry:
+    """All site profiles from one file (JSON, or YAML when PyYAML is installed), in file order"""
+
+    def __init__(self, path=SITE_PROFILES_FILE):
+        self.path = path
+        data = self.read(path)
+        self.defaults = data.get('defaults', {})
+        self.profiles = {key: SiteProfile(key, config, self.defaults) for key, config in data.get('sites', {}).items()}
+        self.by_domain = {profile.domain: profile for profile in self.profiles.values()}
+
+    @staticmethod
+    def read(path):
+        with open(path, 'r', encoding='utf-8') as f:
+            if path.endswith(('.yml', '.yaml')):
+                if not YAML_AVAILABLE:
+                    raise ImportError(f"PyYAML is needed to read {path}")
+                return yaml.safe_load(f) or {}
+            return json.load(f)
+
+    def __contains__(self, key):
+        return key in self.profiles
+
+    def __len__(self):
+        return len(self.profiles)
+
+    def get(self, key):
+        return self.profiles.get(key)
+
+    def keys(self):
+        return list(self.profiles)
+
+    def default_key(self):
+        """First site in the file - used when a caller doesn't name one"""
+        return next(iter(self.profiles), None)
+
+    def domains(self):
+        return list(self.by_domain)
+
+    def for_url(self, url, fallback=True):
+        """Profile of the site a URL belongs to - a defaults-only profile for unknown sites unless fallback=False"""
+        domain = normalize_domain(urlparse(url).netloc)
+        profile = self.by_domain.get(domain)
+        if profile is None:
+            for candidate in self.profiles.values():
+                if candidate.owns_url(url):
+                    return candidate
+            if fallback and domain:
+                parsed = urlparse(url)
+                base_url = f"{parsed.scheme or 'https'}://{parsed.netloc}"
+                profile = SiteProfile(None, {'domain': domain, 'base_url': base_url}, self.defaults)
+        return profile
+
+    def site_configs(self):
+        return {key: profile.site_config() for key, profile in self.profiles.items()}
+
+    def supported_sites(self):
+        return {key: {'name': profile.name, 'domain': profile.domain, 'base_url': profile.base_url,
+                      'description': profile.description} for key, profile in self.profiles.items()}
+
+    def extraction_rules(self):
+        return {profile.domain: profile.extraction_rules() for profile in self.profiles.values() if profile.selectors}
+
+    def rate_overrides(self):
+        """domain -> (rate, burst) for scrape_pipeline.HostRateLimiter"""
+        return {profile.domain: (profile.rate_per_host, profile.burst) for profile in self.profiles.values()}
+
+    def connection_limits(self):
+        return {profile.domain: profile.max_connections for profile in self.profiles.values()}
+
+    def page_cache_ttls(self):
+        return {profile.domain: int(profile.page_cache_ttl) for profile in self.profiles.values()
+                if profile.page_cache_ttl is not None}
+
+_registry = None
+
+def get_registry():
+    """The process-wide registry, read from SITE_PROFILES_FILE on first use"""
+    global _registry
+    if _registry is None:
+        _registry = SiteRegistry()
+    return _registry
+
+def reload_registry(path=None):
+    global _registry
+    _registry = SiteRegistry(path or SITE_PROFILES_FILE)
+    return _registry
+
+if __name__ == '__main__':
+    registry = get_registry()
+    print(f"Site profiles: {registry.path}")
+    for key, profile in registry.profiles.items():
+        print(f"  {key}: {profile.name} ({profile.domain}) - {profile.rate_per_host}/s burst {profile.burst}, "
+              f"{profile.max_connections} async connections, listings {sorted(profile.listings)}")
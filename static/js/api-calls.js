@@ -179,7 +179,7 @@ async function scrapeCustomUrl() {
 
 // FIXED: Instagram generation with aggressive cache busting
 async function generateInstagram() {
-    if (selectedProductIndex === null) {
+    if (selectedProductId === null) {
         await showAlert('Please select a product first by clicking on it!');
         return;
     }
@@ -188,7 +188,7 @@ async function generateInstagram() {
         const response = await fetch('/api/generate_instagram', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ product_index: selectedProductIndex })
+            body: JSON.stringify({ product_id: selectedProductId })
         });
         const data = await response.json();
         if (data.success) {
@@ -196,7 +196,7 @@ async function generateInstagram() {
             // CACHE BUSTING: Add timestamp and random number to force fresh page load
             const timestamp = Date.now();
             const random = Math.random().toString(36).substring(7);
-            const reviewUrl = `/instagram_review/${selectedProductIndex}?bust=${timestamp}&r=${random}`;
+            const reviewUrl = `/instagram_review/id/${selectedProductId}?bust=${timestamp}&r=${random}`;
             window.open(reviewUrl, '_blank');
         } else {
             updateStatus('❌ Error: ' + data.error);
@@ -208,7 +208,7 @@ async function generateInstagram() {
 
 // FIXED: Facebook generation with aggressive cache busting
 async function generateFacebook() {
-    if (selectedProductIndex === null) {
+    if (selectedProductId === null) {
         await showAlert('Please select a product first by clicking on it!');
         return;
     }
@@ -217,7 +217,7 @@ async function generateFacebook() {
         const response = await fetch('/api/generate_facebook', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ product_index: selectedProductIndex })
+            body: JSON.stringify({ product_id: selectedProductId })
         });
         const data = await response.json();
         if (data.success) {
@@ -225,7 +225,7 @@ async function generateFacebook() {
             // CACHE BUSTING: Add timestamp and random number to force fresh page load
             const timestamp = Date.now();
             const random = Math.random().toString(36).substring(7);
-            const reviewUrl = `/facebook_review/${selectedProductIndex}?bust=${timestamp}&r=${random}`;
+            const reviewUrl = `/facebook_review/id/${selectedProductId}?bust=${timestamp}&r=${random}`;
             window.open(reviewUrl, '_blank');
         } else {
             updateStatus('❌ Error: ' + data.error);
@@ -237,7 +237,7 @@ async function generateFacebook() {
 
 // FIXED: Reddit generation with aggressive cache busting
 async function generateReddit() {
-    if (selectedProductIndex === null) {
+    if (selectedProductId === null) {
         await showAlert('Please select a product first by clicking on it!');
         return;
     }
@@ -246,7 +246,7 @@ async function generateReddit() {
         const response = await fetch('/api/generate_reddit', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ product_index: selectedProductIndex })
+            body: JSON.stringify({ product_id: selectedProductId })
         });
         const data = await response.json();
         if (data.success) {
@@ -254,7 +254,7 @@ async function generateReddit() {
             // CACHE BUSTING: Add timestamp and random number to force fresh page load
             const timestamp = Date.now();
             const random = Math.random().toString(36).substring(7);
-            const reviewUrl = `/reddit_review/${selectedProductIndex}?bust=${timestamp}&r=${random}`;
+            const reviewUrl = `/reddit_review/id/${selectedProductId}?bust=${timestamp}&r=${random}`;
             window.open(reviewUrl, '_blank');
         } else {
             updateStatus('❌ Error: ' + data.error);
@@ -266,7 +266,7 @@ async function generateReddit() {
 
 // FIXED: Twitter generation with aggressive cache busting
 async function generateTwitter() {
-    if (selectedProductIndex === null) {
+    if (selectedProductId === null) {
         await showAlert('Please select a product first by clicking on it!');
         return;
     }
@@ -275,7 +275,7 @@ async function generateTwitter() {
         const response = await fetch('/api/generate_twitter', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ product_index: selectedProductIndex })
+            body: JSON.stringify({ product_id: selectedProductId })
         });
         const data = await response.json();
         if (data.success) {
@@ -283,7 +283,7 @@ async function generateTwitter() {
             // CACHE BUSTING: Add timestamp and random number to force fresh page load
             const timestamp = Date.now();
             const random = Math.random().toString(36).substring(7);
-            const reviewUrl = `/twitter_review/${selectedProductIndex}?bust=${timestamp}&r=${random}`;
+            const reviewUrl = `/twitter_review/id/${selectedProductId}?bust=${timestamp}&r=${random}`;
             window.open(reviewUrl, '_blank');
         } else {
             updateStatus('❌ Error: ' + data.error);
@@ -301,7 +301,7 @@ async function deleteProduct(index) {
         const response = await fetch('/api/delete_product', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ product_index: index })
+            body: JSON.stringify({ product_id: products[index].id })
         });
         const data = await response.json();
         if (data.success) {
@@ -3,6 +3,10 @@
 // Global state variables
 let products = [];
 let selectedProductIndex = null;
+let selectedProductId = null;  // stable id sent to the API - list positions shift on delete
+let nextCursor = null;         // id of the last loaded product when more pages exist
+let productTotals = { count: 0, images: 0 };
+const PRODUCTS_PAGE_SIZE = 60;
 let progressCheckInterval = null;
 let isScrapingActive = false;
 let alertResolve = null;
@@ -13,11 +17,22 @@ document.addEventListener('DOMContentLoaded', function() {
     loadProducts();
 });
 
-// Load products from server - FIXED with better error handling
-async function loadProducts() {
+// Load products from server - one page of list fields at a time (full records via /api/products/<id>)
+async function loadProducts(append = false) {
     try {
         console.log('📡 Fetching products from API...');
-        const response = await fetch('/api/products');
+        const params = new URLSearchParams({ fields: 'list', limit: PRODUCTS_PAGE_SIZE });
+        if (append && nextCursor) {
+            params.set('cursor', nextCursor);
+        }
+        const response = await fetch(`/api/products?${params}`);
+        
+        if (append && response.status === 400) {
+            // The last loaded product was deleted - start again from the first page
+            console.log('⚠️ Cursor no longer valid, reloading products');
+            nextCursor = null;
+            return loadProducts();
+        }
         
         if (!response.ok) {
             throw new Error(`HTTP ${response.status}: ${response.statusText}`);
@@ -26,8 +41,15 @@ async function loadProducts() {
         const data = await response.json();
         console.log('📦 API Response:', data);
         
-        products = data.products || [];
-        selectedProductIndex = data.selected_index;
+        products = append ? products.concat(data.products || []) : (data.products || []);
+        nextCursor = data.next_cursor || null;
+        productTotals = { count: data.total_count || 0, images: data.total_images || 0 };
+        selectedProductId = data.selected_id || null;
+        selectedProductIndex = products.findIndex(p => p.id === selectedProductId);
+        if (selectedProductIndex === -1) {
+            // Selected product is on a page that isn't loaded yet
+            selectedProductIndex = null;
+        }
         
         console.log(`✅ Loaded ${products.length} products`);
         
@@ -75,8 +97,8 @@ function renderProducts() {
     try {
         container.innerHTML = products.map((product, index) => {
             let imageSrc = '';
-            if (product.local_images && product.local_images.length > 0) {
-                let imagePath = product.local_images[0];
+            if (product.thumbnail) {
+                let imagePath = product.thumbnail;
                 console.log(`🖼️ Processing image path: ${imagePath}`);
                 
                 if (imagePath.includes('/')) {
@@ -104,7 +126,7 @@ function renderProducts() {
                     <div class="product-info">
                         <div class="product-title">${product.title || 'Unknown Product'}</div>
                         <div class="product-price">${product.price || 'Price not available'}</div>
-                        <div class="product-description">${truncateText(product.description || '', 320)}</div>
+                        <div class="product-description">${truncateText(product.excerpt || '', 320)}</div>
                         <div class="product-source" style="font-size: 11px; color: #888; margin-top: 5px;">
                             ${product.domain ? `📍 ${product.domain}` : ''}
                         </div>
@@ -116,7 +138,11 @@ function renderProducts() {
                     </div>
                 </div>
             `;
-        }).join('');
+        }).join('') + (nextCursor ? `
+                <div class="no-products">
+                    <button onclick="loadProducts(true)" style="padding: 8px 16px; background: #0066ff; color: white; border: none; border-radius: 5px; cursor: pointer;">⬇️ Load more (${products.length} of ${productTotals.count})</button>
+                </div>
+            ` : '');
         
         console.log('✅ Products rendered successfully');
         
@@ -138,8 +164,8 @@ function truncateText(text, maxLength) {
 }
 
 function updateProductCount() {
-    const totalProducts = products.length;
-    const totalImages = products.reduce((sum, p) => sum + (p.local_images ? p.local_images.length : 0), 0);
+    const totalProducts = productTotals.count;
+    const totalImages = productTotals.images;
     const countElement = document.getElementById('products-count');
     if (countElement) {
         countElement.textContent = `${totalProducts} products • ${totalImages} images`;
@@ -161,11 +187,12 @@ async function selectProduct(index) {
         const response = await fetch('/api/select_product', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ product_index: index })
+            body: JSON.stringify({ product_id: products[index].id })
         });
         const data = await response.json();
         if (data.success) {
             selectedProductIndex = index;
+            selectedProductId = products[index].id;
             renderProducts();
             updateStatus(`✅ Selected: ${products[index].title.substring(0, 30)}...`);
         }
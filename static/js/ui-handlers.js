@@ -57,7 +57,7 @@ async function openProductFolder(index) {
         const response = await fetch('/api/open_folder', {
             method: 'POST',
             headers: { 'Content-Type': 'application/json' },
-            body: JSON.stringify({ product_index: index })
+            body: JSON.stringify({ product_id: products[index].id })
         });
         
         const data = await response.json();
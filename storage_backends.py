@@ -0,0 +1,1043 @@
+"""
+Storage Backends - Pluggable persistence for the product database
+JSON file storage (original products_master.json format), journaled JSON (snapshot + append-only log)
+and SQLite storage with indexed lookups
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from datetime import datetime
+
+try:
+    import fcntl
+except ImportError:
+    # Windows development machines - fall back to in-process locking only
+    fcntl = None
+
+DATABASE_VERSION = '3.0-universal'
+
+def build_metadata(total_products=0, supported_sites=None):
+    """Build a fresh metadata block"""
+    now = datetime.now().isoformat()
+    metadata = {
+        'version': DATABASE_VERSION,
+        'created': now,
+        'last_updated': now,
+        'total_products': total_products
+    }
+    if supported_sites is not None:
+        metadata['supported_sites'] = list(supported_sites)
+    return metadata
+
+def normalize_document(data):
+    """Convert old list format or partial documents to the metadata wrapper format"""
+    if isinstance(data, list):
+        return {'metadata': build_metadata(len(data)), 'products': data}
+
+    if 'products' not in data:
+        data['products'] = []
+    if 'metadata' not in data:
+        data['metadata'] = build_metadata(len(data['products']))
+    return data
+
+def make_product_id(product, taken=()):
+    """Stable product ID - hash of the product URL, random if there is no URL or it's already taken"""
+    url = product.get('url')
+    if url:
+        product_id = hashlib.sha1(url.encode('utf-8')).hexdigest()[:16]
+        if product_id not in taken:
+            return product_id
+    return uuid.uuid4().hex[:16]
+
+def assign_product_ids(products, taken=None):
+    """Give every product without an 'id' a unique one, returns how many were assigned"""
+    taken = set(taken or ())
+    taken.update(product['id'] for product in products if product.get('id'))
+    assigned = 0
+    for product in products:
+        if not product.get('id'):
+            product['id'] = make_product_id(product, taken)
+            taken.add(product['id'])
+            assigned += 1
+    return assigned
+
+def atomic_write_json(path, data, indent=None):
+    """Write JSON to a temp file, fsync it and os.replace it into place"""
+    temp_path = f"{path}.tmp.{os.getpid()}.{threading.get_ident()}"
+    try:
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            if indent is None:
+                json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+            else:
+                json.dump(data, f, indent=indent, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+class FileWriteLock:
+    """Advisory inter-process write lock (fcntl.flock on a sidecar .lock file), reentrant per process"""
+
+    def __init__(self, path):
+        self.lock_path = path + '.lock'
+        self.thread_lock = threading.RLock()
+        self._depth = 0
+        self._fd = None
+
+    def __enter__(self):
+        self.thread_lock.acquire()
+        try:
+            if self._depth == 0:
+                self._fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+                if fcntl:
+                    fcntl.flock(self._fd, fcntl.LOCK_EX)
+            self._depth += 1
+        except Exception:
+            if self._fd is not None and self._depth == 0:
+                os.close(self._fd)
+                self._fd = None
+            self.thread_lock.release()
+            raise
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth == 0:
+            if fcntl:
+                fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+        self.thread_lock.release()
+        return False
+
+class StorageBackend:
+    """Base backend - record-level operations built on whole-document load/save"""
+
+    name = 'base'
+
+    def __init__(self, database_file, before_write=None):
+        self.database_file = database_file
+        # Called before any write that replaces stored data (used for backups)
+        self.before_write = before_write
+        # Serializes writers across threads and processes - readers never take it
+        self.write_lock = FileWriteLock(database_file)
+
+    # Document-level operations (implemented by subclasses)
+
+    def exists(self):
+        raise NotImplementedError
+
+    def initialize(self, data):
+        raise NotImplementedError
+
+    def load_document(self):
+        raise NotImplementedError
+
+    def save_document(self, data):
+        raise NotImplementedError
+
+    def size_bytes(self):
+        raise NotImplementedError
+
+    def write_document(self, data):
+        """Stamp metadata and persist a complete document"""
+        with self.write_lock:
+            if self.before_write:
+                self.before_write()
+
+            if 'metadata' not in data:
+                data['metadata'] = {}
+            data['metadata']['last_updated'] = datetime.now().isoformat()
+            data['metadata']['total_products'] = len(data.get('products', []))
+
+            return self.save_document(data)
+
+    def cache_stats(self):
+        """Read cache counters - backends without a document cache report none"""
+        return {}
+
+    def change_token(self):
+        """Value that changes whenever stored products change (None = unknown, assume changed)"""
+        return None
+
+    def export_to(self, path):
+        """Write the current document as pretty-printed JSON (used for backups)"""
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(self.load_document(), f, indent=2, ensure_ascii=False)
+        return path
+
+    # Record-level operations (generic versions - subclasses may override)
+
+    def list_products(self):
+        return self.load_document().get('products', [])
+
+    def count_products(self):
+        return len(self.list_products())
+
+    def get_urls(self, scrape_source=None):
+        urls = set()
+        for product in self.list_products():
+            if scrape_source and product.get('scrape_source') != scrape_source:
+                continue
+            if product.get('url'):
+                urls.add(product['url'])
+        return urls
+
+    def has_url(self, url, scrape_source=None):
+        return url in self.get_urls(scrape_source)
+
+    def insert_products(self, products):
+        with self.write_lock:
+            data = self.load_document()
+            data['products'].extend(products)
+            return self.write_document(data)
+
+    def delete_at(self, index):
+        with self.write_lock:
+            data = self.load_document()
+            products = data['products']
+            if not 0 <= index < len(products):
+                return None
+
+            deleted_product = products.pop(index)
+            if not self.write_document(data):
+                return None
+            return deleted_product
+
+    def update_at(self, index, updates):
+        with self.write_lock:
+            data = self.load_document()
+            products = data['products']
+            if not 0 <= index < len(products):
+                return None
+
+            products[index] = dict(products[index], **updates)
+            if not self.write_document(data):
+                return None
+            return products[index]
+
+    def id_index(self):
+        """Map product id -> position in list_products()"""
+        return {product['id']: i for i, product in enumerate(self.list_products()) if product.get('id')}
+
+    def get_by_id(self, product_id):
+        index = self.id_index().get(product_id)
+        if index is None:
+            return None
+        return self.list_products()[index]
+
+    def delete_by_id(self, product_id):
+        with self.write_lock:
+            index = self.id_index().get(product_id)
+            if index is None:
+                return None
+            return self.delete_at(index)
+
+    def update_by_id(self, product_id, updates):
+        with self.write_lock:
+            index = self.id_index().get(product_id)
+            if index is None:
+                return None
+            return self.update_at(index, updates)
+
+    def update_many_by_id(self, updates_by_id):
+        """Apply {product_id: updates} in a single write, returns the updated products"""
+        with self.write_lock:
+            data = self.load_document()
+            products = data['products']
+            positions = self.id_index()
+            updated = []
+            for product_id, updates in updates_by_id.items():
+                index = positions.get(product_id)
+                if index is None:
+                    continue
+                products[index] = dict(products[index], **updates)
+                updated.append(products[index])
+
+            if not updated or not self.write_document(data):
+                return []
+            return updated
+
+    def get_by_domain(self, domain):
+        site_products = []
+        for product in self.list_products():
+            product_domain = product.get('domain', '')
+            if product_domain == domain:
+                site_products.append(product)
+            elif not product_domain and domain in product.get('url', ''):
+                # Fallback for older products without domain field
+                site_products.append(product)
+        return site_products
+
+    def search(self, query, field='title'):
+        query_lower = query.lower()
+        results = []
+        for i, product in enumerate(self.list_products()):
+            field_value = product.get(field, '')
+            if isinstance(field_value, str) and query_lower in field_value.lower():
+                results.append((i, product))
+        return results
+
+class JSONStorageBackend(StorageBackend):
+    """Whole-file JSON storage with a read-through cache revalidated by os.stat"""
+
+    name = 'json'
+
+    def __init__(self, database_file, before_write=None, on_corrupt=None):
+        super().__init__(database_file, before_write)
+        # Called with no arguments before a corrupt file is reinitialized
+        self.on_corrupt = on_corrupt
+
+        # Parsed document cache - valid while the file signature is unchanged
+        self._cache = None
+        self._cache_signature = None
+        # Only held to check or swap the cache reference - never across file I/O, so readers don't
+        # wait on writers. A published cache is never modified, readers use the one they got
+        self._cache_lock = threading.Lock()
+        self.cache_hits = 0
+        self.cache_misses = 0
+        # Bumped whenever the cached content changes (reload or write)
+        self.generation = 0
+        # (cache, {id -> position}) - rebuilt lazily when a new cache is published
+        self._id_index = (None, {})
+
+    def exists(self):
+        return os.path.exists(self.database_file)
+
+    def initialize(self, data):
+        with self.write_lock:
+            atomic_write_json(self.database_file, data, indent=2)
+        self.invalidate_cache()
+
+    def size_bytes(self):
+        return os.path.getsize(self.database_file) if self.exists() else 0
+
+    def file_signature(self):
+        """Cheap change detector: (mtime_ns, size, inode) of the database file"""
+        try:
+            stat = os.stat(self.database_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def invalidate_cache(self):
+        with self._cache_lock:
+            self._cache = None
+            self._cache_signature = None
+
+    def cache_stats(self):
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'generation': self.generation,
+            'cached': self._cache is not None
+        }
+
+    def _cached_copy(self, cache):
+        # Callers may append/pop on the products list - hand out a shallow copy
+        return {
+            'metadata': dict(cache['metadata']),
+            'products': list(cache['products'])
+        }
+
+    def _store_cache(self, data, signature):
+        cache = {'metadata': dict(data['metadata']), 'products': list(data['products'])}
+        with self._cache_lock:
+            self._cache = cache
+            self._cache_signature = signature
+            self.generation += 1
+        return cache
+
+    def _revalidate(self):
+        """Return the cached document, reloading it first if it no longer matches the file on disk"""
+        signature = self.file_signature()
+        with self._cache_lock:
+            if self._cache is not None and signature is not None and signature == self._cache_signature:
+                self.cache_hits += 1
+                return self._cache
+            self.cache_misses += 1
+
+        try:
+            with open(self.database_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            # Writes are atomic, so this is real corruption rather than a half-written file
+            print(f"❌ Database JSON error: {e}")
+            with self.write_lock:
+                if self.file_signature() == signature:
+                    if self.on_corrupt:
+                        self.on_corrupt()
+                    self.initialize(normalize_document([]))
+            return self._revalidate()
+
+        if isinstance(data, list):
+            # Old format - convert and save in new format. Not through write_document: its backup
+            # hook snapshots the database by loading it, which would land back here
+            print(f"✅ Converting old database format with {len(data)} products")
+            with self.write_lock:
+                self.save_document(normalize_document(data))
+            return self._revalidate()
+
+        return self._store_cache(normalize_document(data), signature)
+
+    def load_document(self):
+        """Load complete document - supports both old and new formats"""
+        return self._cached_copy(self._revalidate())
+
+    def change_token(self):
+        self._revalidate()
+        return self.generation
+
+    def _index_for(self, cache):
+        built_for, index = self._id_index
+        if built_for is not cache:
+            index = {product['id']: i for i, product in enumerate(cache['products']) if product.get('id')}
+            self._id_index = (cache, index)
+        return index
+
+    def id_index(self):
+        return self._index_for(self._revalidate())
+
+    def get_by_id(self, product_id):
+        cache = self._revalidate()
+        index = self._index_for(cache).get(product_id)
+        if index is None:
+            return None
+        return dict(cache['products'][index])
+
+    def save_document(self, data):
+        with self.write_lock:
+            try:
+                atomic_write_json(self.database_file, data, indent=2)
+            except Exception:
+                self.invalidate_cache()
+                raise
+
+            # Publish the new cache instead of re-reading what was just written
+            self._store_cache(data, self.file_signature())
+        return True
+
+    def export_to(self, path):
+        import shutil
+        shutil.copy2(self.database_file, path)
+        return path
+
+class SQLiteStorageBackend(StorageBackend):
+    """SQLite (WAL) storage - one row per product with indexed lookup columns"""
+
+    name = 'sqlite'
+
+    # Product fields mirrored into indexed columns
+    INDEXED_FIELDS = ('url', 'domain', 'scrape_source', 'added_to_database')
+
+    SCHEMA = [
+        """CREATE TABLE IF NOT EXISTS products (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            url TEXT,
+            domain TEXT,
+            scrape_source TEXT,
+            added_to_database TEXT,
+            product_id TEXT,
+            data TEXT NOT NULL
+        )""",
+        "CREATE INDEX IF NOT EXISTS idx_products_url ON products(url)",
+        "CREATE INDEX IF NOT EXISTS idx_products_domain ON products(domain)",
+        "CREATE INDEX IF NOT EXISTS idx_products_scrape_source ON products(scrape_source)",
+        "CREATE INDEX IF NOT EXISTS idx_products_added ON products(added_to_database)",
+        """CREATE TABLE IF NOT EXISTS metadata (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        )"""
+    ]
+
+    # Run after SCHEMA - databases created before product ids need the column added first
+    ID_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS idx_products_product_id ON products(product_id)"
+
+    def __init__(self, database_file, before_write=None):
+        super().__init__(database_file, before_write)
+        # sqlite3 connections must not be shared across threads
+        self._local = threading.local()
+
+    def connect(self):
+        """Get this thread's connection, creating the schema on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.database_file, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            with conn:
+                for statement in self.SCHEMA:
+                    conn.execute(statement)
+                columns = {row[1] for row in conn.execute('PRAGMA table_info(products)')}
+                if 'product_id' not in columns:
+                    conn.execute('ALTER TABLE products ADD COLUMN product_id TEXT')
+                conn.execute(self.ID_INDEX)
+            self._local.conn = conn
+        return conn
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+    def exists(self):
+        if not os.path.exists(self.database_file):
+            return False
+        row = self.connect().execute("SELECT 1 FROM metadata WHERE key = 'version'").fetchone()
+        return row is not None
+
+    def initialize(self, data):
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM products')
+            conn.execute('DELETE FROM metadata')
+            self._write_metadata(conn, data.get('metadata', {}))
+            self._insert_rows(conn, data.get('products', []))
+
+    def size_bytes(self):
+        total = 0
+        for suffix in ('', '-wal'):
+            path = self.database_file + suffix
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+        return total
+
+    def _row_values(self, product):
+        values = [product.get(field) for field in self.INDEXED_FIELDS]
+        values.append(product.get('id'))
+        values.append(json.dumps(product, ensure_ascii=False))
+        return values
+
+    def _insert_rows(self, conn, products):
+        conn.executemany(
+            'INSERT INTO products (url, domain, scrape_source, added_to_database, product_id, data) VALUES (?, ?, ?, ?, ?, ?)',
+            [self._row_values(product) for product in products]
+        )
+
+    def _write_metadata(self, conn, metadata):
+        conn.executemany(
+            'INSERT OR REPLACE INTO metadata (key, value) VALUES (?, ?)',
+            [(key, json.dumps(value, ensure_ascii=False)) for key, value in metadata.items()]
+        )
+
+    def _touch_metadata(self, conn):
+        self._write_metadata(conn, {'last_updated': datetime.now().isoformat()})
+
+    def change_token(self):
+        # Every write stamps last_updated; the count catches writes within the same timestamp
+        conn = self.connect()
+        row = conn.execute("SELECT value FROM metadata WHERE key = 'last_updated'").fetchone()
+        count, max_id = conn.execute('SELECT COUNT(*), MAX(id) FROM products').fetchone()
+        return (row[0] if row else None, count, max_id)
+
+    def load_metadata(self):
+        rows = self.connect().execute('SELECT key, value FROM metadata').fetchall()
+        metadata = {key: json.loads(value) for key, value in rows}
+        metadata['total_products'] = self.count_products()
+        return metadata
+
+    def load_document(self):
+        return {'metadata': self.load_metadata(), 'products': self.list_products()}
+
+    def save_document(self, data):
+        conn = self.connect()
+        with conn:
+            conn.execute('DELETE FROM products')
+            self._insert_rows(conn, data.get('products', []))
+            self._write_metadata(conn, data.get('metadata', {}))
+        return True
+
+    def list_products(self):
+        rows = self.connect().execute('SELECT data FROM products ORDER BY id').fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def count_products(self):
+        return self.connect().execute('SELECT COUNT(*) FROM products').fetchone()[0]
+
+    def get_urls(self, scrape_source=None):
+        conn = self.connect()
+        if scrape_source:
+            rows = conn.execute(
+                "SELECT url FROM products WHERE scrape_source = ? AND url IS NOT NULL AND url != ''",
+                (scrape_source,)
+            ).fetchall()
+        else:
+            rows = conn.execute("SELECT url FROM products WHERE url IS NOT NULL AND url != ''").fetchall()
+        return {row[0] for row in rows}
+
+    def has_url(self, url, scrape_source=None):
+        if scrape_source:
+            row = self.connect().execute(
+                'SELECT 1 FROM products WHERE url = ? AND scrape_source = ? LIMIT 1', (url, scrape_source)
+            ).fetchone()
+        else:
+            row = self.connect().execute('SELECT 1 FROM products WHERE url = ? LIMIT 1', (url,)).fetchone()
+        return row is not None
+
+    def insert_products(self, products):
+        conn = self.connect()
+        with conn:
+            self._insert_rows(conn, products)
+            self._touch_metadata(conn)
+        return True
+
+    def delete_at(self, index):
+        if index < 0:
+            return None
+        conn = self.connect()
+        with conn:
+            row = conn.execute(
+                'SELECT id, data FROM products ORDER BY id LIMIT 1 OFFSET ?', (index,)
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM products WHERE id = ?', (row[0],))
+            self._touch_metadata(conn)
+        return json.loads(row[1])
+
+    def update_at(self, index, updates):
+        if index < 0:
+            return None
+        conn = self.connect()
+        with conn:
+            row = conn.execute(
+                'SELECT id, data FROM products ORDER BY id LIMIT 1 OFFSET ?', (index,)
+            ).fetchone()
+            if row is None:
+                return None
+            product = self._update_row(conn, row, updates)
+        return product
+
+    def _update_row(self, conn, row, updates):
+        product = dict(json.loads(row[1]), **updates)
+        conn.execute(
+            'UPDATE products SET url = ?, domain = ?, scrape_source = ?, added_to_database = ?, product_id = ?, data = ? WHERE id = ?',
+            self._row_values(product) + [row[0]]
+        )
+        self._touch_metadata(conn)
+        return product
+
+    def id_index(self):
+        rows = self.connect().execute(
+            'SELECT product_id, ROW_NUMBER() OVER (ORDER BY id) - 1 FROM products'
+        ).fetchall()
+        return {product_id: position for product_id, position in rows if product_id}
+
+    def get_by_id(self, product_id):
+        row = self.connect().execute('SELECT data FROM products WHERE product_id = ?', (product_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete_by_id(self, product_id):
+        conn = self.connect()
+        with conn:
+            row = conn.execute('SELECT id, data FROM products WHERE product_id = ?', (product_id,)).fetchone()
+            if row is None:
+                return None
+            conn.execute('DELETE FROM products WHERE id = ?', (row[0],))
+            self._touch_metadata(conn)
+        return json.loads(row[1])
+
+    def update_by_id(self, product_id, updates):
+        conn = self.connect()
+        with conn:
+            row = conn.execute('SELECT id, data FROM products WHERE product_id = ?', (product_id,)).fetchone()
+            if row is None:
+                return None
+            product = self._update_row(conn, row, updates)
+        return product
+
+    def update_many_by_id(self, updates_by_id):
+        conn = self.connect()
+        updated = []
+        with conn:
+            for product_id, updates in updates_by_id.items():
+                row = conn.execute('SELECT id, data FROM products WHERE product_id = ?', (product_id,)).fetchone()
+                if row is not None:
+                    updated.append(self._update_row(conn, row, updates))
+        return updated
+
+    def get_by_domain(self, domain):
+        rows = self.connect().execute(
+            """SELECT data FROM products
+               WHERE domain = ?
+                  OR (COALESCE(domain, '') = '' AND instr(url, ?) > 0)
+               ORDER BY id""",
+            (domain, domain)
+        ).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+    def search(self, query, field='title'):
+        # Row position is reported so results line up with list_products() indexes
+        rows = self.connect().execute(
+            """SELECT position, data FROM (
+                   SELECT ROW_NUMBER() OVER (ORDER BY id) - 1 AS position,
+                          json_extract(data, ?) AS value, data
+                   FROM products
+               ) WHERE value LIKE ? ESCAPE '\\'""",
+            ('$."' + field.replace('"', '') + '"', '%' + self._escape_like(query) + '%')
+        ).fetchall()
+
+        # LIKE only folds ASCII case - confirm matches with Python's lower()
+        query_lower = query.lower()
+        results = []
+        for position, data in rows:
+            product = json.loads(data)
+            field_value = product.get(field, '')
+            if isinstance(field_value, str) and query_lower in field_value.lower():
+                results.append((position, product))
+        return results
+
+    def _escape_like(self, text):
+        return text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+class JournaledJSONStorageBackend(StorageBackend):
+    """Compact JSON snapshot plus an fsync'd append-only journal of add/update/delete operations"""
+
+    name = 'journal'
+
+    def __init__(self, database_file, before_write=None, on_corrupt=None,
+                 compact_interval=30, compact_ops=200):
+        super().__init__(database_file, before_write)
+        self.journal_file = database_file + '.journal'
+        self.on_corrupt = on_corrupt
+        self.compact_interval = compact_interval
+        self.compact_ops = compact_ops
+
+        # In-memory state = snapshot + replayed journal entries
+        self._lock = threading.RLock()
+        self._state = None
+        self._snapshot_signature = None
+        self._journal_offset = 0
+        self._seq = 0
+        self.pending_ops = 0
+        self.generation = 0
+        self._id_index = {}
+        self._id_index_generation = None
+
+        self._compactor = None
+        self._wake = threading.Event()
+        self._stopped = False
+
+    def exists(self):
+        return os.path.exists(self.database_file)
+
+    def initialize(self, data):
+        with self.write_lock, self._lock:
+            self._write_snapshot(data)
+
+    def size_bytes(self):
+        total = 0
+        for path in (self.database_file, self.journal_file):
+            if os.path.exists(path):
+                total += os.path.getsize(path)
+        return total
+
+    def snapshot_signature(self):
+        try:
+            stat = os.stat(self.database_file)
+        except OSError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def journal_size(self):
+        try:
+            return os.path.getsize(self.journal_file)
+        except OSError:
+            return 0
+
+    def cache_stats(self):
+        return {
+            'generation': self.generation,
+            'journal_seq': self._seq,
+            'pending_ops': self.pending_ops
+        }
+
+    # Snapshot + replay
+
+    def _read_snapshot(self):
+        try:
+            with open(self.database_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except json.JSONDecodeError as e:
+            print(f"❌ Database JSON error: {e}")
+            if self.on_corrupt:
+                self.on_corrupt()
+            data = []
+        return normalize_document(data)
+
+    def _load_full(self):
+        data = self._read_snapshot()
+        self._state = {'metadata': data['metadata'], 'products': list(data['products'])}
+        self._seq = data['metadata'].get('journal_seq', 0)
+        self._snapshot_signature = self.snapshot_signature()
+        self._journal_offset = 0
+        self.pending_ops = 0
+        self._replay_journal()
+        self.generation += 1
+
+    def _replay_journal(self):
+        """Apply complete journal lines past the current offset"""
+        if not os.path.exists(self.journal_file):
+            return
+
+        with open(self.journal_file, 'rb') as f:
+            f.seek(self._journal_offset)
+            for raw_line in f:
+                if not raw_line.endswith(b'\n'):
+                    # Torn or in-progress write - stop before it
+                    break
+                self._journal_offset += len(raw_line)
+                try:
+                    entry = json.loads(raw_line.decode('utf-8'))
+                except (ValueError, UnicodeDecodeError):
+                    print("⚠️ Skipping unreadable journal entry")
+                    continue
+
+                if entry.get('seq', 0) <= self._seq:
+                    # Already folded into the snapshot
+                    continue
+                self._apply(entry)
+                self._seq = entry['seq']
+                self.pending_ops += 1
+                self.generation += 1
+
+    def _find_index(self, entry):
+        products = self._state['products']
+        index = entry.get('index', -1)
+        url = entry.get('url')
+        product_id = entry.get('id')
+        if 0 <= index < len(products):
+            product = products[index]
+            if product_id is not None and product.get('id') == product_id:
+                return index
+            if product_id is None and (url is None or product.get('url') == url):
+                return index
+        for i, product in enumerate(products):
+            if product_id is not None:
+                if product.get('id') == product_id:
+                    return i
+            elif url and product.get('url') == url:
+                return i
+        return None
+
+    def _apply(self, entry):
+        products = self._state['products']
+        op = entry.get('op')
+        if op == 'add':
+            products.extend(entry.get('products', []))
+        elif op == 'delete':
+            index = self._find_index(entry)
+            if index is not None:
+                products.pop(index)
+        elif op == 'update':
+            index = self._find_index(entry)
+            if index is not None:
+                products[index] = dict(products[index], **entry.get('updates', {}))
+        self._state['metadata']['last_updated'] = entry.get('timestamp', self._state['metadata'].get('last_updated'))
+
+    def _refresh(self):
+        """Pick up snapshot replacements and journal appends from other writers"""
+        signature = self.snapshot_signature()
+        if (self._state is None or signature != self._snapshot_signature
+                or self.journal_size() < self._journal_offset):
+            self._load_full()
+        elif self.journal_size() > self._journal_offset:
+            self._replay_journal()
+
+    def _state_copy(self):
+        metadata = dict(self._state['metadata'])
+        metadata['total_products'] = len(self._state['products'])
+        return {'metadata': metadata, 'products': list(self._state['products'])}
+
+    # Writes
+
+    def _write_snapshot(self, data):
+        """Fold everything into a compact snapshot and truncate the journal"""
+        metadata = dict(data.get('metadata', {}))
+        metadata['journal_seq'] = self._seq
+        metadata['total_products'] = len(data.get('products', []))
+        snapshot = {'metadata': metadata, 'products': list(data.get('products', []))}
+
+        atomic_write_json(self.database_file, snapshot)
+        with open(self.journal_file, 'wb') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._state = snapshot
+        self._snapshot_signature = self.snapshot_signature()
+        self._journal_offset = 0
+        self.pending_ops = 0
+        self.generation += 1
+
+    def _append(self, entry):
+        """Append one operation to the journal, fsync it and apply it in memory"""
+        entry['seq'] = self._seq + 1
+        entry['timestamp'] = datetime.now().isoformat()
+        line = (json.dumps(entry, ensure_ascii=False) + '\n').encode('utf-8')
+
+        if self.journal_size() > self._journal_offset:
+            # Drop a torn tail left by a crashed write so the new line stays parseable
+            with open(self.journal_file, 'r+b') as f:
+                f.truncate(self._journal_offset)
+
+        with open(self.journal_file, 'ab') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+        self._journal_offset += len(line)
+        self._apply(entry)
+        self._seq = entry['seq']
+        self.pending_ops += 1
+        self.generation += 1
+
+        self._ensure_compactor()
+        if self.pending_ops >= self.compact_ops:
+            self._wake.set()
+
+    def load_document(self):
+        with self._lock:
+            self._refresh()
+            return self._state_copy()
+
+    def save_document(self, data):
+        with self.write_lock, self._lock:
+            self._refresh()
+            self._write_snapshot(data)
+        return True
+
+    def insert_products(self, products):
+        with self.write_lock, self._lock:
+            self._refresh()
+            self._append({'op': 'add', 'products': products})
+        return True
+
+    def delete_at(self, index):
+        with self.write_lock, self._lock:
+            self._refresh()
+            products = self._state['products']
+            if not 0 <= index < len(products):
+                return None
+            deleted_product = products[index]
+            self._append({
+                'op': 'delete', 'index': index,
+                'id': deleted_product.get('id'), 'url': deleted_product.get('url')
+            })
+        return deleted_product
+
+    def update_at(self, index, updates):
+        with self.write_lock, self._lock:
+            self._refresh()
+            products = self._state['products']
+            if not 0 <= index < len(products):
+                return None
+            product = products[index]
+            self._append({
+                'op': 'update', 'index': index,
+                'id': product.get('id'), 'url': product.get('url'), 'updates': updates
+            })
+            return self._state['products'][index]
+
+    def change_token(self):
+        with self._lock:
+            self._refresh()
+            return self.generation
+
+    def id_index(self):
+        with self._lock:
+            self._refresh()
+            if self._id_index_generation != self.generation:
+                self._id_index = {
+                    product['id']: i for i, product in enumerate(self._state['products']) if product.get('id')
+                }
+                self._id_index_generation = self.generation
+            return self._id_index
+
+    def get_by_id(self, product_id):
+        with self._lock:
+            index = self.id_index().get(product_id)
+            if index is None:
+                return None
+            return dict(self._state['products'][index])
+
+    def update_many_by_id(self, updates_by_id):
+        # One journal line per product - cheaper than rewriting the snapshot
+        updated = []
+        with self.write_lock:
+            for product_id, updates in updates_by_id.items():
+                product = self.update_by_id(product_id, updates)
+                if product is not None:
+                    updated.append(product)
+        return updated
+
+    # Background compaction
+
+    def compact(self):
+        """Fold the journal into the snapshot"""
+        with self.write_lock, self._lock:
+            self._refresh()
+            if self.pending_ops == 0 and self.journal_size() == 0:
+                return False
+            ops = self.pending_ops
+            self._write_snapshot(self._state_copy())
+        print(f"✅ Journal compacted: {ops} operations folded into snapshot")
+        return True
+
+    def _ensure_compactor(self):
+        if self._compactor is None or not self._compactor.is_alive():
+            self._compactor = threading.Thread(target=self._compact_loop, daemon=True)
+            self._compactor.start()
+
+    def _compact_loop(self):
+        while not self._stopped:
+            self._wake.wait(self.compact_interval)
+            self._wake.clear()
+            if self._stopped:
+                break
+            try:
+                if self.pending_ops:
+                    self.compact()
+            except Exception as e:
+                print(f"❌ Journal compaction failed: {e}")
+
+    def close(self):
+        self._stopped = True
+        self._wake.set()
+        self.compact()
+
+def migrate_json_to_sqlite(json_file, sqlite_file):
+    """One-shot migration of products_master.json (old list or metadata wrapper format) into SQLite"""
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = normalize_document(json.load(f))
+
+    backend = SQLiteStorageBackend(sqlite_file)
+    backend.initialize(data)
+    migrated = backend.count_products()
+    backend.close()
+
+    print(f"✅ Migrated {migrated} products from {json_file} to {sqlite_file}")
+    return migrated
+
+def create_storage_backend(kind, database_file, before_write=None, on_corrupt=None):
+    """Create a storage backend by name"""
+    if kind == 'sqlite':
+        return SQLiteStorageBackend(database_file, before_write=before_write)
+    if kind == 'json':
+        return JSONStorageBackend(database_file, before_write=before_write, on_corrupt=on_corrupt)
+    if kind == 'journal':
+        return JournaledJSONStorageBackend(database_file, before_write=before_write, on_corrupt=on_corrupt)
+    raise ValueError(f"Unknown storage backend: {kind}")
+
+if __name__ == '__main__':
+    # Usage: python storage_backends.py migrate <products_master.json> <products_master.db>
+    if len(sys.argv) == 4 and sys.argv[1] == 'migrate':
+        migrate_json_to_sqlite(sys.argv[2], sys.argv[3])
+    else:
+        print("Usage: python storage_backends.py migrate <json_file> <sqlite_file>")
@@ -4,12 +4,25 @@ Main scraper class that works across multiple WooCommerce sites
 """
 import os
 import json
+import sys
+import threading
 import time
 from datetime import datetime
-import requests
+from app_config import (HTTP_POOL_SIZE, HTTP_RETRIES, IMAGE_DOWNLOAD_WORKERS, PAGE_CACHE_DOMAIN_TTLS,
+                        PAGE_CACHE_ENABLED, SCRAPE_BURST_PER_HOST, SCRAPE_IMAGE_WORKERS, SCRAPE_MODE,
+                        SCRAPE_MODES, SCRAPE_RATE_PER_HOST, SCRAPE_WORKERS, STORE_API_ENABLED)
+from http_client import HttpClient
+from image_fetcher import ImageFetcher
+from image_store import ImageStore
+from crawl_frontier import CategoryCrawler
+from page_cache import PageCache
+from product_refresh import ProductRefresher
 from product_scraper_core import ProductScraperCore
 from path_utils import create_product_folders, normalize_image_path
 from database_manager import ProductDatabase
+from scrape_pipeline import HostRateLimiter, ScrapePipeline
+from site_profiles import get_registry
+from woocommerce_api import StoreApiClient
 
 # Import enhanced image processor if available
 try:
@@ -23,50 +36,85 @@ except ImportError:
 class CleanProductScraper:
     """Universal WooCommerce scraper - works across multiple domains"""
     
-    def __init__(self):
+    def __init__(self, workers=None, image_workers=None, mode=None):
         self.headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
         }
         
+        # Supported stores with their listing paths, rate limits and image rules
+        self.site_profiles = get_registry()
+        
+        # Per-site request budget shared by page fetches and image downloads (replaces fixed sleeps)
+        self.rate_limiter = HostRateLimiter(
+            SCRAPE_RATE_PER_HOST, SCRAPE_BURST_PER_HOST, overrides=self.site_profiles.rate_overrides()
+        )
+        self.workers = workers or SCRAPE_WORKERS
+        self.image_workers = image_workers or SCRAPE_IMAGE_WORKERS
+        
+        # 'threads' runs the worker pool pipeline, 'async' runs everything on one event loop
+        self.mode = mode or SCRAPE_MODE
+        if self.mode not in SCRAPE_MODES:
+            print(f"⚠ Unknown scrape mode '{self.mode}' - using threads")
+            self.mode = 'threads'
+        
+        # Folder names are picked with a check-then-create, so concurrent products take turns
+        self._folder_lock = threading.Lock()
+        
+        # One pooled session for pages and images - connections to each site are reused
+        # (pool sized so every worker thread can hold a connection)
+        self.http = HttpClient(
+            self.headers,
+            pool_size=max(HTTP_POOL_SIZE, self.workers + self.image_workers + IMAGE_DOWNLOAD_WORKERS),
+            retries=HTTP_RETRIES
+        )
+        
+        # On-disk conditional-request cache for product and listing pages
+        self.page_cache = None
+        if PAGE_CACHE_ENABLED:
+            try:
+                domain_ttls = dict(PAGE_CACHE_DOMAIN_TTLS, **self.site_profiles.page_cache_ttls())
+                self.page_cache = PageCache(domain_ttls=domain_ttls)
+            except Exception as e:
+                print(f"⚠ Page cache unavailable - fetching pages uncached: {e}")
+        
+        # WooCommerce Store API - JSON listings and products where the site exposes it
+        self.store_api = StoreApiClient(self.http, self.rate_limiter) if STORE_API_ENABLED else None
+        
         # Initialize core scraper
-        self.scraper_core = ProductScraperCore(self.headers)
+        self.scraper_core = ProductScraperCore(
+            self.headers, rate_limiter=self.rate_limiter, http_client=self.http,
+            page_cache=self.page_cache, store_api=self.store_api
+        )
         
         # Initialize database manager
         self.database = ProductDatabase()
         
+        # Paginated category crawling with an on-disk frontier (opened on first use)
+        self.crawler = CategoryCrawler(self)
+        
         # VPS paths
         self.base_dir = '/var/www/tools'
         self.products_dir = '/var/www/tools/data/products'
         
+        # Parallel streaming image downloads, bounded per site
+        self.image_fetcher = ImageFetcher(self.http, self.rate_limiter)
+        
+        # Every image stored once by content hash - product folders hold links to it
+        self.image_store = ImageStore()
+        
         # Initialize enhanced image processor
         if ENHANCED_IMAGES:
-            self.image_processor = EnhancedImageProcessor(self.headers)
+            self.image_processor = EnhancedImageProcessor(
+                self.headers, rate_limiter=self.rate_limiter, http_client=self.http,
+                image_fetcher=self.image_fetcher, image_store=self.image_store
+            )
         else:
             self.image_processor = None
         
-        # Supported site configurations
-        self.sites = {
-            'ineedhemp': {
-                'domain': 'ineedhemp.com',
-                'base_url': 'https://ineedhemp.com',
-                'best_sellers': '/product-category/best-sellers/',
-                'featured': '/featured-products/'
-            },
-            'nicedreamz': {
-                'domain': 'nicedreamzwholesale.com',
-                'base_url': 'https://nicedreamzwholesale.com',
-                'best_sellers': '/product-category/best-sellers/',
-                'featured': '/featured-products/'
-            },
-            'tribeseed': {
-                'domain': 'tribeseedbank.com',
-                'base_url': 'https://tribeseedbank.com',
-                'best_sellers': '/product-category/best-sellers/',
-                'featured': '/featured-products/'
-            }
-        }
+        # Supported site configurations (site_profiles.json)
+        self.sites = self.site_profiles.site_configs()
         
-        print(f"✓ Universal scraper ready - supports {len(self.sites)} sites")
+        print(f"✓ Universal scraper ready - supports {len(self.sites)} sites ({self.mode} mode)")
     
     def detect_site_from_url(self, url):
         """Auto-detect which site configuration to use"""
@@ -79,15 +127,15 @@ class CleanProductScraper:
         """Get existing products with optional source filtering"""
         return self.database.get_existing_products(scrape_source)
     
-    def download_images(self, image_urls, images_folder):
+    def download_images(self, image_urls, images_folder, first_index=1):
         """Download images using enhanced processor or basic method"""
         if ENHANCED_IMAGES and self.image_processor:
-            downloaded = self.image_processor.download_images(image_urls, images_folder)
+            downloaded = self.image_processor.download_images(image_urls, images_folder, first_index)
             return self.image_processor.validate_downloaded_images(downloaded)
         else:
-            return self.basic_download_images(image_urls, images_folder)
+            return self.basic_download_images(image_urls, images_folder, first_index)
     
-    def basic_download_images(self, image_urls, images_folder):
+    def basic_download_images(self, image_urls, images_folder, first_index=1):
         """Fallback: Basic image downloading"""
         downloaded = []
         
@@ -97,41 +145,39 @@ class CleanProductScraper:
             existing_images = set(f for f in os.listdir(images_folder) 
                                 if f.lower().endswith(('.jpg', '.jpeg', '.png', '.webp', '.gif')))
         
+        plan = []
         for i, url in enumerate(image_urls):
-            try:
-                # Generate filename
-                ext = 'jpg'
-                if url.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.gif')):
-                    ext = url.split('.')[-1].lower().split('?')[0]
-                
-                filename = f"image_{i+1}.{ext}"
-                filepath = os.path.join(images_folder, filename)
-                
-                # Skip if exists
-                if filename in existing_images:
-                    print(f"    Skipped existing: {filename}")
-                    downloaded.append(filepath)
-                    continue
-                
-                # Download
-                response = requests.get(url, timeout=15, headers=self.headers)
-                response.raise_for_status()
-                
-                if len(response.content) < 1000:
-                    print(f"    Skipped tiny image: {filename}")
-                    continue
-                
-                with open(filepath, 'wb') as f:
-                    f.write(response.content)
-                
+            # Generate filename
+            ext = 'jpg'
+            if url.lower().endswith(('.png', '.jpg', '.jpeg', '.webp', '.gif')):
+                ext = url.split('.')[-1].lower().split('?')[0]
+            
+            filename = f"image_{first_index + i}.{ext}"
+            plan.append((i, filename, url, os.path.join(images_folder, filename)))
+        
+        downloads = [(url, filepath) for i, filename, url, filepath in plan if filename not in existing_images]
+        results = iter(self.image_fetcher.fetch_all(downloads, min_bytes=1000))
+        
+        for i, filename, url, filepath in plan:
+            # Skip if exists
+            if filename in existing_images:
+                print(f"    Skipped existing: {filename}")
                 downloaded.append(filepath)
-                print(f"    Downloaded: {filename} ({len(response.content)} bytes)")
-                
-                time.sleep(0.5)
-                
-            except Exception as e:
-                print(f"    Failed image {i+1}: {e}")
                 continue
+            
+            result = next(results)
+            if result['status'] == 'tiny':
+                print(f"    Skipped tiny image: {filename}")
+            elif result['status'] != 'downloaded':
+                print(f"    Failed image {i+1}: {result['error'] or result['status']}")
+            else:
+                try:
+                    self.image_store.add(filepath, url)
+                except Exception as e:
+                    # The downloaded file is still good - it just isn't shared through the store
+                    print(f"    ⚠ Image store error for image {i+1}: {e}")
+                downloaded.append(filepath)
+                print(f"    Downloaded: {filename} ({result['size']} bytes)")
         
         return downloaded
     
@@ -167,36 +213,77 @@ class CleanProductScraper:
     
     def process_single_product(self, url, scrape_source="unknown"):
         """Process one product with source-aware duplicate checking"""
+        page = self.fetch_product(url, scrape_source)
+        if page is None:
+            return None
+        return self.finish_product(page)
+    
+    def fetch_product(self, url, scrape_source="unknown"):
+        """Stage 1: duplicate check, fetch and parse the product page
+        
+        Returns the parsed page state for finish_product(), or None if skipped/failed
+        """
+        if not self.should_scrape(url, scrape_source):
+            return None
+        
+        # Goes through the page cache - unchanged pages come back already extracted
+        scraped = self.scraper_core.scrape_product(url)
+        if not scraped:
+            print("  Failed to extract product data")
+            return None
+        
+        return self.make_page(url, scraped['product_data'], scrape_source,
+                              image_urls=scraped['image_urls'], unchanged=scraped['unchanged'])
+    
+    def should_scrape(self, url, scrape_source="unknown"):
+        """Site check and source-aware duplicate check before fetching a product page"""
         # Detect site
-        site_key, site_config = self.detect_site_from_url(url)
+        _, site_config = self.detect_site_from_url(url)
         if not site_config:
             print(f"  Warning: URL not from supported site: {url}")
         
         # Source-specific duplicate checking
         if scrape_source == "custom":
-            existing_products = self.get_existing_products("custom")
+            already_scraped = self.database.product_exists(url, "custom")
         else:
-            existing_products = self.get_existing_products()
+            already_scraped = self.database.product_exists(url)
         
-        if url in existing_products:
+        if already_scraped:
             print(f"  Skipping (already scraped): {url.split('/')[-2] if url.endswith('/') else url.split('/')[-1]}")
-            return None
+            return False
         
         print(f"Processing: {url.split('/')[-2] if url.endswith('/') else url.split('/')[-1]}")
-        
-        soup = self.scraper_core.scrape_product_page(url)
-        product_data = self.scraper_core.extract_product_data(soup, url)
-        
-        if not product_data:
-            print("  Failed to extract product data")
-            return None
-        
+        return True
+    
+    def make_page(self, url, product_data, scrape_source="unknown", soup=None, image_urls=None, unchanged=False):
+        """Page state passed between the stages - image URLs are extracted from soup later if not given"""
+        site_key, _ = self.detect_site_from_url(url)
         print(f"  Product: {product_data['title'][:50]}...")
         
+        return {
+            'url': url,
+            'soup': soup,
+            'product_data': product_data,
+            'scrape_source': scrape_source,
+            'site_key': site_key,
+            'image_urls': image_urls,
+            'unchanged': unchanged
+        }
+    
+    def finish_product(self, page):
+        """Stage 2: create folders, download images and save product files"""
+        self.prepare_product(page)
+        if page['image_urls']:
+            page['local_images'] = self.download_images(page['image_urls'], page['images_folder'])
+        return self.complete_product(page)
+    
+    def prepare_product(self, page):
+        """Create the product folders and work out which images still need downloading"""
         # Create folders using utility function
-        product_folder, images_folder, safe_name = create_product_folders(
-            product_data['title'], self.products_dir
-        )
+        with self._folder_lock:
+            product_folder, images_folder, safe_name = create_product_folders(
+                page['product_data']['title'], self.products_dir
+            )
         
         # Check existing images
         existing_images = []
@@ -209,19 +296,50 @@ class CleanProductScraper:
             local_images = [os.path.join(images_folder, img) for img in existing_images]
             image_urls = []
         else:
-            image_urls = self.scraper_core.extract_image_urls(soup, url)
-            local_images = self.download_images(image_urls, images_folder)
+            image_urls = page['image_urls']
+            if image_urls is None:
+                image_urls = self.scraper_core.extract_image_urls(page['soup'], page['url'])
+            local_images = []
         
-        # Update product data with VPS paths and source tracking
-        product_data.update({
+        page.update({
             'product_folder': product_folder,
             'images_folder': images_folder,
             'safe_name': safe_name,
             'image_urls': image_urls,
+            'local_images': local_images
+        })
+        return page
+    
+    def image_hashes(self, local_images):
+        """Image file name -> content hash in the image store (finds products sharing an image)"""
+        hashes = {}
+        for path in local_images:
+            try:
+                entry = self.image_store.entry_for_path(path)
+            except Exception as e:
+                print(f"    ⚠ Image store error for {os.path.basename(path)}: {e}")
+                continue
+            if entry:
+                hashes[os.path.basename(path)] = entry['sha256']
+        return hashes
+    
+    def complete_product(self, page):
+        """Record folders and images on the product and save its files"""
+        product_data = page['product_data']
+        product_folder = page['product_folder']
+        local_images = page['local_images']
+        
+        # Update product data with VPS paths and source tracking
+        product_data.update({
+            'product_folder': product_folder,
+            'images_folder': page['images_folder'],
+            'safe_name': page['safe_name'],
+            'image_urls': page['image_urls'],
             'local_images': local_images,
             'image_count': len(local_images),
-            'scrape_source': scrape_source,
-            'site_key': site_key
+            'image_hashes': self.image_hashes(local_images),
+            'scrape_source': page['scrape_source'],
+            'site_key': page['site_key']
         })
         
         self.save_product_data(product_data, product_folder)
@@ -229,36 +347,79 @@ class CleanProductScraper:
         print(f"  Total images: {len(local_images)}")
         return product_data
     
-    def get_product_urls(self, category, limit=None, site='ineedhemp'):
+    def get_product_urls(self, category, limit=None, site=None):
         """Get product URLs with site selection and source-aware duplicate prevention"""
+        site = site or self.site_profiles.default_key()
+        listing_url = self.get_listing_url(category, site)
+        if not listing_url:
+            return []
+        
+        if category == 'featured':
+            limit = limit or 20
+        links = self.scraper_core.get_product_urls_from_page(listing_url, limit)
+        return self.filter_new_links(links, category, site)
+    
+    def get_catalog_urls(self, category, sites, limit=None):
+        """New product URLs from the same listing on several sites
+        
+        Async mode fetches all the listings at once; threads mode goes site by site.
+        """
+        if self.mode == 'async':
+            from async_scraper import AsyncScraper
+            if category == 'featured':
+                limit = limit or 20
+            jobs = [(category, site, limit) for site in sites if site in self.sites]
+            return AsyncScraper(self).get_catalog_urls(jobs)
+        
+        urls = []
+        for site in sites:
+            for url in self.get_product_urls(category, limit, site):
+                if url not in urls:
+                    urls.append(url)
+        return urls
+    
+    def get_listing_url(self, category, site):
+        """Listing page URL for a category on a supported site"""
         if site not in self.sites:
             print(f"Error: Site '{site}' not supported")
+            return None
+        return self.site_profiles.get(site).listing_url(category)
+    
+    def filter_new_links(self, links, category, site):
+        """Drop product URLs already scraped from this listing"""
+        existing_products = self.get_existing_products(category)
+        new_links = [url for url in links if url not in existing_products]
+        skipped = len(links) - len(new_links)
+        
+        label = 'best sellers' if category == 'best_sellers' else 'featured products'
+        print(f"Found {len(new_links)} new {label} from {site} (skipped {skipped} existing)")
+        return new_links
+    
+    def crawl_category(self, category, site=None, max_pages=None, limit=None, rewalk=False):
+        """Crawl every page of a category listing and scrape the products not yet in the database
+        
+        category is 'best_sellers', 'featured' or any category URL. The crawl resumes where the
+        last one stopped; rewalk=True walks the listing pages again to find newly added products.
+        """
+        if category.startswith('http'):
+            start_url = category
+        else:
+            start_url = self.get_listing_url(category, site or self.site_profiles.default_key())
+        if not start_url:
             return []
         
-        site_config = self.sites[site]
-        existing_products = self.get_existing_products(category)
+        print(f"Crawling {start_url}")
+        self.crawler.crawl(start_url, max_pages, rewalk)
         
-        if category == 'best_sellers':
-            url = site_config['base_url'] + site_config['best_sellers']
-            links = self.scraper_core.get_product_urls_from_page(url, limit)
-            
-            new_links = [url for url in links if url not in existing_products]
-            skipped = len(links) - len(new_links)
-            
-            print(f"Found {len(new_links)} new best sellers from {site} (skipped {skipped} existing)")
-            return new_links
-            
-        elif category == 'featured':
-            url = site_config['base_url'] + site_config['featured']
-            links = self.scraper_core.get_product_urls_from_page(url, limit or 20)
-            
-            new_links = [url for url in links if url not in existing_products]
-            skipped = len(links) - len(new_links)
-            
-            print(f"Found {len(new_links)} new featured products from {site} (skipped {skipped} existing)")
-            return new_links
+        urls = self.crawler.pending_urls(start_url, limit)
+        if not urls:
+            print("No new products to scrape")
+            return []
         
-        return []
+        label = {'best_sellers': 'Best Sellers', 'featured': 'Featured Products'}.get(category, 'Category')
+        products = self.scrape_products(urls, f"{label} crawl of {start_url}")
+        self.crawler.record_results(urls, products)
+        return products
     
     def scrape_custom_url(self, url):
         """Custom URL scraper that works with any supported site"""
@@ -301,10 +462,6 @@ class CleanProductScraper:
         print(f"{mode_name}: {len(urls)} products")
         print("=" * 50)
         
-        all_products = []
-        successful = 0
-        failed = 0
-        
         # Determine scrape source
         if "Best Sellers" in mode_name:
             scrape_source = "best_sellers"
@@ -312,34 +469,67 @@ class CleanProductScraper:
             scrape_source = "featured"
         elif "Custom" in mode_name:
             scrape_source = "custom"
+        elif "Category" in mode_name:
+            scrape_source = "category"
         else:
             scrape_source = "unknown"
         
-        for i, url in enumerate(urls, 1):
-            print(f"[{i}/{len(urls)}]", end=" ")
-            
-            product = self.process_single_product(url, scrape_source)
-            if product:
-                all_products.append(product)
-                successful += 1
-            else:
-                failed += 1
-            
-            # Progress update
-            if i % 5 == 0 or i == len(urls):
-                print(f"  Progress: {successful} successful, {failed} failed")
-            
-            time.sleep(1)
+        # Page fetches and image downloads overlap; the per-host rate limiter keeps each site's request rate
+        started = time.time()
+        if self.mode == 'async':
+            from async_scraper import AsyncScraper
+            all_products = AsyncScraper(self).run(urls, scrape_source)
+        else:
+            pipeline = ScrapePipeline(self, workers=self.workers, image_workers=self.image_workers)
+            all_products = pipeline.run(urls, scrape_source)
         
         # Add to master database
         if all_products:
             self.database.add_products(all_products)
         
-        print(f"Complete! {successful} products scraped successfully")
-        print(f"Failed: {failed}")
+        print(f"Complete! {len(all_products)} products scraped successfully in {time.time() - started:.1f}s")
+        print(f"Failed: {len(urls) - len(all_products)}")
+        for host, stats in self.http.metrics.snapshot().items():
+            print(f"  {host}: {stats['requests']} requests, avg {stats['avg_seconds']}s, "
+                  f"{stats['retries']} retries, {stats['errors']} errors")
+        if self.page_cache:
+            cache_stats = self.page_cache.stats()
+            print(f"  Page cache: {cache_stats['revalidated']} unchanged, {cache_stats['fresh']} fresh, "
+                  f"{cache_stats['fetched']} fetched ({cache_stats['pages']} pages, {cache_stats['bytes'] // 1024} KB)")
         
         return all_products
     
+    def refresh_products(self, sites=None, scrape_source=None):
+        """Re-check already scraped products and update only the ones that changed on the store
+        
+        Returns the run's diff report (see ProductRefresher.run)
+        """
+        domains = None
+        if sites:
+            domains = {self.sites[site]['domain'] for site in sites if site in self.sites}
+        
+        products = []
+        for product in self.database.load_products():
+            if scrape_source and product.get('scrape_source') != scrape_source:
+                continue
+            # Older products have no domain field - fall back to the URL
+            domain = product.get('domain') or self.scraper_core.get_domain_from_url(product.get('url', ''))
+            if domains is None or domain in domains:
+                products.append(product)
+        
+        if self.store_api and products:
+            # Read each catalog in bulk up front instead of one request per product
+            refreshed_domains = {self.scraper_core.get_domain_from_url(product.get('url', '')) for product in products}
+            for config in self.sites.values():
+                if config['domain'] in refreshed_domains:
+                    self.store_api.prefetch_catalog(config['base_url'])
+        
+        report = ProductRefresher(self).run(products)
+        
+        for host, stats in self.http.metrics.snapshot().items():
+            print(f"  {host}: {stats['requests']} requests, {stats['bytes'] // 1024} KB, avg {stats['avg_seconds']}s")
+        return report
+    
     def show_database_stats(self):
         """Display database statistics"""
         self.database.show_database_stats()
@@ -377,9 +567,9 @@ class CleanProductScraper:
             print(f"❌ Error deleting product: {e}")
             return False
 
-def main():
+def main(mode=None):
     """Main function for command line usage"""
-    scraper = CleanProductScraper()
+    scraper = CleanProductScraper(mode=mode)
     
     print("UNIVERSAL WOOCOMMERCE SCRAPER v3.0")
     print("=" * 50)
@@ -391,41 +581,50 @@ def main():
         print("✓ Enhanced image processing active")
     else:
         print("⚠ Basic image processing")
+    print(f"✓ Scrape mode: {scraper.mode}")
     print()
     print("1. Scrape Best Sellers (choose site)")
     print("2. Scrape Featured Products (choose site)")
     print("3. Custom URL Scraper (any supported site)")
     print("4. Show Database Stats") 
-    print("5. Exit")
+    print("5. Refresh Existing Products (pick up store changes)")
+    print("6. Crawl Full Category (all pages, resumable)")
+    print("7. Exit")
     
     while True:
-        choice = input("\nSelect option (1-5): ").strip()
+        choice = input("\nSelect option (1-7): ").strip()
         
         if choice in ['1', '2']:
             print("\nSelect site:")
             for i, (site_key, config) in enumerate(scraper.sites.items(), 1):
                 print(f"{i}. {config['domain']}")
+            print(f"{len(scraper.sites) + 1}. All sites")
             
-            site_choice = input(f"Choose site (1-{len(scraper.sites)}): ").strip()
+            site_choice = input(f"Choose site (1-{len(scraper.sites) + 1}): ").strip()
             try:
                 site_index = int(site_choice) - 1
-                site_key = list(scraper.sites.keys())[site_index]
+                if site_index == len(scraper.sites):
+                    site_keys = list(scraper.sites.keys())
+                    site_label = "all sites"
+                else:
+                    site_keys = [list(scraper.sites.keys())[site_index]]
+                    site_label = scraper.sites[site_keys[0]]['domain']
             except (ValueError, IndexError):
                 print("Invalid site choice")
                 continue
             
             if choice == '1':
-                urls = scraper.get_product_urls('best_sellers', 15, site_key)
+                urls = scraper.get_catalog_urls('best_sellers', site_keys, 15)
                 if urls:
-                    scraper.scrape_products(urls, f"Best Sellers from {scraper.sites[site_key]['domain']}")
+                    scraper.scrape_products(urls, f"Best Sellers from {site_label}")
                 else:
                     print("No new best sellers found!")
                 break
             
             elif choice == '2':
-                urls = scraper.get_product_urls('featured', 20, site_key)
+                urls = scraper.get_catalog_urls('featured', site_keys, 20)
                 if urls:
-                    scraper.scrape_products(urls, f"Featured Products from {scraper.sites[site_key]['domain']}")
+                    scraper.scrape_products(urls, f"Featured Products from {site_label}")
                 else:
                     print("No new featured products found!")
                 break
@@ -442,9 +641,30 @@ def main():
             scraper.show_database_stats()
                 
         elif choice == '5':
+            scraper.refresh_products()
+            break
+            
+        elif choice == '6':
+            target = input("Category URL, or best_sellers / featured: ").strip()
+            if target and not target.startswith('http'):
+                print("\nSelect site:")
+                for i, (site_key, config) in enumerate(scraper.sites.items(), 1):
+                    print(f"{i}. {config['domain']}")
+                try:
+                    site_key = list(scraper.sites.keys())[int(input("Choose site: ").strip()) - 1]
+                except (ValueError, IndexError):
+                    print("Invalid site choice")
+                    continue
+                scraper.crawl_category(target, site_key)
+            elif target:
+                scraper.crawl_category(target)
+            break
+            
+        elif choice == '7':
             break
         else:
             print("Invalid choice")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    # python unified_scraper.py --async  (or SCRAPE_MODE=async) for the event loop mode
+    main('async' if '--async' in sys.argv[1:] else None)
\ No newline at end of file
@@ -0,0 +1,420 @@
+"""
+WooCommerce API - Store API and JSON-LD fast paths for product extraction
+Reads products from the public Store API (/wp-json/wc/store/v1/products, 100 per request); without
+it, the page's embedded JSON-LD Product data supplies the scalar fields (title, price, SKU)
+"""
+import html
+import json
+import re
+import threading
+from datetime import datetime
+from urllib.parse import urlparse
+
+from bs4 import BeautifulSoup
+
+from app_config import STORE_API_PAGE_SIZE
+
+STORE_API_PATHS = ('/wp-json/wc/store/v1/products', '/wp-json/wc/store/products')
+
+CURRENCY_SYMBOLS = {'USD': '$', 'CAD': '$', 'AUD': '$', 'EUR': '€', 'GBP': '£'}
+
+JSON_LD_PATTERN = re.compile(
+    r'<script[^>]+type=["\']application/ld\+json["\'][^>]*>(.*?)</script>', re.IGNORECASE | re.DOTALL
+)
+CATEGORY_PATH_PATTERN = re.compile(r'^/product-category/(?:[^/]+/)*([^/]+)/?$')
+
+def html_to_text(fragment):
+    """Plain text from an HTML fragment, whitespace collapsed (matches clean_description_text)"""
+    if not fragment:
+        return ''
+    text = BeautifulSoup(fragment, 'html.parser').get_text(separator=' ', strip=True)
+    return html.unescape(' '.join(text.split()))
+
+def format_price(prices):
+    """Store API prices block -> '$19.99' (prices are strings in minor units)"""
+    if not prices or not prices.get('price'):
+        return "Contact for pricing"
+    try:
+        minor_unit = int(prices.get('currency_minor_unit', 2))
+        value = int(prices['price']) / (10 ** minor_unit)
+    except (TypeError, ValueError):
+        return "Contact for pricing"
+    prefix = prices.get('currency_prefix') or prices.get('currency_symbol') or ''
+    return f"{html.unescape(prefix)}{value:,.{minor_unit}f}{html.unescape(prices.get('currency_suffix') or '')}"
+
+def product_slug(url):
+    """Slug of a /product/<slug>/ URL"""
+    parts = [part for part in urlparse(url).path.split('/') if part]
+    if 'product' in parts and parts.index('product') + 1 < len(parts):
+        return parts[parts.index('product') + 1]
+    return parts[-1] if parts else None
+
+def site_root(url):
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}"
+
+def build_product(url, title, description, short_description, price, category, sku, image_urls, source, domain):
+    """Scraped product in the same shape as ProductScraperCore.extract_product_data"""
+    return {
+        'product_data': {
+            'url': url,
+            'title': title,
+            'description': description or short_description or "Premium quality product",
+            'short_description': short_description or "Premium quality product",
+            'price': price,
+            'category': category or "Uncategorized",
+            'sku': sku or None,
+            'scraped_at': datetime.now().isoformat(),
+            'scraper_version': '3.0-universal',
+            'domain': domain,
+            'extraction': source
+        },
+        'image_urls': image_urls
+    }
+
+# JSON-LD
+
+def find_json_ld_product(page_text):
+    """First schema.org Product object embedded in a page, or None"""
+    for block in JSON_LD_PATTERN.findall(page_text):
+        try:
+            data = json.loads(block.strip(), strict=False)
+        except ValueError:
+            continue
+        pending = [data]
+        while pending:
+            node = pending.pop(0)
+            if isinstance(node, list):
+                pending.extend(node)
+            elif isinstance(node, dict):
+                types = node.get('@type')
+                if types == 'Product' or (isinstance(types, list) and 'Product' in types):
+                    return node
+                if '@graph' in node:
+                    pending.append(node['@graph'])
+    return None
+
+def json_ld_price(offers):
+    """'$24.50' from a Product's offers, None when it has no price"""
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if not isinstance(offers, dict):
+        return None
+    price = offers.get('price') or offers.get('lowPrice')
+    specification = offers.get('priceSpecification')
+    if price is None and isinstance(specification, list) and specification:
+        specification = specification[0]
+    if price is None and isinstance(specification, dict):
+        price = specification.get('price')
+    if price is None:
+        return None
+    currency = offers.get('priceCurrency') or (specification or {}).get('priceCurrency', 'USD')
+    try:
+        return f"{CURRENCY_SYMBOLS.get(currency, currency + ' ')}{float(price):,.2f}"
+    except (TypeError, ValueError):
+        return str(price)
+
+def json_ld_fields(content):
+    """Title, price and SKU from a page's JSON-LD Product ({field: value or None}), or None without one
+
+    Only scalar fields - WooCommerce's JSON-LD description is the short description when one is
+    set and its image is just the main image, so those still come from the HTML.
+    """
+    if isinstance(content, bytes):
+        content = content.decode('utf-8', errors='replace')
+    data = find_json_ld_product(content)
+    if not data:
+        return None
+
+    title = html.unescape(str(data.get('name') or '')).strip()
+    sku = data.get('sku')
+    return {
+        'title': title if len(title) >= 3 else None,
+        'price': json_ld_price(data.get('offers')),
+        'sku': str(sku).strip() if sku else None
+    }
+
+# Store API
+
+def product_from_store_item(item, domain):
+    """Scraped product from one Store API product object"""
+    categories = item.get('categories') or []
+    return build_product(
+        item.get('permalink'),
+        html.unescape(item.get('name') or '').strip(),
+        html_to_text(item.get('description')),
+        html_to_text(item.get('short_description')),
+        format_price(item.get('prices')),
+        html.unescape(categories[0]['name']) if categories else None,
+        item.get('sku'),
+        [image['src'] for image in item.get('images') or [] if image.get('src')],
+        'store_api',
+        domain
+    )
+
+class StoreApiClient:
+    """Bulk product reads from the WooCommerce Store API, per site
+
+    Sites without the API (or with it disabled) are remembered and skipped, so callers
+    just fall back to HTML. Products read in bulk are held until scrape_product asks for them.
+    """
+
+    def __init__(self, http, rate_limiter=None, page_size=STORE_API_PAGE_SIZE):
+        self.http = http
+        self.rate_limiter = rate_limiter
+        self.page_size = page_size
+        self._endpoints = {}
+        self._categories = {}
+        self._lock = threading.Lock()
+        # product URL -> scraped product from a bulk listing
+        self.prefetched = {}
+        self.requests = 0
+
+    def get_json(self, url, params=None):
+        if self.rate_limiter:
+            self.rate_limiter.acquire(url)
+        response = self.http.get(url, params=params, timeout=20, headers={'Accept': 'application/json'})
+        self.requests += 1
+        response.raise_for_status()
+        if 'json' not in response.headers.get('Content-Type', ''):
+            raise ValueError(f"Not a JSON response from {url}")
+        return response.json(), response
+
+    def endpoint_for(self, url):
+        """Products endpoint for the URL's site, None when the Store API isn't available there"""
+        root = site_root(url)
+        with self._lock:
+            if root in self._endpoints:
+                return self._endpoints[root]
+
+        endpoint = None
+        for path in STORE_API_PATHS:
+            try:
+                data, _ = self.get_json(root + path, {'per_page': 1})
+            except Exception:
+                continue
+            if isinstance(data, list):
+                endpoint = root + path
+                break
+        if endpoint:
+            print(f"✓ Store API available: {endpoint}")
+        else:
+            print(f"ℹ️ Store API not available on {urlparse(root).netloc} - using HTML pages")
+
+        with self._lock:
+            self._endpoints[root] = endpoint
+        return endpoint
+
+    def category_id(self, endpoint, slug):
+        key = (endpoint, slug)
+        with self._lock:
+            if key in self._categories:
+                return self._categories[key]
+        category_id = None
+        page = 1
+        while category_id is None:
+            categories, _ = self.get_json(endpoint + '/categories', {'per_page': 100, 'page': page})
+            for category in categories:
+                if category.get('slug') == slug:
+                    category_id = category.get('id')
+                    break
+            if len(categories) < 100:
+                break
+            page += 1
+        with self._lock:
+            self._categories[key] = category_id
+        return category_id
+
+    def iter_products(self, endpoint, limit=None, **filters):
+        """Store API product objects, page_size per request, in catalog (menu) order"""
+        page = 1
+        seen = 0
+        while True:
+            params = dict(filters, per_page=self.page_size, page=page, orderby='menu_order', order='asc')
+            items, response = self.get_json(endpoint, params)
+            for item in items:
+                yield item
+                seen += 1
+                if limit and seen >= limit:
+                    return
+            total_pages = int(response.headers.get('X-WP-TotalPages') or 0)
+            if len(items) < self.page_size or (total_pages and page >= total_pages):
+                return
+            page += 1
+
+    def listing_filters(self, listing_url):
+        """Store API filters equivalent to a listing page, None when there is no equivalent"""
+        path = urlparse(listing_url).path or '/'
+        if '/page/' in path:
+            return None
+        if path.rstrip('/') in ('', '/shop'):
+            return {}
+        if path.rstrip('/') == '/featured-products':
+            return {'featured': 'true'}
+        match = CATEGORY_PATH_PATTERN.match(path)
+        if match:
+            return {'category_slug': match.group(1)}
+        return None
+
+    def list_products(self, listing_url, limit=None):
+        """Product URLs of a listing read through the API (products kept for scrape_product)
+
+        Returns None when the listing has to be scraped as HTML instead.
+        """
+        filters = self.listing_filters(listing_url)
+        if filters is None:
+            return None
+        endpoint = self.endpoint_for(listing_url)
+        if not endpoint:
+            return None
+
+        try:
+            slug = filters.pop('category_slug', None)
+            if slug:
+                category_id = self.category_id(endpoint, slug)
+                if category_id is None:
+                    print(f"ℹ️ Store API has no category '{slug}' - using HTML pages")
+                    return None
+                filters['category'] = category_id
+
+            domain = urlparse(listing_url).netloc.lower().replace('www.', '', 1)
+            urls = []
+            for item in self.iter_products(endpoint, limit, **filters):
+                scraped = product_from_store_item(item, domain)
+                url = scraped['product_data']['url']
+                if not url or not scraped['product_data']['title']:
+                    continue
+                with self._lock:
+                    self.prefetched[url] = scraped
+                urls.append(url)
+        except Exception as e:
+            print(f"⚠️ Store API listing failed for {listing_url}: {e} - using HTML pages")
+            return None
+
+        print(f"✓ Store API: {len(urls)} products from {listing_url} in {max(1, -(-len(urls) // self.page_size))} requests")
+        return urls
+
+    def prefetch_catalog(self, site_url):
+        """Read a whole catalog in bulk (e.g. before a refresh), returns how many products were read"""
+        urls = self.list_products(site_root(site_url) + '/shop/')
+        return len(urls or [])
+
+    def scrape_product(self, url):
+        """Scraped product for a product URL - from a bulk listing, else one API request by slug
+
+        Returns None when the API can't supply it (caller falls back to the page).
+        """
+        with self._lock:
+            scraped = self.prefetched.pop(url, None)
+        if scraped:
+            return scraped
+
+        endpoint = self.endpoint_for(url)
+        slug = product_slug(url)
+        if not endpoint or not slug:
+            return None
+        try:
+            items, _ = self.get_json(endpoint, {'slug': slug})
+        except Exception as e:
+            print(f"⚠️ Store API lookup failed for {url}: {e}")
+            return None
+        if not items:
+            return None
+        domain = urlparse(url).netloc.lower().replace('www.', '', 1)
+        scraped = product_from_store_item(items[0], domain)
+        # Keep the URL the caller knows the product by
+        scraped['product_data']['url'] = url
+        return scraped
+
+def test_store_api():
+    """Run the client against a local stand-in server serving recorded responses"""
+    import threading as server_threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import parse_qs
+
+    from http_client import HttpClient
+
+    recorded_products = [
+        {
+            'id': 101 + i, 'name': f'Recorded Vape Cart #{i + 1} &amp; Case', 'slug': f'recorded-cart-{i + 1}',
+            'permalink': None, 'sku': f'RC-{i + 1:03d}',
+            'description': '<p>Full <strong>description</strong> for a recorded product.</p>',
+            'short_description': '<p>Short description</p>',
+            'prices': {'price': str(1999 + i * 100), 'currency_minor_unit': 2, 'currency_prefix': '$',
+                       'currency_suffix': ''},
+            'categories': [{'id': 7, 'name': 'Best Sellers', 'slug': 'best-sellers'}],
+            'images': [{'src': f'https://example.com/wp-content/uploads/cart-{i + 1}.jpg'}]
+        }
+        for i in range(250)
+    ]
+    recorded_json_ld = '''<html><head><script type="application/ld+json">{"@context": "https://schema.org",
+        "@graph": [{"@type": "WebPage"}, {"@type": "Product", "name": "JSON-LD Grinder", "sku": "GR-1",
+        "description": "Four piece &amp; aluminium", "image": ["https://example.com/grinder.jpg"],
+        "offers": [{"@type": "Offer", "price": "24.5", "priceCurrency": "USD"}]}]}</script></head></html>'''
+    requests_seen = []
+
+    class RecordedStore(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_GET(self):
+            path, _, query = self.path.partition('?')
+            params = {key: values[0] for key, values in parse_qs(query).items()}
+            requests_seen.append(path)
+            base = f"http://127.0.0.1:{self.server.server_port}"
+            if path == '/wp-json/wc/store/v1/products/categories':
+                body = json.dumps([{'id': 7, 'slug': 'best-sellers', 'name': 'Best Sellers'}])
+                headers = {}
+            elif path == '/wp-json/wc/store/v1/products':
+                items = [dict(item, permalink=f"{base}/product/{item['slug']}/") for item in recorded_products]
+                if 'slug' in params:
+                    items = [item for item in items if item['slug'] == params['slug']]
+                per_page = int(params.get('per_page', 10))
+                page = int(params.get('page', 1))
+                total_pages = -(-len(items) // per_page)
+                body = json.dumps(items[(page - 1) * per_page:page * per_page])
+                headers = {'X-WP-Total': str(len(items)), 'X-WP-TotalPages': str(total_pages)}
+            elif path == '/product/json-ld-grinder/':
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/html')
+                self.end_headers()
+                self.wfile.write(recorded_json_ld.encode('utf-8'))
+                return
+            else:
+                self.send_response(404)
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json; charset=UTF-8')
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(body.encode('utf-8'))
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), RecordedStore)
+    server_threading.Thread(target=server.serve_forever, daemon=True).start()
+    base = f"http://127.0.0.1:{server.server_port}"
+
+    client = StoreApiClient(HttpClient())
+    urls = client.list_products(base + '/product-category/best-sellers/')
+    api_requests = len([path for path in requests_seen if path == '/wp-json/wc/store/v1/products'])
+    print(f"Listed {len(urls)} products with {api_requests} product requests (1 probe + pages)")
+    assert len(urls) == 250 and api_requests == 4
+
+    product = client.scrape_product(urls[0])['product_data']
+    print(f"Prefetched: {product['title']} | {product['price']} | {product['description']}")
+    assert product['title'] == 'Recorded Vape Cart #1 & Case' and product['price'] == '$19.99'
+
+    single = client.scrape_product(base + '/product/recorded-cart-3/')
+    assert single['product_data']['sku'] == 'RC-003'
+
+    page = HttpClient().get(base + '/product/json-ld-grinder/').content
+    from_json_ld = json_ld_fields(page)
+    print(f"JSON-LD: {from_json_ld['title']} | {from_json_ld['price']} | {from_json_ld['sku']}")
+    assert from_json_ld['price'] == '$24.50'
+
+    server.shutdown()
+    print("✅ Store API self-test passed")
+
+if __name__ == '__main__':
+    test_store_api()